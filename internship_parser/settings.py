@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_spectacular',
     'rest_framework',
     'django_apscheduler',
@@ -158,6 +159,106 @@ SUPERJOB_API_ID = os.getenv('SUPERJOB_API_ID')
 SUPERJOB_SECRET_KEY = os.getenv('SUPERJOB_SECRET_KEY')
 SUPERJOB_API_TOKEN = os.getenv('SUPERJOB_API_TOKEN', '')
 
+# Размер пула keep-alive соединений для каждого источника
+HTTP_POOL_SIZES = {
+    'api.hh.ru': 10,
+    'career.habr.com': 6,
+    'api.superjob.ru': 4,
+}
+
+# Количество одновременных запросов деталей вакансий к источнику
+CRAWLER_DETAIL_CONCURRENCY = {
+    'api.hh.ru': 4,
+    'career.habr.com': 3,
+}
+
+# Сколько следующих страниц поисковой выдачи загружать заранее, пока обрабатывается текущая
+CRAWLER_PAGE_LOOKAHEAD = {
+    'api.hh.ru': 2,
+    'career.habr.com': 1,
+    'api.superjob.ru': 1,
+}
+
+# Начальная, минимальная и максимальная частота запросов к источнику (запросов в секунду).
+# Скорость растет, пока ответы успешные, и резко снижается при 403/429/5xx.
+CRAWLER_RATE_LIMITS = {
+    'api.hh.ru': {'rate': 3.0, 'min_rate': 0.2, 'max_rate': 10.0, 'burst': 3},
+    'career.habr.com': {'rate': 1.5, 'min_rate': 0.2, 'max_rate': 5.0, 'burst': 2},
+    'api.superjob.ru': {'rate': 2.0, 'min_rate': 0.2, 'max_rate': 5.0, 'burst': 2},
+}
+
+# Конвейер записи результатов краулеров: размер очереди между обходом и записью в БД
+# и количество стажировок, сохраняемых в одной транзакции
+CRAWLER_PIPELINE_QUEUE_SIZE = 50
+CRAWLER_PIPELINE_BATCH_SIZE = 25
+
+# Дисковый кеш ответов краулеров: (регулярное выражение для URL, срок жизни в секундах)
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'True') == 'True'
+HTTP_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'http')
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+HTTP_CACHE_TTLS = [
+    (r'^https://api\.hh\.ru/vacancies/\d+', 3 * 24 * 60 * 60),
+    (r'^https://api\.hh\.ru/areas', 7 * 24 * 60 * 60),
+    (r'^https://api\.hh\.ru/vacancies\?', 30 * 60),
+    (r'^https://career\.habr\.com/vacancies/\d+', 24 * 60 * 60),
+    (r'^https://career\.habr\.com/api/frontend/suggestions/', 7 * 24 * 60 * 60),
+    (r'^https://career\.habr\.com/api/frontend/vacancies', 30 * 60),
+    (r'^https://api\.superjob\.ru/2\.0/vacancies', 30 * 60),
+]
+
+# Порог похожести (0..1) для нечеткого поиска по названию, компании и городу (pg_trgm)
+SEARCH_TRIGRAM_THRESHOLD = 0.3
+
+# Сколько записей читать из серверного курсора за раз при потоковой выгрузке API (stream=ndjson)
+API_STREAM_CHUNK_SIZE = 500
+
+# Архивация устаревших стажировок: стажировка уходит в архив после даты окончания отбора
+# или если краулеры не встречали ее дольше ARCHIVE_NOT_SEEN_DAYS дней
+ARCHIVE_RUN_INTERVAL = 24 * 60 * 60
+ARCHIVE_NOT_SEEN_DAYS = 30
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_BATCH_PAUSE = 0.1
+# Перенос записей, находящихся в архиве дольше ARCHIVE_COLD_AFTER_DAYS дней, в таблицу InternshipArchive
+ARCHIVE_COLD_STORAGE_ENABLED = os.getenv('ARCHIVE_COLD_STORAGE_ENABLED', 'False') == 'True'
+ARCHIVE_COLD_AFTER_DAYS = 180
+
+# Сверка после полного обхода сохраненного запроса: стажировка, пропавшая из выдачи источника,
+# уходит в архив, если не появилась снова в течение этого времени (в секундах)
+CRAWL_RECONCILE_GRACE_PERIOD = 12 * 60 * 60
+
+# Кеш ответов LLM для универсального парсера: ключ - хеш модели, версии промпта и текста страницы.
+# Хранилище 'file' (DiskCache, ограничение по размеру) или 'db' (таблица LLMCacheEntry, ограничение по числу записей)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'file')
+LLM_CACHE_TTL = 30 * 24 * 60 * 60
+LLM_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'llm')
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LLM_CACHE_MAX_ENTRIES = 5000
+
+# Очередь запросов к LLM: сколько запросов выполняется одновременно, сколько из этих потоков
+# зарезервировано только под интерактивный предпросмотр и сколько ждать ответа (в секундах)
+LLM_MAX_CONCURRENCY = 3
+LLM_INTERACTIVE_RESERVED = 1
+LLM_DISPATCH_TIMEOUT = 10 * 60
+# Текст длиннее лимита модели не обрезается, а разбирается по перекрывающимся фрагментам
+# (перекрытие в символах), ответы по фрагментам объединяются; не больше LLM_MAX_CHUNKS фрагментов на страницу
+LLM_CHUNKED_EXTRACTION = True
+LLM_CHUNK_OVERLAP = 4000
+LLM_MAX_CHUNKS = 8
+
+# Универсальный парсер сначала читает JSON-LD, микроразметку и OpenGraph и обращается к LLM,
+# только если оценка полноты title/company/description (0..1) ниже порога. Описание короче
+# UNIVERSAL_PARSER_MIN_DESCRIPTION_LENGTH символов считается анонсом и засчитывается наполовину
+UNIVERSAL_PARSER_MIN_STRUCTURED_SCORE = 1.0
+UNIVERSAL_PARSER_MIN_DESCRIPTION_LENGTH = 300
+# Передавать в LLM только основной блок страницы (без меню, подвалов и списков похожих вакансий)
+UNIVERSAL_PARSER_MAIN_CONTENT = True
+
+# Периодичность обновления справочников регионов HH и SuperJob (в секундах)
+GEO_INDEX_REFRESH_INTERVAL = 7 * 24 * 60 * 60
+# Как часто процесс перечитывает справочник регионов из БД (в секундах)
+GEO_INDEX_RELOAD_INTERVAL = 60 * 60
+
 # Настройка логирования
 LOGGING = {
     'version': 1,
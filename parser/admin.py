@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import Website, Internship, SearchQuery
+from .models import Website, Internship, SearchQuery, GeoArea, City, Skill, InternshipCounter, InternshipArchive, LLMCacheEntry
 
 admin.site.register(Website)
 admin.site.register(Internship)
-admin.site.register(SearchQuery)
\ No newline at end of file
+admin.site.register(SearchQuery)
+admin.site.register(GeoArea)
+admin.site.register(City)
+admin.site.register(Skill)
+admin.site.register(InternshipCounter)
+admin.site.register(InternshipArchive)
+admin.site.register(LLMCacheEntry)
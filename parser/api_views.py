@@ -2,26 +2,33 @@ import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets, filters
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 import threading
 import concurrent.futures
-from django.db.models import Q
+from contextlib import nullcontext
 
-from .hh_api_parser import fetch_hh_internships, HeadHunterAPI
-from .habr_parser import fetch_habr_career_internships, HabrCareerParser
-from .superjob_parser import fetch_superjob_internships, SuperJobParser
-from .universal_parser import UniversalParser
+from .hh_api_parser import fetch_hh_internships
+from .habr_parser import fetch_habr_career_internships
+from .superjob_parser import fetch_superjob_internships
+from .universal_parser import UniversalParser, get_extraction_stats
 from .models import Website, Internship, SearchQuery
 from .serializers import InternshipSerializer
+from .pagination import KeysetPagination
+from .pipeline import empty_crawl_stats
+from .llm_cache import get_llm_cache
+from .llm_dispatcher import PRIORITY_INTERACTIVE, get_llm_dispatcher
+from .skill_service import SkillService
+from .stats_service import StatsService
+from .streaming import stream_ndjson_response, wants_ndjson
+from .search import filter_by_city, filter_text_field, search_internships_queryset, trigram_threshold
 from .tasks import parse_hh_internships, parse_habr_internships, parse_superjob_internships
 
 logger = logging.getLogger(__name__)
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Стандартная пагинация для API"""
+class StandardResultsSetPagination(KeysetPagination):
+    """Стандартная пагинация для API: курсор по (created_at, id), параметры cursor и page_size"""
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -248,10 +255,18 @@ def _run_habr_parser_thread(params):
 
 @api_view(['GET'])
 def internship_list_api(request):
-    """Получение списка стажировок"""
-    queryset = Internship.objects.all()
-    serializer = InternshipSerializer(queryset, many=True)
-    return Response(serializer.data)
+    """
+    Получение списка стажировок постранично (параметры cursor и page_size).
+    При stream=ndjson весь список отдается потоком, по записи JSON на строку.
+    """
+    queryset = Internship.objects.select_related('source_website')
+    if wants_ndjson(request):
+        return stream_ndjson_response(queryset.order_by('-created_at', '-id'), InternshipSerializer)
+
+    paginator = StandardResultsSetPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = InternshipSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -268,49 +283,101 @@ def internship_detail_api(request, pk):
 
 @api_view(['GET'])
 def search_internships(request):
-    """API для поиска стажировок"""
+    """
+    API для поиска стажировок.
+
+    Параметры: keywords, city, company; match=fuzzy включает поиск похожих
+    написаний (PostgreSQL), threshold - порог похожести от 0 до 1;
+    skills - навыки через запятую, skills_mode=any|all; cursor и page_size -
+    курсорная пагинация. При facets=skills ответ дополнительно содержит
+    facets.skills - количество найденных стажировок по навыкам. При
+    stream=ndjson все найденные стажировки отдаются потоком без пагинации.
+    """
     city = request.query_params.get('city')
     keywords = request.query_params.get('keywords')
+    company = request.query_params.get('company')
+    fuzzy = request.query_params.get('match') == 'fuzzy'
+    threshold = request.query_params.get('threshold')
+    skills = request.query_params.get('skills')
+    skills_mode = 'all' if request.query_params.get('skills_mode') == 'all' else 'any'
     
     if city or keywords:
         SearchQuery.record_search(city=city, keywords=keywords)
     
-    queryset = Internship.objects.filter(is_archived=False)
+    queryset = Internship.objects.filter(is_archived=False).select_related('source_website')
     
     if city:
-        queryset = queryset.filter(city__icontains=city)
+        queryset = filter_by_city(queryset, city, fuzzy=fuzzy)
+
+    if company:
+        queryset = filter_text_field(queryset, 'company', company, fuzzy=fuzzy)
     
     if keywords:
-        queryset = queryset.filter(
-            Q(title__icontains=keywords) | 
-            Q(position__icontains=keywords) | 
-            Q(description__icontains=keywords) |
-            Q(keywords__icontains=keywords)
+        queryset = search_internships_queryset(
+            queryset, keywords, fallback_fields=('title', 'position', 'description', 'keywords'),
+            fuzzy_fields=('title',) if fuzzy else ()
         )
+
+    if skills:
+        queryset = SkillService.filter_by_skills(queryset, skills, mode=skills_mode)
+
+    if wants_ndjson(request):
+        if 'search_rank' not in queryset.query.annotations:
+            queryset = queryset.order_by('-created_at', '-id')
+        return stream_ndjson_response(queryset, InternshipSerializer,
+                                      context=trigram_threshold(threshold) if fuzzy else None)
     
-    serializer = InternshipSerializer(queryset, many=True)
-    return Response(serializer.data)
+    paginator = StandardResultsSetPagination()
+    extra = {}
+    # Нечеткие условия (оператор %>) сравниваются с порогом, заданным в транзакции
+    with trigram_threshold(threshold) if fuzzy else nullcontext():
+        page = paginator.paginate_queryset(queryset, request)
+        data = InternshipSerializer(page, many=True).data
+        if request.query_params.get('facets') == 'skills':
+            extra['facets'] = {'skills': SkillService.get_facets(queryset)}
+    return paginator.get_paginated_response(data, **extra)
 
 
 @api_view(['GET'])
 def get_stats_api(request):
-    """Получение статистики по стажировкам"""
-    total_count = Internship.objects.count()
-    active_count = Internship.objects.filter(is_archived=False).count()
-    archived_count = Internship.objects.filter(is_archived=True).count()
-    
-    by_website = {}
-    websites = Website.objects.all()
-    for website in websites:
-        count = Internship.objects.filter(source_website=website).count()
-        by_website[website.name] = count
-    
-    return Response({
-        'total': total_count,
-        'active': active_count,
-        'archived': archived_count,
-        'by_website': by_website
-    })
+    """
+    Получение статистики по стажировкам из счетчиков, которые поддерживаются
+    при сохранении, архивации и удалении стажировок. Счетчики сверяются с
+    данными планировщиком и командой rebuild_internship_counters.
+    """
+    return Response(StatsService.get_stats())
+
+
+@api_view(['GET'])
+def get_llm_cache_stats_api(request):
+    """
+    Статистика кеша ответов LLM универсального парсера: попадания, промахи,
+    hit rate, среднее время чтения из кеша и сэкономленное время запросов к LLM.
+    """
+    cache = get_llm_cache()
+    if not cache:
+        return Response({'enabled': False})
+    return Response({'enabled': True, **cache.get_stats()})
+
+
+@api_view(['GET'])
+def get_llm_queue_stats_api(request):
+    """
+    Метрики очереди запросов к LLM: глубина очереди и число выполняющихся
+    запросов по приоритетам, среднее и максимальное время ожидания, число
+    запросов, объединенных с уже выполняющимися одинаковыми.
+    """
+    return Response(get_llm_dispatcher().get_stats())
+
+
+@api_view(['GET'])
+def get_extraction_stats_api(request):
+    """
+    Статистика универсального парсера по уровням извлечения (json_ld, microdata,
+    opengraph, llm): число запросов к LLM, которых удалось избежать, и оценка
+    сэкономленного времени.
+    """
+    return Response(get_extraction_stats())
 
 
 class FetchSuperJobInternshipsAPIView(APIView):
@@ -467,30 +534,24 @@ class FetchAllInternshipsAPIView(APIView):
             
             def fetch_hh():
                 try:
-                    internships = fetch_hh_internships(city=city, keywords=keywords, max_pages=max_pages)
-                    logger.info(f"Получено {len(internships)} словарей стажировок с HeadHunter.")
-                    results['hh'] = internships
+                    results['hh'] = fetch_hh_internships(city=city, keywords=keywords, max_pages=max_pages, website_obj=hh_website)
                 except Exception as e:
                     logger.error(f"Ошибка при получении стажировок с HeadHunter: {str(e)}")
-                    results['hh'] = []
+                    results['hh'] = empty_crawl_stats(str(e))
             
             def fetch_habr():
                 try:
-                    internships = fetch_habr_career_internships(city=city, keywords=keywords, max_pages=max_pages)
-                    logger.info(f"Получено {len(internships)} словарей стажировок с Habr Career.")
-                    results['habr'] = internships
+                    results['habr'] = fetch_habr_career_internships(keywords_query=keywords, city_name=city, max_pages=max_pages, website_obj=habr_website)
                 except Exception as e:
                     logger.error(f"Ошибка при получении стажировок с Habr Career: {str(e)}")
-                    results['habr'] = []
+                    results['habr'] = empty_crawl_stats(str(e))
                     
             def fetch_superjob_task():
                 try:
-                    processed_internship_objects = fetch_superjob_internships(city=city, keywords=keywords, max_pages=max_pages, website_obj=superjob_website_obj)
-                    logger.info(f"Получено {len(processed_internship_objects)} объектов стажировок с SuperJob.")
-                    results['superjob'] = processed_internship_objects
+                    results['superjob'] = fetch_superjob_internships(city=city, keywords=keywords, max_pages=max_pages, website_obj=superjob_website_obj)
                 except Exception as e:
                     logger.error(f"Ошибка при получении стажировок с SuperJob: {str(e)}")
-                    results['superjob'] = []
+                    results['superjob'] = empty_crawl_stats(str(e))
             
             with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
                 hh_future = executor.submit(fetch_hh)
@@ -499,65 +560,7 @@ class FetchAllInternshipsAPIView(APIView):
                 
                 concurrent.futures.wait([hh_future, habr_future, superjob_future])
             
-            hh_internships_data = results['hh'] or []
-            habr_internships_data = results['habr'] or []
-            superjob_internship_objects = results['superjob'] or []
-            
-            hh_client = HeadHunterAPI()
-            habr_client = HabrCareerParser()
-            
-            stats = {
-                'hh': {'total': len(hh_internships_data), 'created': 0, 'updated': 0, 'errors': 0},
-                'habr': {'total': len(habr_internships_data), 'created': 0, 'updated': 0, 'errors': 0},
-                'superjob': {'total': len(superjob_internship_objects), 'created': 0, 'updated': 0, 'errors': 0}
-            }
-            
-            for internship_data in hh_internships_data:
-                obj, is_created = hh_client.create_internship(internship_data, hh_website)
-                if obj:
-                    if is_created:
-                        stats['hh']['created'] += 1
-                    else:
-                        stats['hh']['updated'] += 1
-                else:
-                    stats['hh']['errors'] +=1
-            
-            for internship_data in habr_internships_data:
-                if isinstance(internship_data, Internship):
-                    if internship_data.id is None:  
-                        stats['habr']['created'] += 1
-                    else:
-                        stats['habr']['updated'] += 1
-                else:
-                    obj, is_created = habr_client.create_internship(internship_data, habr_website)
-                    if obj:
-                        if is_created:
-                            stats['habr']['created'] += 1
-                        else:
-                            stats['habr']['updated'] += 1
-                    else:
-                        stats['habr']['errors'] +=1
-                    
-            for internship_obj in superjob_internship_objects:
-                if isinstance(internship_obj, Internship):
-                    if internship_obj.id is None:
-                        stats['superjob']['created'] += 1
-                    else:
-                        stats['superjob']['updated'] += 1
-                else:
-                    try:
-                        sj_client = SuperJobParser()
-                        obj, is_created = sj_client.create_internship(internship_obj, superjob_website_obj)
-                        if obj:
-                            if is_created:
-                                stats['superjob']['created'] += 1
-                            else:
-                                stats['superjob']['updated'] += 1
-                        else:
-                            stats['superjob']['errors'] += 1
-                    except Exception as e:
-                        logger.error(f"Ошибка при создании/обновлении стажировки SuperJob: {str(e)}")
-                        stats['superjob']['errors'] += 1
+            stats = {source: source_stats or empty_crawl_stats() for source, source_stats in results.items()}
             
             total_processed = stats['hh']['created'] + stats['hh']['updated'] + \
                               stats['habr']['created'] + stats['habr']['updated'] + \
@@ -730,7 +733,7 @@ class PreviewInternshipAPIView(APIView):
 
         try:
             logger.info(f"Запрос на предварительный парсинг URL: {url}")
-            parser = UniversalParser(url)
+            parser = UniversalParser(url, llm_priority=PRIORITY_INTERACTIVE)
             internship_data = parser.extract_data()
 
             if not internship_data:
@@ -799,30 +802,24 @@ def _run_parsers_in_thread(params):
         
         def fetch_hh():
             try:
-                internships = fetch_hh_internships(**params)
-                logger.info(f"Получено {len(internships)} стажировок с HeadHunter.")
-                results['hh'] = internships
+                results['hh'] = fetch_hh_internships(**params)
             except Exception as e:
                 logger.error(f"Ошибка при получении стажировок с HeadHunter: {str(e)}")
-                results['hh'] = []
+                results['hh'] = empty_crawl_stats(str(e))
         
         def fetch_habr():
             try:
-                internships = fetch_habr_career_internships(**params)
-                logger.info(f"Получено {len(internships)} стажировок с Habr Career.")
-                results['habr'] = internships
+                results['habr'] = fetch_habr_career_internships(**params)
             except Exception as e:
                 logger.error(f"Ошибка при получении стажировок с Habr Career: {str(e)}")
-                results['habr'] = []
+                results['habr'] = empty_crawl_stats(str(e))
                 
         def fetch_superjob():
             try:
-                internships = fetch_superjob_internships(**params)
-                logger.info(f"Получено {len(internships)} стажировок с SuperJob.")
-                results['superjob'] = internships
+                results['superjob'] = fetch_superjob_internships(**params)
             except Exception as e:
                 logger.error(f"Ошибка при получении стажировок с SuperJob: {str(e)}")
-                results['superjob'] = []
+                results['superjob'] = empty_crawl_stats(str(e))
         
         with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
             hh_future = executor.submit(fetch_hh)
@@ -831,75 +828,8 @@ def _run_parsers_in_thread(params):
             
             concurrent.futures.wait([hh_future, habr_future, superjob_future])
         
-        hh_internships = results['hh'] or []
-        habr_internships = results['habr'] or []
-        superjob_internships = results['superjob'] or []
-        
-        hh_website, _ = Website.objects.get_or_create(
-            name="HeadHunter",
-            url="https://hh.ru",
-        )
-        
-        habr_website, _ = Website.objects.get_or_create(
-            name="Habr Career",
-            url="https://career.habr.com/",
-        )
-        
-        superjob_website, _ = Website.objects.get_or_create(
-            name="SuperJob",
-            url="https://www.superjob.ru/",
-        )
-        
-        hh_client = HeadHunterAPI()
-        habr_client = HabrCareerParser()
-        superjob_client = SuperJobParser()
-        
-        stats = {
-            'hh': {'total': len(hh_internships), 'created': 0, 'updated': 0},
-            'habr': {'total': len(habr_internships), 'created': 0, 'updated': 0},
-            'superjob': {'total': len(superjob_internships), 'created': 0, 'updated': 0}
-        }
-        
-        for internship_data in hh_internships:
-            _, is_created = hh_client.create_internship(internship_data, hh_website)
-            if is_created:
-                stats['hh']['created'] += 1
-            else:
-                stats['hh']['updated'] += 1
-        
-        for internship_data in habr_internships:
-            if isinstance(internship_data, Internship):
-                if internship_data.id is None:  
-                    stats['habr']['created'] += 1
-                else:
-                    stats['habr']['updated'] += 1
-            else:
-                obj, is_created = habr_client.create_internship(internship_data, habr_website)
-                if obj:
-                    if is_created:
-                        stats['habr']['created'] += 1
-                    else:
-                        stats['habr']['updated'] += 1
-                else:
-                    stats['habr']['errors'] +=1
-                    
-        for internship_data in superjob_internships:
-            if isinstance(internship_data, Internship):
-                if internship_data.id is None:  
-                    stats['superjob']['created'] += 1
-                else:
-                    stats['superjob']['updated'] += 1
-            else:
-                try:
-                    _, is_created = superjob_client.create_internship(internship_data, superjob_website)
-                    if is_created:
-                        stats['superjob']['created'] += 1
-                    else:
-                        stats['superjob']['updated'] += 1
-                except Exception as e:
-                    logger.error(f"Ошибка при создании/обновлении стажировки SuperJob: {str(e)}")
-        
-        total_count = len(hh_internships) + len(habr_internships) + len(superjob_internships)
+        stats = [source_stats or empty_crawl_stats() for source_stats in results.values()]
+        total_count = sum(source_stats['created'] + source_stats['updated'] for source_stats in stats)
         logger.info(f"Параллельно обработано {total_count} стажировок через webhook")
     except Exception as e:
         logger.error(f"Ошибка при выполнении параллельного парсинга через webhook: {str(e)}") 
\ No newline at end of file
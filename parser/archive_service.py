@@ -0,0 +1,152 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .internship_service import InternshipService
+from .models import Internship, InternshipArchive, Website
+from .stats_service import StatsService
+
+logger = logging.getLogger('parser')
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_NOT_SEEN_DAYS = 30
+DEFAULT_COLD_AFTER_DAYS = 180
+
+ARCHIVED_FIELDS = (
+    'external_id', 'title', 'company', 'position', 'salary', 'selection_start_date', 'duration',
+    'selection_end_date', 'description', 'employment_type', 'city', 'keywords', 'source_website_id',
+    'url', 'content_hash', 'created_at', 'updated_at', 'last_seen_at', 'archived_at',
+)
+
+
+class ArchiveService:
+    @staticmethod
+    def archive_stale(batch_size=None, not_seen_days=None, pause=None):
+        """Переносит в архив завершившиеся и давно не встречавшиеся краулерам стажировки
+
+        Стажировка архивируется, если прошла дата окончания отбора или ее не было
+        в выдаче источников дольше settings.ARCHIVE_NOT_SEEN_DAYS дней. Второе
+        правило применяется только к источникам, которые обходят краулеры
+        (Website.is_special): стажировки, добавленные вручную или универсальным
+        парсером, никто не отмечает как встреченные повторно. Записи
+        отбираются по частичным индексам активных стажировок и обновляются
+        пачками по batch_size через UPDATE ... WHERE id IN (...), каждая пачка
+        в своей короткой транзакции, чтобы не держать блокировки на всю таблицу.
+        Перед архивацией из архива возвращаются стажировки, которые краулеры
+        встретили после переноса в архив (см. revive_seen).
+
+        Returns:
+            int: Количество перенесенных в архив стажировок
+        """
+        batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        not_seen_days = not_seen_days or getattr(settings, 'ARCHIVE_NOT_SEEN_DAYS', DEFAULT_NOT_SEEN_DAYS)
+        pause = pause if pause is not None else getattr(settings, 'ARCHIVE_BATCH_PAUSE', 0)
+        now = timezone.now()
+        crawled_website_ids = list(Website.objects.filter(is_special=True).values_list('id', flat=True))
+        stale = Q(selection_end_date__lt=timezone.localdate()) | Q(
+            last_seen_at__lt=now - timedelta(days=not_seen_days), source_website_id__in=crawled_website_ids
+        )
+        ArchiveService.revive_seen(batch_size)
+
+        archived = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Internship.objects.filter(stale, is_archived=False, id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            with transaction.atomic():
+                rows = list(
+                    Internship.objects.select_for_update(skip_locked=True)
+                    .filter(id__in=ids, is_archived=False).values_list('id', 'source_website_id')
+                )
+                if rows:
+                    Internship.objects.filter(id__in=[row[0] for row in rows]).update(
+                        is_archived=True, auto_archived=True, archived_at=now
+                    )
+                    deltas = {}
+                    for _, website_id in rows:
+                        deltas[website_id] = deltas.get(website_id, 0) + 1
+                    for website_id, count in deltas.items():
+                        StatsService.adjust(website_id, active=-count, archived=count)
+            archived += len(rows)
+            if pause:
+                time.sleep(pause)
+
+        logger.info(f"Архивация: перенесено в архив {archived} стажировок (окончание отбора прошло "
+                    f"или не встречались краулерам {not_seen_days} дн.)")
+        return archived
+
+    @staticmethod
+    def revive_seen(batch_size=None):
+        """Возвращает из архива автоматически архивированные стажировки, встреченные краулерами после переноса в архив
+
+        Обычно такие стажировки возвращаются сразу при сохранении результатов
+        парсинга (InternshipService.revive_archived); этот проход подбирает
+        записи, пропущенные, например, из-за ошибки между транзакциями.
+
+        Returns:
+            int: Количество возвращенных из архива стажировок
+        """
+        batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        revived = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Internship.objects.filter(
+                    is_archived=True, auto_archived=True, last_seen_at__gt=F('archived_at'), id__gt=last_id
+                )
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            revived += InternshipService.revive_archived(ids)
+        return revived
+
+    @staticmethod
+    def move_to_cold_storage(batch_size=None, older_than_days=None):
+        """Переносит стажировки, находящиеся в архиве дольше older_than_days дней, в таблицу InternshipArchive
+
+        Записи копируются и удаляются из основной таблицы пачками, каждая пачка
+        в своей транзакции, поэтому размер основной таблицы определяется
+        актуальными вакансиями, а не историей. Автоматически архивированные
+        стажировки, встреченные краулерами после переноса в архив, не
+        переносятся: они возвращаются из архива (см. revive_seen).
+
+        Returns:
+            int: Количество перенесенных записей
+        """
+        batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        older_than_days = older_than_days or getattr(settings, 'ARCHIVE_COLD_AFTER_DAYS', DEFAULT_COLD_AFTER_DAYS)
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+
+        moved = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Internship.objects.select_for_update(skip_locked=True)
+                    .filter(is_archived=True, archived_at__lt=cutoff)
+                    .exclude(auto_archived=True, last_seen_at__gt=F('archived_at'))
+                    .order_by('id').values('id', *ARCHIVED_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                InternshipArchive.objects.bulk_create(
+                    [InternshipArchive(original_id=row['id'], **{field: row[field] for field in ARCHIVED_FIELDS}) for row in rows],
+                    ignore_conflicts=True,
+                )
+                StatsService.adjust_for_deleted((row['source_website_id'], True) for row in rows)
+                Internship.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            moved += len(rows)
+
+        logger.info(f"Архивация: в холодное хранилище перенесено {moved} стажировок, находившихся в архиве более {older_than_days} дн.")
+        return moved
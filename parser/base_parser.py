@@ -3,6 +3,7 @@ import re
 from datetime import datetime, timedelta
 from django.utils import timezone
 from bs4 import BeautifulSoup
+from .internship_service import InternshipService
 
 logger = logging.getLogger(__name__)
 
@@ -53,3 +54,51 @@ class BaseParser:
             
         seven_days_ago = timezone.now() - timedelta(days=7)
         return existing_internship.updated_at <= seven_days_ago
+
+    def conditional_headers(self, existing_internship):
+        """
+        Формирует заголовки условного запроса по валидаторам, сохраненным при прошлой загрузке.
+
+        Args:
+            existing_internship: Существующая стажировка из БД или None
+
+        Returns:
+            dict: Заголовки If-None-Match / If-Modified-Since (может быть пустым)
+        """
+        headers = {}
+        if existing_internship:
+            if existing_internship.http_etag:
+                headers['If-None-Match'] = existing_internship.http_etag
+            if existing_internship.http_last_modified:
+                headers['If-Modified-Since'] = existing_internship.http_last_modified
+        return headers
+
+    def response_validators(self, response):
+        """Возвращает валидаторы ответа для сохранения вместе со стажировкой."""
+        return {
+            'http_etag': response.headers.get('ETag'),
+            'http_last_modified': response.headers.get('Last-Modified'),
+        }
+
+    def is_not_modified(self, response, existing_internship):
+        """
+        Проверяет, что вакансия не изменилась с прошлой загрузки: сервер ответил 304
+        или ETag ответа (в том числе взятого из кеша) совпадает с сохраненным.
+        """
+        if response.status_code == 304:
+            return True
+        etag = response.headers.get('ETag')
+        return bool(existing_internship and etag and etag == existing_internship.http_etag)
+
+    def not_modified_data(self, existing_internship):
+        """Данные-маркер для create_internship: стажировку нужно только отметить как проверенную."""
+        return {'not_modified': True, 'internship': existing_internship}
+
+    def create_internships(self, items, website_obj):
+        """
+        Сохраняет пачку стажировок источника через InternshipService.bulk_create_or_update.
+
+        Returns:
+            dict: Статистика {'created', 'updated', 'unchanged', 'errors', 'results'}
+        """
+        return InternshipService.bulk_create_or_update(list(items), website_obj)
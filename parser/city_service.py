@@ -0,0 +1,108 @@
+import logging
+
+from django.db.models import Exists, OuterRef
+
+from .constants import CITY_ALIASES
+from .geo_resolver import normalize_city_name
+from .models import City, Internship
+
+logger = logging.getLogger('parser')
+
+CITY_NAME_MAX_LENGTH = 100
+
+_CANONICAL_NAMES = {normalize_city_name(city): city for city in CITY_ALIASES.values()}
+
+
+def split_city_names(value):
+    """Разбивает поле city (Habr Career отдает несколько городов через запятую) на отдельные названия."""
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(',') if part.strip()]
+
+
+def display_city_name(name):
+    """Название города для показа: официальное для известных сокращений, иначе как пришло из источника."""
+    return _CANONICAL_NAMES.get(normalize_city_name(name), name.strip())[:CITY_NAME_MAX_LENGTH]
+
+
+class CityService:
+    @staticmethod
+    def resolve_cities(names, create=True):
+        """Находит (и при необходимости создает) города по названиям в любой форме
+
+        Сокращения и варианты написания из CITY_ALIASES приводятся к
+        официальному названию при нормализации, поэтому город ищется только
+        по нормализованному названию.
+
+        Args:
+            names (iterable): Названия городов ("СПб", "Санкт-Петербург", "г. Москва")
+            create (bool): Создавать отсутствующие города
+
+        Returns:
+            dict: {нормализованное название: City}
+        """
+        wanted = {}
+        for name in names:
+            normalized = normalize_city_name(name)
+            if normalized and len(normalized) <= CITY_NAME_MAX_LENGTH:
+                wanted.setdefault(normalized, display_city_name(name))
+        if not wanted:
+            return {}
+
+        found = {city.normalized_name: city for city in City.objects.filter(normalized_name__in=wanted.keys())}
+        missing = [normalized for normalized in wanted if normalized not in found]
+
+        if missing and create:
+            City.objects.bulk_create(
+                [City(name=wanted[normalized], normalized_name=normalized) for normalized in missing],
+                ignore_conflicts=True,
+            )
+            found.update({city.normalized_name: city for city in City.objects.filter(normalized_name__in=missing)})
+            logger.info(f"Добавлены города: {', '.join(wanted[normalized] for normalized in missing)}")
+        return found
+
+    @staticmethod
+    def sync_internship_cities(city_values):
+        """Приводит связи стажировок с городами в соответствие с их полем city
+
+        Args:
+            city_values (dict): {id стажировки: значение поля city}
+        """
+        if not city_values:
+            return
+        names_by_internship = {internship_id: split_city_names(value) for internship_id, value in city_values.items()}
+        cities = CityService.resolve_cities(name for names in names_by_internship.values() for name in names)
+
+        desired = set()
+        for internship_id, names in names_by_internship.items():
+            for name in names:
+                city = cities.get(normalize_city_name(name))
+                if city is not None:
+                    desired.add((internship_id, city.id))
+
+        through = Internship.cities.through
+        existing = through.objects.filter(internship_id__in=names_by_internship.keys()).values_list('id', 'internship_id', 'city_id')
+        stale_ids = []
+        for link_id, internship_id, city_id in existing:
+            if (internship_id, city_id) in desired:
+                desired.discard((internship_id, city_id))
+            else:
+                stale_ids.append(link_id)
+        if stale_ids:
+            through.objects.filter(id__in=stale_ids).delete()
+        if desired:
+            through.objects.bulk_create(
+                [through(internship_id=internship_id, city_id=city_id) for internship_id, city_id in desired],
+                ignore_conflicts=True,
+            )
+
+    @staticmethod
+    def match_city_ids(value):
+        """Идентификаторы известных городов, перечисленных в значении фильтра"""
+        return [city.id for city in CityService.resolve_cities(split_city_names(value), create=False).values()]
+
+    @staticmethod
+    def get_city_names():
+        """Названия городов, у которых есть стажировки, для выпадающего списка"""
+        has_internships = Internship.cities.through.objects.filter(city_id=OuterRef('pk'))
+        return list(City.objects.filter(Exists(has_internships)).order_by('name').values_list('name', flat=True))
@@ -35,3 +35,58 @@ TECH_KEYWORDS = [
     'metabase', 'airtable', 'zapier'
 ]
 
+
+# Сокращения и разговорные названия городов -> официальное название
+CITY_ALIASES = {
+    'спб': 'Санкт-Петербург',
+    'питер': 'Санкт-Петербург',
+    'санкт петербург': 'Санкт-Петербург',
+    'с петербург': 'Санкт-Петербург',
+    'мск': 'Москва',
+    'екб': 'Екатеринбург',
+    'екат': 'Екатеринбург',
+    'нск': 'Новосибирск',
+    'новосиб': 'Новосибирск',
+    'нн': 'Нижний Новгород',
+    'нижний': 'Нижний Новгород',
+    'кзн': 'Казань',
+    'ростов': 'Ростов-на-Дону',
+    'краснодар': 'Краснодар',
+}
+
+
+# Альтернативные написания навыков -> название из TECH_KEYWORDS
+SKILL_ALIASES = {
+    'py': 'python',
+    'python3': 'python',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'cpp': 'c++',
+    'csharp': 'c#',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vue.js': 'vue',
+    'vuejs': 'vue',
+    'angularjs': 'angular',
+    'nextjs': 'next.js',
+    'node': 'node.js',
+    'nodejs': 'node.js',
+    'expressjs': 'express.js',
+    'postgres': 'postgresql',
+    'postgre sql': 'postgresql',
+    'ms sql': 'mssql',
+    'ms sql server': 'mssql',
+    'k8s': 'kubernetes',
+    'gitlab ci': 'gitlab ci/cd',
+    'sklearn': 'scikit-learn',
+    'apache kafka': 'kafka',
+    'apache spark': 'spark',
+    'apache airflow': 'airflow',
+    'rest api': 'rest',
+    'restful api': 'rest',
+    'powerbi': 'power bi',
+    '1с-битрикс': '1c-bitrix',
+}
+
+# Значения поля keywords, которые не являются навыками
+SKILL_STOP_WORDS = {'стажировка'}
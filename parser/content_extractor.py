@@ -0,0 +1,124 @@
+import logging
+import re
+
+from bs4 import BeautifulSoup, Comment
+from html_text import extract_text
+
+logger = logging.getLogger('parser')
+
+REMOVED_TAGS = ('script', 'style', 'noscript', 'template', 'iframe', 'svg', 'canvas', 'form', 'button',
+                'nav', 'footer', 'aside', 'select', 'input', 'dialog')
+BLOCK_TAGS = ('div', 'section', 'article', 'main', 'td', 'ul', 'ol', 'dl', 'table', 'tbody')
+TEXT_TAGS = ('p', 'li', 'pre', 'td', 'dd', 'dt', 'blockquote', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'div')
+
+NEGATIVE_RE = re.compile(
+    r'cookie|consent|gdpr|banner|footer|header|navbar|\bnav\b|menu|sidebar|breadcrumb|related|similar|'
+    r'recommend|share|social|subscribe|newsletter|comment|popup|modal|advert|\bads?\b|promo|widget|login|signup',
+    re.I,
+)
+POSITIVE_RE = re.compile(
+    r'vacanc|vakans|job|posting|career|description|content|article|\bmain\b|\bbody\b|text|detail|requirement|duties',
+    re.I,
+)
+
+MIN_PARAGRAPH_LENGTH = 25
+MIN_MAIN_CONTENT_LENGTH = 250
+SIBLING_SCORE_RATIO = 0.2
+
+
+def _class_weight(element):
+    names = ' '.join(element.get('class') or []) + ' ' + (element.get('id') or '')
+    weight = 0
+    if NEGATIVE_RE.search(names):
+        weight -= 25
+    if POSITIVE_RE.search(names):
+        weight += 25
+    return weight
+
+
+def _link_density(element, text_length):
+    if not text_length:
+        return 1.0
+    link_length = sum(len(link.get_text(' ', strip=True)) for link in element.find_all('a'))
+    return min(link_length / text_length, 1.0)
+
+
+def _remove_boilerplate(soup):
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    # Обход с конца документа: вложенные элементы удаляются раньше своих контейнеров
+    for element in reversed(soup.find_all(REMOVED_TAGS)):
+        element.decompose()
+    for element in reversed(soup.find_all(True)):
+        if element.name not in ('html', 'body', 'main', 'article') and _class_weight(element) < 0:
+            element.decompose()
+
+
+def _score_candidates(body):
+    """
+    Оценивает блоки страницы как в алгоритме Readability: каждый текстовый
+    абзац добавляет очки родителю и половину - прародителю, затем очки блока
+    умножаются на долю текста вне ссылок и поправляются по class/id.
+    """
+    scores = {}
+    nodes = {}
+    for paragraph in body.find_all(TEXT_TAGS):
+        if paragraph.name in ('div', 'span') and paragraph.find(BLOCK_TAGS + ('p',)):
+            continue
+        text = paragraph.get_text(' ', strip=True)
+        if len(text) < MIN_PARAGRAPH_LENGTH:
+            continue
+        paragraph_score = 1 + text.count(',') + text.count('.') * 0.5 + min(len(text) / 100, 3)
+        parent = paragraph.parent
+        for ancestor, share in ((parent, 1.0), (parent.parent if parent else None, 0.5)):
+            if ancestor is None or ancestor.name in ('html', '[document]'):
+                continue
+            key = id(ancestor)
+            if key not in scores:
+                nodes[key] = ancestor
+                scores[key] = _class_weight(ancestor) + (5 if ancestor.name in ('article', 'main') else 0)
+            scores[key] += paragraph_score * share
+
+    for key, node in nodes.items():
+        text_length = len(node.get_text(' ', strip=True))
+        scores[key] *= 1 - _link_density(node, text_length)
+    return scores, nodes
+
+
+def extract_main_content(html_content):
+    """
+    Выделяет из HTML-страницы основной текст вакансии без меню, подвалов,
+    баннеров cookie и списков похожих вакансий.
+
+    Returns:
+        str: Текст основного блока (с заголовком страницы и h1 в начале) или None,
+             если основной блок найти не удалось
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    page_title = soup.title.get_text(' ', strip=True) if soup.title else ''
+    headline = soup.find('h1')
+    headline = headline.get_text(' ', strip=True) if headline else ''
+
+    _remove_boilerplate(soup)
+    body = soup.body or soup
+    scores, nodes = _score_candidates(body)
+    if not scores:
+        return None
+
+    top_key = max(scores, key=scores.get)
+    top = nodes[top_key]
+    threshold = max(10, scores[top_key] * SIBLING_SCORE_RATIO)
+    parts = []
+    if top.parent is not None:
+        for sibling in top.parent.find_all(recursive=False):
+            if sibling is top or scores.get(id(sibling), 0) >= threshold:
+                parts.append(sibling)
+    if not parts:
+        parts = [top]
+
+    text = '\n'.join(extract_text(str(part)) for part in parts).strip()
+    if len(text) < MIN_MAIN_CONTENT_LENGTH:
+        return None
+
+    header = [line for line in (page_title, headline) if line and line not in text]
+    return '\n'.join(header + [text])
@@ -0,0 +1,130 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('parser')
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_LOOKAHEAD = 1
+
+
+class DetailFetchEngine:
+    """
+    Асинхронный движок загрузки деталей вакансий.
+
+    Запросы выполняются в пуле потоков через общий HttpClient, частоту
+    запросов к хосту регулирует его AdaptiveRateLimiter, а asyncio
+    ограничивает число одновременных запросов к источнику
+    (settings.CRAWLER_DETAIL_CONCURRENCY).
+    """
+
+    def __init__(self, host, concurrency=None):
+        self.host = host
+        limits = getattr(settings, 'CRAWLER_DETAIL_CONCURRENCY', {})
+        self.concurrency = max(1, concurrency or limits.get(host, DEFAULT_CONCURRENCY))
+
+    def fetch_all(self, items, fetch_fn):
+        """
+        Выполняет fetch_fn для каждого элемента с ограниченной параллельностью.
+
+        Args:
+            items (list): Элементы для загрузки (например, вакансии из выдачи)
+            fetch_fn (callable): Синхронная функция, получающая элемент и возвращающая результат
+
+        Returns:
+            list: Результаты в порядке входных элементов; None для элементов с ошибкой
+        """
+        items = list(items)
+        if not items:
+            return []
+        started = time.monotonic()
+        results = _run_coroutine(self._fetch_all(items, fetch_fn))
+        elapsed = time.monotonic() - started
+        logger.info(f"DetailFetchEngine({self.host}): загружено {sum(1 for r in results if r is not None)}/{len(items)} "
+                    f"за {elapsed:.2f} с (параллельность {self.concurrency})")
+        return results
+
+    async def _fetch_all(self, items, fetch_fn):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency,
+                                                   thread_name_prefix=f'fetch-{self.host}') as executor:
+            async def run_one(index, item):
+                async with semaphore:
+                    try:
+                        return await loop.run_in_executor(executor, fetch_fn, item)
+                    except Exception as e:
+                        logger.error(f"DetailFetchEngine({self.host}): ошибка при загрузке элемента #{index}: {e}")
+                        return None
+
+            return await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items)))
+
+
+def _run_coroutine(coro):
+    """Запускает корутину из синхронного кода, в том числе из потока с работающим event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class PagePrefetcher:
+    """
+    Упреждающая загрузка страниц поисковой выдачи.
+
+    Пока вызывающий код обрабатывает страницу N (проверки в БД, загрузка деталей),
+    следующие страницы (не больше lookahead, settings.CRAWLER_PAGE_LOOKAHEAD) уже
+    загружаются в фоновом потоке. last_page_fn(page, result) сообщает номер последней
+    страницы, чтобы не запрашивать страницы за концом выдачи.
+    """
+
+    def __init__(self, host, fetch_page, last_page_fn=None, lookahead=None):
+        self.host = host
+        self.fetch_page = fetch_page
+        self.last_page_fn = last_page_fn
+        lookaheads = getattr(settings, 'CRAWLER_PAGE_LOOKAHEAD', {})
+        self.lookahead = max(0, lookahead if lookahead is not None else lookaheads.get(host, DEFAULT_LOOKAHEAD))
+        self.last_page = None
+        self.stats = {'prefetched': 0, 'used': 0}
+        self._futures = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, self.lookahead),
+                                                               thread_name_prefix=f'prefetch-{host}')
+
+    def get(self, page):
+        """Возвращает результат страницы page и ставит в очередь загрузку следующих."""
+        future = self._futures.pop(page, None)
+        if future is not None:
+            self.stats['used'] += 1
+        else:
+            future = self._executor.submit(self.fetch_page, page)
+        result = future.result()
+
+        if self.last_page_fn:
+            self.last_page = self.last_page_fn(page, result)
+        for next_page in range(page + 1, page + 1 + self.lookahead):
+            if self.last_page is not None and next_page > self.last_page:
+                break
+            if next_page not in self._futures:
+                self._futures[next_page] = self._executor.submit(self.fetch_page, next_page)
+                self.stats['prefetched'] += 1
+        return result
+
+    def close(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False)
+        if self.stats['prefetched']:
+            logger.info(f"PagePrefetcher({self.host}): упреждающе загружено страниц {self.stats['prefetched']}, "
+                        f"из них использовано {self.stats['used']}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,195 @@
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .constants import CITY_ALIASES
+from .models import GeoArea
+
+logger = logging.getLogger('parser')
+
+DEFAULT_RELOAD_INTERVAL = 60 * 60
+
+
+def normalize_city_name(name):
+    """
+    Приводит название города к виду для сравнения: нижний регистр, ё -> е,
+    дефисы и повторяющиеся пробелы -> один пробел, без префикса "г.",
+    с заменой известных сокращений ("СПб", "Мск") на официальное название.
+    """
+    if not name:
+        return ''
+    normalized = name.strip().lower().replace('ё', 'е')
+    normalized = re.sub(r'^(г\.|г |город )\s*', '', normalized)
+    normalized = re.sub(r'[\s\-‐–—]+', ' ', normalized).strip(' .,')
+    alias = _NORMALIZED_ALIASES.get(normalized)
+    return alias if alias is not None else normalized
+
+
+def _normalize_plain(name):
+    normalized = name.strip().lower().replace('ё', 'е')
+    return re.sub(r'[\s\-‐–—]+', ' ', normalized).strip(' .,')
+
+
+_NORMALIZED_ALIASES = {_normalize_plain(alias): _normalize_plain(city) for alias, city in CITY_ALIASES.items()}
+
+
+class GeoResolver:
+    """
+    Разрешение названия города в идентификатор региона HeadHunter, Habr Career и SuperJob.
+
+    Справочники регионов HH (/areas) и SuperJob (/towns) хранятся в таблице GeoArea
+    и обновляются планировщиком (refresh). Habr Career не отдает полный справочник,
+    поэтому его регионы сохраняются по мере первых обращений к подсказкам (remember).
+    В памяти процесса держится словарь {источник: {нормализованное название: id}},
+    который перечитывается из БД раз в settings.GEO_INDEX_RELOAD_INTERVAL секунд.
+    """
+
+    def __init__(self, reload_interval=None):
+        self.reload_interval = reload_interval or getattr(settings, 'GEO_INDEX_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL)
+        self._index = {}
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, source, city_name):
+        """
+        Возвращает идентификатор региона источника для города или None.
+
+        Args:
+            source (str): 'hh', 'habr' или 'superjob'
+            city_name (str): Название города в любой форме ("СПб", "санкт-петербург")
+        """
+        normalized = normalize_city_name(city_name)
+        if not normalized:
+            return None
+        index = self._get_index(source)
+        if not index and source in REMOTE_LOADERS:
+            logger.info(f"GeoResolver: справочник регионов {source} пуст, выполняется первичная загрузка")
+            self.refresh([source])
+            index = self._get_index(source)
+        return index.get(normalized)
+
+    def remember(self, source, city_name, external_id, name=None):
+        """Сохраняет найденное соответствие города и региона источника."""
+        normalized = normalize_city_name(city_name)
+        if not normalized or not external_id:
+            return
+        GeoArea.objects.update_or_create(
+            source=source,
+            external_id=str(external_id),
+            defaults={'name': name or city_name, 'normalized_name': normalize_city_name(name or city_name)},
+        )
+        with self._lock:
+            index = self._index.setdefault(source, {})
+            index[normalized] = str(external_id)
+            if name:
+                index.setdefault(normalize_city_name(name), str(external_id))
+
+    def refresh(self, sources=None):
+        """
+        Загружает справочники регионов из API источников и заменяет ими записи в БД.
+
+        Args:
+            sources (list): Источники для обновления (по умолчанию все, у которых есть полный справочник)
+
+        Returns:
+            dict: Количество загруженных регионов по источникам
+        """
+        counts = {}
+        for source in sources or REMOTE_LOADERS.keys():
+            loader = REMOTE_LOADERS.get(source)
+            if not loader:
+                continue
+            try:
+                areas = loader()
+            except Exception as e:
+                logger.error(f"GeoResolver: ошибка при загрузке справочника регионов {source}: {e}", exc_info=True)
+                continue
+            if not areas:
+                logger.warning(f"GeoResolver: справочник регионов {source} пуст, существующие записи сохранены")
+                continue
+
+            unique_areas = {}
+            for external_id, name in areas:
+                unique_areas.setdefault(str(external_id), name)
+            with transaction.atomic():
+                GeoArea.objects.filter(source=source).delete()
+                GeoArea.objects.bulk_create([
+                    GeoArea(source=source, external_id=external_id, name=name, normalized_name=normalize_city_name(name))
+                    for external_id, name in unique_areas.items()
+                ], batch_size=1000)
+            with self._lock:
+                self._loaded_at.pop(source, None)
+            counts[source] = len(unique_areas)
+            logger.info(f"GeoResolver: справочник регионов {source} обновлен, {len(unique_areas)} записей")
+        return counts
+
+    def _get_index(self, source):
+        now = time.monotonic()
+        with self._lock:
+            loaded_at = self._loaded_at.get(source)
+            if loaded_at is not None and now - loaded_at < self.reload_interval:
+                return self._index.get(source, {})
+
+        index = {}
+        rows = GeoArea.objects.filter(source=source).order_by('id').values_list('normalized_name', 'external_id')
+        for normalized_name, external_id in rows.iterator(chunk_size=2000):
+            index.setdefault(normalized_name, external_id)
+        with self._lock:
+            self._index[source] = index
+            self._loaded_at[source] = now
+        return index
+
+
+def _load_hh_areas():
+    from .hh_api_parser import HeadHunterAPI
+
+    response = HeadHunterAPI().make_authenticated_request('https://api.hh.ru/areas')
+    if not response or response.status_code != 200:
+        logger.error(f"Ошибка при получении списка регионов HeadHunter: {response.status_code if response else 'Нет ответа'}")
+        return []
+
+    areas = []
+    stack = list(reversed(response.json()))
+    while stack:
+        area = stack.pop()
+        if area.get('id') and area.get('name'):
+            areas.append((area['id'], area['name']))
+        stack.extend(reversed(area.get('areas') or []))
+    return areas
+
+
+def _load_superjob_towns():
+    from .superjob_parser import SuperJobParser
+
+    response_data = SuperJobParser().make_request('towns/', params={'all': 1})
+    if not response_data:
+        return []
+    return [(town['id'], town['title']) for town in response_data.get('objects', []) if town.get('id') and town.get('title')]
+
+
+REMOTE_LOADERS = {
+    'hh': _load_hh_areas,
+    'superjob': _load_superjob_towns,
+}
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_geo_resolver():
+    """Возвращает общий экземпляр GeoResolver."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = GeoResolver()
+    return _resolver
+
+
+def refresh_geo_index():
+    """Задача планировщика: обновляет справочники регионов источников."""
+    return get_geo_resolver().refresh()
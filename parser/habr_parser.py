@@ -1,7 +1,5 @@
 import requests
 import logging
-import time
-import random
 import json
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
@@ -10,6 +8,11 @@ from .base_parser import BaseParser
 from .models import Internship, Website
 from bs4 import BeautifulSoup
 from .internship_service import InternshipService
+from .http_client import get_http_client
+from .fetch_engine import DetailFetchEngine, PagePrefetcher
+from .geo_resolver import get_geo_resolver
+from .pipeline import CrawlPipeline
+from .reconciliation import CrawlCoverage, ReconciliationService
 
 logger = logging.getLogger('parser')
 
@@ -23,25 +26,31 @@ class HabrCareerParser(BaseParser):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*'
         }
+        self.http = get_http_client()
 
-    def _make_request(self, url, params=None, method='get', data=None, max_retries=3, is_json=True):
+    def _make_request(self, url, params=None, method='get', data=None, max_retries=3, is_json=True,
+                      extra_headers=None, return_response=False):
         retry_count = 0
         current_headers = self.headers.copy()
         if not is_json:
             current_headers['Accept'] = 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7'
+        if extra_headers:
+            current_headers.update(extra_headers)
 
         while retry_count <= max_retries:
             try:
                 if method.lower() == 'get':
-                    response = requests.get(url, params=params, headers=current_headers, timeout=15)
+                    response = self.http.get(url, params=params, headers=current_headers, timeout=15)
                 elif method.lower() == 'post':
-                    response = requests.post(url, json=data if is_json else data, headers=current_headers, params=params, timeout=15)
+                    response = self.http.post(url, json=data if is_json else data, headers=current_headers, params=params, timeout=15)
                 else:
                     logger.error(f"Неподдерживаемый метод запроса: {method}")
                     return None
 
                 response.raise_for_status()
 
+                if return_response:
+                    return response
                 if is_json:
                     return response.json()
                 else:
@@ -56,9 +65,7 @@ class HabrCareerParser(BaseParser):
 
             retry_count += 1
             if retry_count <= max_retries:
-                delay = random.uniform(1, 3) * (2 ** (retry_count -1))
-                logger.info(f"Повторный запрос к {url} через {delay:.2f} секунд... (Попытка {retry_count}/{max_retries})")
-                time.sleep(delay)
+                logger.info(f"Повторный запрос к {url} (Попытка {retry_count}/{max_retries})")
             else:
                 logger.error(f"Превышено максимальное количество попыток ({max_retries}) для запроса к {url}")
                 return None
@@ -69,6 +76,18 @@ class HabrCareerParser(BaseParser):
             logger.warning("Название города не указано для поиска ID региона HabrCareer.")
             return None
 
+        resolver = get_geo_resolver()
+        area_id = resolver.resolve('habr', city_name)
+        if area_id:
+            logger.info(f"ID региона HabrCareer '{area_id}' для города '{city_name}' найден в справочнике.")
+            return area_id
+
+        area_id, title = self._lookup_area_id_remote(city_name)
+        if area_id:
+            resolver.remember('habr', city_name, area_id, title)
+        return area_id
+
+    def _lookup_area_id_remote(self, city_name):
         url = f"{self.BASE_API_URL}/suggestions/locations"
         params = {'term': city_name}
 
@@ -81,19 +100,19 @@ class HabrCareerParser(BaseParser):
                     area_id = suggestion.get('value')
                     if area_id:
                         logger.info(f"Найден точный ID региона HabrCareer '{area_id}' для города '{city_name}'.")
-                        return area_id
+                        return area_id, suggestion.get('title')
 
             logger.info(f"Точное совпадение для города '{city_name}' не найдено, используется первое предложение.")
             first_suggestion = response_data['list'][0]
             area_id = first_suggestion.get('value')
             if area_id:
                 logger.info(f"Найден ID региона HabrCareer '{area_id}' для города '{city_name}' (первое предложение).")
-                return area_id
+                return area_id, first_suggestion.get('title')
             else:
                 logger.warning(f"Не удалось извлечь ID региона ('value') из первого предложения для города '{city_name}'. Предложение: {first_suggestion}")
         else:
             logger.warning(f"Ключ 'list' не найден или список пуст в ответе API для города '{city_name}' от HabrCareer. Ответ: {response_data}")
-        return None
+        return None, None
 
     def search_internships(self, keywords_query=None, area_id=None, page=0, per_page=25):
         url = f"{self.BASE_API_URL}/vacancies"
@@ -123,81 +142,148 @@ class HabrCareerParser(BaseParser):
         logger.error(f"Ошибка разбора ответа search_internships от HabrCareer или пустые данные. Параметры: {params}, Ответ: {str(response_data)[:200]}")
         return {'items': [], 'found': 0, 'pages': 0, 'per_page': per_page, 'page': page}
 
-    def get_all_internships(self, keywords_query=None, area_id=None, max_pages=10, per_page=25, website_obj=None):
-        all_vacancies = []
+    def get_all_internships(self, keywords_query=None, area_id=None, max_pages=10, per_page=25, website_obj=None, async_details=True):
+        return list(self.iter_internships(keywords_query=keywords_query, area_id=area_id, max_pages=max_pages,
+                                          per_page=per_page, website_obj=website_obj, async_details=async_details))
+
+    def iter_internships(self, keywords_query=None, area_id=None, max_pages=10, per_page=25, website_obj=None, async_details=True, coverage=None):
+        """
+        Постранично выдает данные стажировок вместе с загруженными деталями.
+        В coverage (CrawlCoverage) записываются все вакансии выдачи и признак полного обхода.
+        """
+        found_count = 0
         current_page = 0
         max_results_cap = 500
 
         if per_page > 25:
             logger.warning(f"HabrCareer per_page установлено значение {per_page}. Стандартное значение 25. API может не поддерживать это.")
 
-        while True:
-            if current_page >= max_pages:
-                logger.info(f"Достигнуто максимальное количество страниц ({max_pages}) для HabrCareer.")
-                break
-            if len(all_vacancies) >= max_results_cap:
-                logger.info(f"Достигнут лимит ({max_results_cap}) на количество результатов для HabrCareer.")
-                break
+        def fetch_page(page_number):
+            logger.info(f"Загрузка стажировок с HabrCareer: страница {page_number + 1}")
+            return self.search_internships(keywords_query, area_id, page_number, per_page)
 
-            logger.info(f"Загрузка стажировок с HabrCareer: страница {current_page + 1}")
-            result = self.search_internships(keywords_query, area_id, current_page, per_page)
-
-            if result and result.get('items'):
-                for vacancy_item in result['items']:
-                    basic_data = self.convert_to_internship_data(vacancy_item, full_description=None)
-
-                    existing = None
-                    if website_obj and basic_data.get('external_id'):
-                        from .internship_service import InternshipService
-                        existing = InternshipService.get_existing_by_external_id(basic_data['external_id'], website_obj)
-
-                    if not existing or (website_obj and InternshipService.should_update_internship(existing)):
-                        if basic_data.get('url'):
-                            logger.info(f"Загрузка полного описания для вакансии {basic_data.get('title')}...")
-                            parsed_details = self.parse_vacancy_details_html(basic_data['url'])
-                            
-                            if parsed_details:
-                                if parsed_details.get('description'):
-                                    basic_data['description'] = parsed_details['description']
-                                else:
-                                    logger.warning(f"Не удалось получить описание для вакансии {basic_data.get('title')}. Будет использовано краткое описание.")
-                                    if not basic_data.get('description'): 
-                                        basic_data['description'] = "Описание не найдено"
-
-                                if parsed_details.get('company_name') and not basic_data.get('company'):
-                                    basic_data['company'] = parsed_details['company_name']
-                                    logger.info(f"Название компании '{parsed_details['company_name']}' для вакансии '{basic_data.get('title')}' было взято из HTML.")
-                                elif parsed_details.get('company_name') and basic_data.get('company') and parsed_details.get('company_name') != basic_data.get('company'):
-                                    logger.info(f"Название компании из API ('{basic_data.get('company')}') и HTML ('{parsed_details['company_name']}') для '{basic_data.get('title')}' различаются. Приоритет у API.")
-
-                                all_vacancies.append(basic_data)
-                            else:
-                                logger.warning(f"Не удалось получить HTML-детали для вакансии {basic_data.get('title')}. Будет использовано краткое описание.")
-                                if not basic_data.get('description'):
-                                    basic_data['description'] = "Описание не найдено"
-                                all_vacancies.append(basic_data)
+        def last_page(page_number, result):
+            if not result or not result.get('items'):
+                return page_number
+            return min(result.get('pages', 0), max_pages) - 1
+
+        with PagePrefetcher('career.habr.com', fetch_page, last_page) as prefetcher:
+            while True:
+                if current_page >= max_pages:
+                    logger.info(f"Достигнуто максимальное количество страниц ({max_pages}) для HabrCareer.")
+                    break
+                if found_count >= max_results_cap:
+                    logger.info(f"Достигнут лимит ({max_results_cap}) на количество результатов для HabrCareer.")
+                    break
+
+                result = prefetcher.get(current_page)
+
+                if result and result.get('items'):
+                    page_vacancies = []
+                    page_data = [self.convert_to_internship_data(vacancy_item, full_description=None) for vacancy_item in result['items']]
+                    if coverage is not None:
+                        coverage.add_page(basic_data.get('external_id') for basic_data in page_data)
+                    existing_map = InternshipService.get_existing_map([basic_data.get('external_id') for basic_data in page_data], website_obj)
+                    for basic_data in page_data:
+                        existing = None
+                        if website_obj and basic_data.get('external_id'):
+                            existing = existing_map.get(basic_data['external_id'])
+
+                        if not existing or (website_obj and InternshipService.should_update_internship(existing)):
+                            page_vacancies.append((basic_data, existing))
                         else:
-                            logger.warning(f"URL не найден для вакансии {basic_data.get('title')}, пропускаем загрузку полного описания.")
-                            all_vacancies.append(basic_data)
-                    else:
-                        logger.info(f"Пропуск обновления для вакансии {basic_data.get('title')} - обновлена недавно")
+                            logger.info(f"Пропуск обновления для вакансии {basic_data.get('title')} - обновлена недавно")
 
-                total_api_pages = result.get('pages', 0)
+                    for vacancy_data in self._load_details(page_vacancies, async_details):
+                        found_count += 1
+                        yield vacancy_data
 
-                if (current_page + 1) >= total_api_pages:
-                    logger.info("Достигнута последняя страница результатов HabrCareer.")
+                    total_api_pages = result.get('pages', 0)
+
+                    if (current_page + 1) >= total_api_pages:
+                        logger.info("Достигнута последняя страница результатов HabrCareer.")
+                        if coverage is not None:
+                            coverage.mark_complete(result.get('found', 0), total_api_pages * result.get('per_page', per_page))
+                        break
+                    current_page += 1
+                else:
+                    logger.warning(f"Не найдено вакансий на странице {current_page + 1} HabrCareer или ошибка в ответе.")
+                    if current_page == 0 and not found_count:
+                        logger.error("Не удалось получить стажировки с HabrCareer при первой попытке.")
                     break
-                current_page += 1
-            else:
-                logger.warning(f"Не найдено вакансий на странице {current_page + 1} HabrCareer или ошибка в ответе.")
-                if current_page == 0 and not all_vacancies:
-                    logger.error("Не удалось получить стажировки с HabrCareer при первой попытке.")
-                break
 
-            time.sleep(random.uniform(1.0, 2.5))
+        logger.info(f"Завершена загрузка с HabrCareer. Всего найдено стажировок: {found_count}")
+
+    def _load_details(self, vacancies, async_details=True):
+        """
+        Загружает HTML-детали для вакансий страницы и дополняет ими краткие данные.
+
+        Args:
+            vacancies (list): Пары (краткие данные вакансии, существующая стажировка или None)
+        """
+        with_url = [item for item in vacancies if item[0].get('url')]
+        for basic_data, _ in vacancies:
+            if not basic_data.get('url'):
+                logger.warning(f"URL не найден для вакансии {basic_data.get('title')}, пропускаем загрузку полного описания.")
+
+        if async_details:
+            engine = DetailFetchEngine('career.habr.com')
+            details = engine.fetch_all(with_url, lambda item: self._fetch_details(*item))
+        else:
+            details = []
+            for basic_data, existing in with_url:
+                logger.info(f"Загрузка полного описания для вакансии {basic_data.get('title')}...")
+                details.append(self._fetch_details(basic_data, existing))
+        details_by_url = {basic_data['url']: parsed for (basic_data, _), parsed in zip(with_url, details)}
+
+        results = []
+        for basic_data, existing in vacancies:
+            parsed_details = details_by_url.get(basic_data['url']) if basic_data.get('url') else None
+            if parsed_details and parsed_details.get('not_modified'):
+                results.append(parsed_details)
+                continue
+            if basic_data.get('url'):
+                self._merge_details(basic_data, parsed_details)
+                if parsed_details:
+                    basic_data['http_etag'] = parsed_details.get('http_etag')
+                    basic_data['http_last_modified'] = parsed_details.get('http_last_modified')
+            results.append(basic_data)
+        return results
+
+    def _fetch_details(self, basic_data, existing=None):
+        """Условно загружает страницу вакансии; если она не изменилась, разбор HTML пропускается."""
+        vacancy_url = basic_data['url']
+        logger.info(f"Загрузка HTML для деталей вакансии с: {vacancy_url}")
+        response = self._make_request(vacancy_url, is_json=False, return_response=True,
+                                      extra_headers=self.conditional_headers(existing))
+        if response is None:
+            logger.error(f"Не удалось загрузить HTML контент для {vacancy_url}")
+            return {'description': None, 'company_name': None}
+        if self.is_not_modified(response, existing):
+            logger.info(f"Вакансия {vacancy_url} не изменилась с прошлой загрузки, разбор пропущен")
+            return self.not_modified_data(existing)
+        parsed_data = self._parse_vacancy_html(vacancy_url, response.text)
+        parsed_data.update(self.response_validators(response))
+        return parsed_data
 
-        logger.info(f"Завершена загрузка с HabrCareer. Всего найдено стажировок: {len(all_vacancies)}")
-        return all_vacancies
+    def _merge_details(self, basic_data, parsed_details):
+        if parsed_details:
+            if parsed_details.get('description'):
+                basic_data['description'] = parsed_details['description']
+            else:
+                logger.warning(f"Не удалось получить описание для вакансии {basic_data.get('title')}. Будет использовано краткое описание.")
+                if not basic_data.get('description'):
+                    basic_data['description'] = "Описание не найдено"
+
+            if parsed_details.get('company_name') and not basic_data.get('company'):
+                basic_data['company'] = parsed_details['company_name']
+                logger.info(f"Название компании '{parsed_details['company_name']}' для вакансии '{basic_data.get('title')}' было взято из HTML.")
+            elif parsed_details.get('company_name') and basic_data.get('company') and parsed_details.get('company_name') != basic_data.get('company'):
+                logger.info(f"Название компании из API ('{basic_data.get('company')}') и HTML ('{parsed_details['company_name']}') для '{basic_data.get('title')}' различаются. Приоритет у API.")
+        else:
+            logger.warning(f"Не удалось получить HTML-детали для вакансии {basic_data.get('title')}. Будет использовано краткое описание.")
+            if not basic_data.get('description'):
+                basic_data['description'] = "Описание не найдено"
 
     def parse_vacancy_details_html(self, vacancy_url):
         logger.info(f"Загрузка HTML для деталей вакансии с: {vacancy_url}")
@@ -205,7 +291,9 @@ class HabrCareerParser(BaseParser):
         if not html_content:
             logger.error(f"Не удалось загрузить HTML контент для {vacancy_url}")
             return {'description': None, 'company_name': None}
+        return self._parse_vacancy_html(vacancy_url, html_content)
 
+    def _parse_vacancy_html(self, vacancy_url, html_content):
         soup = BeautifulSoup(html_content, 'html.parser')
         parsed_data = {'description': None, 'company_name': None}
         cleaned_desc_json_ld = None
@@ -400,12 +488,9 @@ class HabrCareerParser(BaseParser):
         if isinstance(data, Internship):
             return data, data.id is None
 
-        valid_keys = {f.name for f in Internship._meta.get_fields()}
-        internship_data = {k: v for k, v in data.items() if k in valid_keys}
+        return InternshipService.create_or_update(data, website_obj)
 
-        return InternshipService.create_or_update(internship_data, website_obj)
-
-def fetch_habr_career_internships(keywords_query=None, city_name=None, max_pages=5, location_id=None, website_obj=None, **kwargs):
+def fetch_habr_career_internships(keywords_query=None, city_name=None, max_pages=5, location_id=None, website_obj=None, async_details=True, search_query_id=None, **kwargs):
     logger.info(f"Запуск поиска стажировок на Habr Career с ключевыми словами '{keywords_query}' и городом '{city_name}'")
 
     parser = HabrCareerParser()
@@ -420,18 +505,24 @@ def fetch_habr_career_internships(keywords_query=None, city_name=None, max_pages
     if not location_id and city_name:
         location_id = parser.get_area_id_by_city(city_name)
 
-    vacancies_data = parser.get_all_internships(
+    coverage = CrawlCoverage()
+    vacancies_data = parser.iter_internships(
         keywords_query=keywords_query,
         area_id=location_id,
         max_pages=max_pages,
-        website_obj=website_obj
+        website_obj=website_obj,
+        async_details=async_details,
+        coverage=coverage
     )
+    pipeline = CrawlPipeline(
+        'Habr Career',
+        lambda vacancy_data: parser.create_internship(vacancy_data, website_obj),
+        save_batch_fn=lambda batch: parser.create_internships(batch, website_obj)
+    )
+    stats = pipeline.run(vacancies_data)
+    if not stats['crawl_error']:
+        stats['archived'] = ReconciliationService.reconcile(website_obj, search_query_id, coverage)
 
-    processed_internships = []
-    for vacancy_data in vacancies_data:
-        internship, created = parser.create_internship(vacancy_data, website_obj)
-        if internship:
-            processed_internships.append(internship)
-
-    logger.info(f"Завершено получение стажировок с Habr Career. Обработано {len(processed_internships)} стажировок.")
-    return processed_internships
+    logger.info(f"Завершено получение стажировок с Habr Career. Обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок.")
+    parser.http.log_stats(hosts={'career.habr.com'})
+    return stats
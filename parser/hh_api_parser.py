@@ -3,16 +3,18 @@ import logging
 import os
 import re
 import json
-import random
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.conf import settings
-import time
 from .constants import TECH_KEYWORDS
 from .base_parser import BaseParser
 from .models import Internship, Website
 from .internship_service import InternshipService
-from django.db import transaction
+from .http_client import get_http_client
+from .fetch_engine import DetailFetchEngine, PagePrefetcher
+from .geo_resolver import get_geo_resolver
+from .pipeline import CrawlPipeline
+from .reconciliation import CrawlCoverage, ReconciliationService
 
 logger = logging.getLogger('parser')
 
@@ -23,6 +25,7 @@ class HeadHunterAPI(BaseParser):
         super().__init__()
         self.token = token or settings.HH_API_TOKEN or os.getenv('HH_API_TOKEN')
         self.host = host
+        self.http = get_http_client()
 
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -60,15 +63,16 @@ class HeadHunterAPI(BaseParser):
                 return False
         return False
 
-    def make_authenticated_request(self, url, params=None, method='get', data=None, max_retries=2):
+    def make_authenticated_request(self, url, params=None, method='get', data=None, max_retries=2, extra_headers=None):
         retry_count = 0
+        headers = dict(self.headers, **(extra_headers or {}))
 
         while retry_count <= max_retries:
             try:
                 if method.lower() == 'get':
-                    response = requests.get(url, params=params, headers=self.headers)
+                    response = self.http.get(url, params=params, headers=headers)
                 elif method.lower() == 'post':
-                    response = requests.post(url, params=params, data=data, headers=self.headers)
+                    response = self.http.post(url, params=params, data=data, headers=headers)
                 else:
                     logger.error(f"Неподдерживаемый метод запроса: {method}")
                     return None
@@ -83,7 +87,6 @@ class HeadHunterAPI(BaseParser):
                 retry_count += 1
                 if retry_count <= max_retries:
                     logger.info(f"Повторная попытка запроса #{retry_count}")
-                    time.sleep(2)
                 else:
                     logger.error(f"Превышено максимальное количество попыток ({max_retries})")
                     return None
@@ -152,21 +155,7 @@ class HeadHunterAPI(BaseParser):
             return None
         try:
             logger.info(f"Поиск ID региона для города: {city_name}")
-            response = self.make_authenticated_request('https://api.hh.ru/areas')
-            if not response or response.status_code != 200:
-                logger.error(f"Ошибка при получении списка регионов: {response.status_code if response else 'Нет ответа'}")
-                return None
-            areas_data = response.json()
-            def search_area_by_name(areas, search_name):
-                for area in areas:
-                    if area.get('name', '').lower() == search_name.lower():
-                        return area.get('id')
-                    if area.get('areas'):
-                        result = search_area_by_name(area.get('areas'), search_name)
-                        if result:
-                            return result
-                return None
-            area_id = search_area_by_name(areas_data, city_name)
+            area_id = get_geo_resolver().resolve('hh', city_name)
             if area_id:
                 logger.info(f"Найден ID региона для города {city_name}: {area_id}")
                 return area_id
@@ -177,131 +166,163 @@ class HeadHunterAPI(BaseParser):
             logger.error(f"Ошибка при получении ID региона по названию города '{city_name}': {str(e)}")
             return None
 
-    def get_all_internships(self, keywords=None, area=None, max_pages=20, website_obj=None, **kwargs):
-        all_vacancies = []
+    def get_all_internships(self, keywords=None, area=None, max_pages=20, website_obj=None, async_details=True, **kwargs):
+        return list(self.iter_internships(keywords=keywords, area=area, max_pages=max_pages, website_obj=website_obj,
+                                          async_details=async_details, **kwargs))
+
+    def iter_internships(self, keywords=None, area=None, max_pages=20, website_obj=None, async_details=True, coverage=None, **kwargs):
+        """
+        Постранично выдает данные стажировок: детали вакансий загружаются сразу после
+        отбора вакансий страницы, не дожидаясь обхода всей выдачи. В coverage
+        (CrawlCoverage) записываются все вакансии выдачи и признак полного обхода.
+        """
         page = 0
         if max_pages > 20:
             logger.warning("API HeadHunter ограничивает глубину результатов до 2000. Максимум 20 страниц по 100 вакансий.")
             max_pages = 20
-        base_delay = 5
-        max_retries = 3
-
-        vacancies_to_process = []
-
-        while True:
-            retries = 0
-            success = False
-            while not success and retries <= max_retries:
-                logger.info(f"Загрузка стажировок с HeadHunter: страница {page+1}")
-                result = self.search_internships(keywords, area, page, per_page=100, **kwargs)
-                if result.get('error_403'):
-                    if retries < max_retries:
-                        retries += 1
-                        retry_delay = base_delay * (2 ** retries)
-                        jitter = random.uniform(0.7, 1.3)
-                        actual_delay = retry_delay * jitter
-                        logger.warning(f"Получен код 403 при запросе страницы {page+1}. Повторная попытка через {actual_delay:.2f} секунд...")
-                        time.sleep(actual_delay)
-                    else:
-                        logger.error(f"Не удалось получить данные со страницы {page+1} после {max_retries} попыток из-за ошибки 403")
-                        success = True
-                elif not result or not result.get('items'):
-                    logger.warning(f"Не удалось получить данные со страницы {page+1} или страница пуста")
-                    success = True
-                else:
-                    success = True
-            if result.get('error_403') or not result or not result.get('items'):
-                if page == 0:
-                    logger.error("Не удалось получить ни одной стажировки с HeadHunter")
-                break
-
-            for vacancy in result['items']:
-                basic_info = {
-                    'external_id': vacancy.get('id'),
-                    'title': vacancy.get('name', 'Не указано'),
-                    'company': vacancy.get('employer', {}).get('name', 'Не указано'),
-                    'url': vacancy.get('alternate_url', f"https://hh.ru/vacancy/{vacancy.get('id')}")
-                }
-
-                existing = None
-                current_external_id = basic_info.get('external_id')
-
-                logger.debug(f"[Check ID: {current_external_id}] Поиск существующей записи для ID: {current_external_id} (тип: {type(current_external_id)}), сайт: {website_obj.name if website_obj else 'None'}")
-
-                if website_obj and current_external_id:
-                    existing = InternshipService.get_existing_by_external_id(str(current_external_id), website_obj)
-
-                logger.debug(f"[Check ID: {current_external_id}] Результат поиска: {'Найден объект Internship' if existing else 'None'}")
-
-                should_process = False
-                if not existing:
-                    logger.debug(f"[Check ID: {current_external_id}] Причина обработки: Стажировка не найдена в БД (existing is None).")
-                    should_process = True
-                elif website_obj:
-                    needs_update = InternshipService.should_update_internship(existing)
-                    if needs_update:
-                        logger.debug(f"[Check ID: {current_external_id}] Причина обработки: Требуется обновление (should_update_internship вернуло True).")
-                        last_updated = existing.updated_at.strftime('%Y-%m-%d %H:%M:%S') if existing.updated_at else 'None'
-                        seven_days_ago = (timezone.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
-                        logger.debug(f"[Check ID: {current_external_id}] Дата последнего обновления: {last_updated}, порог: {seven_days_ago}")
+        selected_count = 0
+        detailed_count = 0
+
+        def last_page(page_number, result):
+            if not result or result.get('error_403') or not result.get('items'):
+                return page_number
+            return min(result.get('pages', 0), max_pages) - 1
+
+        prefetcher = PagePrefetcher(
+            'api.hh.ru',
+            lambda page_number: self._fetch_search_page(keywords, area, page_number, **kwargs),
+            last_page
+        )
+        with prefetcher:
+            while True:
+                result = prefetcher.get(page)
+                if result.get('error_403') or not result or not result.get('items'):
+                    if page == 0:
+                        logger.error("Не удалось получить ни одной стажировки с HeadHunter")
+                    break
+
+                vacancies_to_process = []
+                if coverage is not None:
+                    coverage.add_page(vacancy.get('id') for vacancy in result['items'])
+                existing_map = InternshipService.get_existing_map([vacancy.get('id') for vacancy in result['items']], website_obj)
+                for vacancy in result['items']:
+                    basic_info = {
+                        'external_id': vacancy.get('id'),
+                        'title': vacancy.get('name', 'Не указано'),
+                        'company': vacancy.get('employer', {}).get('name', 'Не указано'),
+                        'url': vacancy.get('alternate_url', f"https://hh.ru/vacancy/{vacancy.get('id')}")
+                    }
+
+                    existing = None
+                    current_external_id = basic_info.get('external_id')
+
+                    logger.debug(f"[Check ID: {current_external_id}] Поиск существующей записи для ID: {current_external_id} (тип: {type(current_external_id)}), сайт: {website_obj.name if website_obj else 'None'}")
+
+                    if website_obj and current_external_id:
+                        existing = existing_map.get(str(current_external_id))
+
+                    logger.debug(f"[Check ID: {current_external_id}] Результат поиска: {'Найден объект Internship' if existing else 'None'}")
+
+                    should_process = False
+                    if not existing:
+                        logger.debug(f"[Check ID: {current_external_id}] Причина обработки: Стажировка не найдена в БД (existing is None).")
                         should_process = True
+                    elif website_obj:
+                        needs_update = InternshipService.should_update_internship(existing)
+                        if needs_update:
+                            logger.debug(f"[Check ID: {current_external_id}] Причина обработки: Требуется обновление (should_update_internship вернуло True).")
+                            last_updated = existing.updated_at.strftime('%Y-%m-%d %H:%M:%S') if existing.updated_at else 'None'
+                            seven_days_ago = (timezone.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+                            logger.debug(f"[Check ID: {current_external_id}] Дата последнего обновления: {last_updated}, порог: {seven_days_ago}")
+                            should_process = True
+                        else:
+                             logger.debug(f"[Check ID: {current_external_id}] Пропуск: Не требуется обновление (should_update_internship вернуло False).")
+                             last_updated = existing.updated_at.strftime('%Y-%m-%d %H:%M:%S') if existing.updated_at else 'None'
+                             logger.debug(f"[Check ID: {current_external_id}] Дата последнего обновления: {last_updated}, обновление не требуется.")
                     else:
-                         logger.debug(f"[Check ID: {current_external_id}] Пропуск: Не требуется обновление (should_update_internship вернуло False).")
-                         last_updated = existing.updated_at.strftime('%Y-%m-%d %H:%M:%S') if existing.updated_at else 'None'
-                         logger.debug(f"[Check ID: {current_external_id}] Дата последнего обновления: {last_updated}, обновление не требуется.")
-                else:
-                    logger.warning(f"[Check ID: {current_external_id}] Пропуск: Не передан website_obj для проверки should_update_internship.")
-
-                if should_process:
-                    vacancies_to_process.append(vacancy)
-                else:
-                    logger.info(f"Пропуск обновления для вакансии {basic_info.get('title')} (ID: {current_external_id}) - обновлена недавно или не требует обновления")
-
-            logger.info(f"Обработано {len(result['items'])} стажировок с страницы {page+1}, из них для детального парсинга отобрано {len(vacancies_to_process) - len(all_vacancies)}")
-
-            total_pages = result.get('pages', 0)
-            logger.info(f"Всего доступно страниц: {total_pages}")
-            if page >= total_pages - 1 or page >= max_pages - 1:
-                logger.info(f"Достигнут конец данных или ограничение на количество страниц")
-                break
-            page += 1
-            jitter = random.uniform(0.8, 1.2)
-            delay = base_delay * jitter
-            logger.info(f"Ожидание {delay:.2f} секунд перед следующим запросом...")
-            time.sleep(delay)
-
-        logger.info(f"Всего отобрано {len(vacancies_to_process)} стажировок для детального парсинга")
+                        logger.warning(f"[Check ID: {current_external_id}] Пропуск: Не передан website_obj для проверки should_update_internship.")
 
+                    if should_process:
+                        vacancies_to_process.append((vacancy, existing))
+                    else:
+                        logger.info(f"Пропуск обновления для вакансии {basic_info.get('title')} (ID: {current_external_id}) - обновлена недавно или не требует обновления")
+
+                logger.info(f"Обработано {len(result['items'])} стажировок с страницы {page+1}, из них для детального парсинга отобрано {len(vacancies_to_process)}")
+                selected_count += len(vacancies_to_process)
+                for internship_data in self._load_details(vacancies_to_process, async_details):
+                    detailed_count += 1
+                    yield internship_data
+
+                total_pages = result.get('pages', 0)
+                logger.info(f"Всего доступно страниц: {total_pages}")
+                if page >= total_pages - 1 or page >= max_pages - 1:
+                    logger.info(f"Достигнут конец данных или ограничение на количество страниц")
+                    if coverage is not None and page >= total_pages - 1:
+                        coverage.mark_complete(result.get('found', 0), total_pages * result.get('per_page', 100))
+                    break
+                page += 1
+
+        logger.info(f"Успешно получены детали {detailed_count} стажировок из {selected_count} отобранных")
+
+    def _load_details(self, vacancies_to_process, async_details=True):
+        """Загружает детали отобранных вакансий страницы."""
         detailed_vacancies = []
-        for i, vacancy in enumerate(vacancies_to_process):
-            try:
-                logger.info(f"Получение деталей вакансии {i+1}/{len(vacancies_to_process)}: {vacancy.get('id')}")
-                vacancy_details = self.parse_vacancy_details(vacancy.get('id'))
-                internship_data = self.convert_to_internship_data(vacancy_details)
-                if internship_data:
-                    detailed_vacancies.append(internship_data)
-
-                if i < len(vacancies_to_process) - 1:
-                    delay = random.uniform(1.0, 2.0)
-                    time.sleep(delay)
-            except Exception as e:
-                logger.error(f"Ошибка при обработке вакансии {vacancy.get('id')}: {str(e)}")
-
-        logger.info(f"Успешно получены детали {len(detailed_vacancies)} стажировок из {len(vacancies_to_process)} отобранных")
+        if async_details:
+            engine = DetailFetchEngine('api.hh.ru')
+            results = engine.fetch_all(vacancies_to_process, lambda item: self._fetch_internship_data(*item))
+            detailed_vacancies = [internship_data for internship_data in results if internship_data]
+        else:
+            for i, (vacancy, existing) in enumerate(vacancies_to_process):
+                try:
+                    logger.info(f"Получение деталей вакансии {i+1}/{len(vacancies_to_process)}: {vacancy.get('id')}")
+                    internship_data = self._fetch_internship_data(vacancy, existing)
+                    if internship_data:
+                        detailed_vacancies.append(internship_data)
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке вакансии {vacancy.get('id')}: {str(e)}")
         return detailed_vacancies
 
+    def _fetch_search_page(self, keywords, area, page, max_retries=3, **kwargs):
+        """Загружает страницу выдачи, повторяя запрос при ответе 403 (паузы задает ограничитель частоты)."""
+        retries = 0
+        while True:
+            logger.info(f"Загрузка стажировок с HeadHunter: страница {page+1}")
+            result = self.search_internships(keywords, area, page, per_page=100, **kwargs)
+            if result.get('error_403'):
+                if retries < max_retries:
+                    retries += 1
+                    logger.warning(f"Получен код 403 при запросе страницы {page+1}. Повторная попытка #{retries} после паузы ограничителя частоты...")
+                    continue
+                logger.error(f"Не удалось получить данные со страницы {page+1} после {max_retries} попыток из-за ошибки 403")
+            elif not result or not result.get('items'):
+                logger.warning(f"Не удалось получить данные со страницы {page+1} или страница пуста")
+            return result
+
+    def _fetch_internship_data(self, vacancy, existing=None):
+        response = self._request_vacancy_details(vacancy.get('id'), self.conditional_headers(existing))
+        if self.is_not_modified(response, existing):
+            logger.info(f"Вакансия {vacancy.get('id')} не изменилась с прошлой загрузки, разбор пропущен")
+            return self.not_modified_data(existing)
+        internship_data = self.convert_to_internship_data(response.json())
+        if internship_data:
+            internship_data.update(self.response_validators(response))
+        return internship_data
+
     def parse_vacancy_details(self, vacancy_id):
+        return self._request_vacancy_details(vacancy_id).json()
+
+    def _request_vacancy_details(self, vacancy_id, extra_headers=None):
         try:
             logger.info(f"Запрос детальной информации о вакансии {vacancy_id}")
             url = f'https://api.hh.ru/vacancies/{vacancy_id}'
-            response = self.make_authenticated_request(url)
+            response = self.make_authenticated_request(url, extra_headers=extra_headers)
             if not response:
                 logger.error(f"Ошибка при получении деталей вакансии {vacancy_id}: нет ответа")
                 raise Exception(f"Ошибка при получении деталей вакансии: нет ответа")
-            if response.status_code != 200:
+            if response.status_code not in (200, 304):
                 logger.error(f"Ошибка при получении деталей вакансии {vacancy_id}: {response.status_code} - {response.text}")
                 raise Exception(f"Ошибка при получении деталей вакансии: {response.status_code}")
-            return response.json()
+            return response
         except Exception as e:
             logger.error(f"Ошибка при получении деталей вакансии {vacancy_id}: {str(e)}")
             raise
@@ -368,16 +389,15 @@ class HeadHunterAPI(BaseParser):
             logger.info(f"Возвращаем существующий объект Internship: {data.title} (ID: {data.id})")
             return data, False
 
-        valid_keys = {f.name for f in Internship._meta.get_fields()}
-        internship_data = {k: v for k, v in data.items() if k in valid_keys}
-
-        return InternshipService.create_or_update(internship_data, website_obj)
+        return InternshipService.create_or_update(data, website_obj)
 
 def fetch_hh_internships(keywords=None, area=None, city=None, **kwargs):
     client = HeadHunterAPI()
     logger.info(f"Запуск парсинга стажировок с HeadHunter с параметрами: keywords={keywords}, city={city}")
 
     website_obj = kwargs.pop('website_obj', None)
+    async_details = kwargs.pop('async_details', True)
+    search_query_id = kwargs.pop('search_query_id', None)
     if not website_obj:
         website_obj, _ = Website.objects.get_or_create(
             name="HeadHunter",
@@ -389,18 +409,18 @@ def fetch_hh_internships(keywords=None, area=None, city=None, **kwargs):
         if not area:
             logger.warning(f"Не удалось найти ID региона для города '{city}'. Поиск будет выполнен без фильтрации по региону.")
 
-    vacancies = client.get_all_internships(keywords=keywords, area=area, website_obj=website_obj, **kwargs)
-    logger.info(f"Получено {len(vacancies)} стажировок с HeadHunter")
-
-    processed_internships = []
-    for internship_data in vacancies:
-        try:
-            with transaction.atomic():
-                internship, created = client.create_internship(internship_data, website_obj)
-                if internship:
-                    processed_internships.append(internship)
-        except Exception as e:
-            logger.error(f"Ошибка при обработке данных стажировки (данные: {str(internship_data)[:200]}...): {e}", exc_info=True)
-
-    logger.info(f"Завершено получение стажировок с HeadHunter. Обработано {len(processed_internships)} стажировок.")
-    return processed_internships
+    coverage = CrawlCoverage()
+    vacancies = client.iter_internships(keywords=keywords, area=area, website_obj=website_obj,
+                                        async_details=async_details, coverage=coverage, **kwargs)
+    pipeline = CrawlPipeline(
+        'HeadHunter',
+        lambda internship_data: client.create_internship(internship_data, website_obj),
+        save_batch_fn=lambda batch: client.create_internships(batch, website_obj)
+    )
+    stats = pipeline.run(vacancies)
+    if not stats['crawl_error']:
+        stats['archived'] = ReconciliationService.reconcile(website_obj, search_query_id, coverage)
+
+    logger.info(f"Завершено получение стажировок с HeadHunter. Обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок.")
+    client.http.log_stats(hosts={'api.hh.ru'})
+    return stats
@@ -0,0 +1,197 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .rate_limiter import AdaptiveRateLimiter
+from .response_cache import ResponseCache
+
+logger = logging.getLogger('parser')
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 15
+CONDITIONAL_HEADERS = ('if-none-match', 'if-modified-since')
+
+
+class HttpClient:
+    """
+    Общий HTTP-транспорт для парсеров HeadHunter, Habr Career и SuperJob.
+
+    Держит одну requests.Session с отдельным пулом keep-alive соединений для
+    каждого хоста источника (размер пула задается в settings.HTTP_POOL_SIZES),
+    согласовывает сжатие ответа, отдает повторные GET-запросы из дискового
+    ResponseCache, ограничивает частоту запросов к каждому хосту
+    через AdaptiveRateLimiter и собирает статистику по хостам:
+    сколько соединений открыто, сколько запросов прошло по уже открытым
+    соединениям и сколько байт получено по сети.
+    """
+
+    def __init__(self, pool_sizes=None, timeout=DEFAULT_TIMEOUT, limiter=None, cache=None):
+        self.pool_sizes = pool_sizes if pool_sizes is not None else getattr(settings, 'HTTP_POOL_SIZES', {})
+        self.timeout = timeout
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.cache = cache
+        if self.cache is None and getattr(settings, 'HTTP_CACHE_ENABLED', False):
+            self.cache = ResponseCache()
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self._adapters = {}
+        self._bytes = {}
+        self._lock = threading.Lock()
+
+        default_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=DEFAULT_POOL_SIZE)
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+        self._adapters['*'] = default_adapter
+
+        for host, pool_size in self.pool_sizes.items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount(f'https://{host}/', adapter)
+            self._adapters[host] = adapter
+            logger.debug(f"HttpClient: пул соединений для {host} размером {pool_size}")
+
+    def request(self, method, url, **kwargs):
+        """
+        Выполняет запрос через общий пул соединений.
+
+        Args:
+            method (str): HTTP-метод ('get', 'post')
+            url (str): Адрес запроса
+            **kwargs: Параметры requests (params, headers, json, data, timeout)
+
+        Условные запросы (с If-None-Match или If-Modified-Since) не читаются из
+        кеша: вызывающий проверяет у сервера, изменилась ли страница, и ответ
+        из кеша мог бы быть старше сохраненной версии.
+
+        Returns:
+            requests.Response: Ответ сервера (у ответа из кеша атрибут from_cache=True)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        conditional = any(name.lower() in CONDITIONAL_HEADERS for name in (kwargs.get('headers') or {}))
+        if self.cache and not conditional:
+            cached = self.cache.get(method, url, kwargs.get('params'))
+            if cached is not None:
+                logger.debug(f"HttpClient: ответ для {cached.url} взят из кеша")
+                return cached
+
+        host = urlparse(url).hostname or 'unknown'
+        self.limiter.acquire(host)
+        try:
+            response = self.session.request(method.upper(), url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.limiter.record_failure(host)
+            raise
+        self.limiter.record(host, response.status_code, response.headers.get('Retry-After'))
+        self._record_bytes(response)
+        if self.cache:
+            self.cache.put(method, url, kwargs.get('params'), response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('post', url, **kwargs)
+
+    def _record_bytes(self, response):
+        host = urlparse(response.url or '').hostname or 'unknown'
+        wire_bytes = None
+        try:
+            response.content
+            wire_bytes = response.raw.tell()
+        except Exception:
+            pass
+        if not wire_bytes:
+            try:
+                wire_bytes = int(response.headers.get('Content-Length', 0))
+            except (TypeError, ValueError):
+                wire_bytes = 0
+        if not wire_bytes:
+            wire_bytes = len(response.content or b'')
+        with self._lock:
+            stats = self._bytes.setdefault(host, {'wire_bytes': 0, 'decoded_bytes': 0})
+            stats['wire_bytes'] += wire_bytes
+            stats['decoded_bytes'] += len(response.content or b'')
+
+    def get_stats(self):
+        """
+        Возвращает статистику по хостам.
+
+        Returns:
+            dict: {host: {'requests', 'connections_opened', 'connections_reused',
+                          'wire_bytes', 'decoded_bytes'}}
+        """
+        stats = {}
+        for adapter in self._adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {
+                    'requests': 0,
+                    'connections_opened': 0,
+                    'connections_reused': 0,
+                    'wire_bytes': 0,
+                    'decoded_bytes': 0,
+                })
+                host_stats['requests'] += pool.num_requests
+                host_stats['connections_opened'] += pool.num_connections
+                host_stats['connections_reused'] += max(pool.num_requests - pool.num_connections, 0)
+        with self._lock:
+            for host, byte_stats in self._bytes.items():
+                host_stats = stats.setdefault(host, {
+                    'requests': 0,
+                    'connections_opened': 0,
+                    'connections_reused': 0,
+                    'wire_bytes': 0,
+                    'decoded_bytes': 0,
+                })
+                host_stats.update(byte_stats)
+        return stats
+
+    def log_stats(self, hosts=None):
+        for host, host_stats in self.get_stats().items():
+            if hosts and host not in hosts:
+                continue
+            logger.info(
+                f"HTTP статистика {host}: запросов {host_stats['requests']}, "
+                f"соединений открыто {host_stats['connections_opened']}, "
+                f"переиспользовано {host_stats['connections_reused']}, "
+                f"байт по сети {host_stats['wire_bytes']} (после распаковки {host_stats['decoded_bytes']}), "
+                f"текущий лимит {self.limiter.get_rates().get(host, '-')} запр/с"
+            )
+        if self.cache:
+            cache_stats = self.cache.get_stats()
+            logger.info(
+                f"HTTP кеш: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']} "
+                f"(hit rate {cache_stats['hit_rate']}), сохранено {cache_stats['stores']}, "
+                f"вытеснено {cache_stats['evictions']}, отдано из кеша {cache_stats['bytes_served']} байт"
+            )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Возвращает общий для всех парсеров экземпляр HttpClient."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -1,11 +1,36 @@
 import hashlib
 import logging
+from collections import namedtuple
 from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
+from .city_service import CityService
 from .models import Internship
+from .skill_service import SkillService
+from .stats_service import StatsService
 
 logger = logging.getLogger('parser')
 
+UPSERT_FIELDS = {
+    field.name for field in Internship._meta.concrete_fields
+    if field.name not in ('id', 'source_website', 'created_at', 'updated_at', 'content_hash',
+                          'search_vector', 'is_archived', 'auto_archived', 'last_seen_at', 'archived_at',
+                          'missing_since')
+}
+# Значения, которыми заменяются отсутствующие в данных источника NOT NULL поля
+# (пустая строка, как и при создании стажировки без этих полей)
+NOT_NULL_DEFAULTS = {
+    field.name: field.get_default() for field in Internship._meta.concrete_fields
+    if field.name in UPSERT_FIELDS and not field.null
+}
+COMPARED_FIELDS = (
+    'salary', 'selection_start_date', 'selection_end_date', 'duration', 'employment_type',
+    'city', 'keywords', 'url', 'http_etag', 'http_last_modified',
+)
+
+ExistingInternship = namedtuple('ExistingInternship', ['id', 'updated_at', 'http_etag', 'http_last_modified'])
+
 class InternshipService:
     @staticmethod
     def is_duplicate(internship_data, website):
@@ -64,6 +89,32 @@ class InternshipService:
             source_website=website
         ).first()
     
+    @staticmethod
+    def get_existing_map(external_ids, website):
+        """Одним запросом получает уже сохраненные стажировки страницы выдачи
+
+        Args:
+            external_ids (iterable): Внешние идентификаторы вакансий страницы
+            website (Website): Объект сайта-источника
+
+        Returns:
+            dict: {external_id: ExistingInternship(id, updated_at, http_etag, http_last_modified)}
+        """
+        external_ids = {str(external_id) for external_id in external_ids if external_id}
+        if not external_ids or not website:
+            return {}
+
+        rows = Internship.objects.filter(
+            source_website=website,
+            external_id__in=external_ids
+        ).values_list('external_id', 'id', 'updated_at', 'http_etag', 'http_last_modified')
+        return {row[0]: ExistingInternship(*row[1:]) for row in rows}
+
+    @staticmethod
+    def needs_refresh(updated_at):
+        """Проверяет по дате последнего обновления, что стажировку пора обновить (прошло более 7 дней)"""
+        return updated_at is None or updated_at <= timezone.now() - timedelta(days=7)
+
     @staticmethod
     def should_update_internship(existing_internship):
         """Проверяет, нужно ли обновлять информацию о стажировке
@@ -79,7 +130,7 @@ class InternshipService:
             return True
             
         seven_days_ago = timezone.now() - timedelta(days=7)
-        needs_update = existing_internship.updated_at <= seven_days_ago
+        needs_update = InternshipService.needs_refresh(existing_internship.updated_at)
         
         if needs_update:
             logger.debug(f"should_update_internship: Требуется обновление, последнее обновление {existing_internship.updated_at} раньше порога {seven_days_ago}")
@@ -99,80 +150,246 @@ class InternshipService:
         Returns:
             tuple: (Internship, bool) - объект стажировки и флаг создания новой
         """
-        existing = InternshipService.is_duplicate(internship_data, website)
-        
-        if existing:
-            new_external_id = internship_data.get('external_id')
-            
-            if new_external_id and not existing.external_id:
-                logger.info(f"Обновление external_id для стажировки (ID: {existing.id}): {new_external_id}")
-                existing.external_id = new_external_id
-            
-            for key, value in internship_data.items():
-                if key == 'source_website':
-                    continue
-                if key == 'external_id' and value and existing.external_id and value != existing.external_id:
-                    logger.warning(f"Конфликт external_id: существующий {existing.external_id}, новый {value} для стажировки ID: {existing.id}")
-                    continue
-                elif hasattr(existing, key) and value is not None:
-                    setattr(existing, key, value)
-            
-            content = f"{existing.title}|{existing.company}|{existing.position}|{existing.description}"
-            new_hash = hashlib.sha256(content.encode()).hexdigest()
-            if existing.content_hash != new_hash:
-                existing.content_hash = new_hash
-                
-            existing.save()
-            logger.info(f"Обновлена существующая стажировка (ID: {existing.id}): {existing.title} ({existing.company})")
-            return existing, False
-        else:
-            if 'external_id' in internship_data and not internship_data['external_id']:
-                del internship_data['external_id']
-
-            required_fields = ['title']
-            for field in required_fields:
-                if field not in internship_data or not internship_data[field]:
-                     logger.error(f"Невозможно создать стажировку, отсутствует обязательное поле: {field}. Данные: {internship_data}")
-                     return None, False
-
-            temp_internship = Internship(**internship_data, source_website=website)
-            content = f"{temp_internship.title}|{temp_internship.company}|{temp_internship.position}|{temp_internship.description}"
-            content_hash = hashlib.sha256(content.encode()).hexdigest()
-            
-            duplicates = Internship.objects.filter(
-                content_hash=content_hash,
-                source_website=website
-            ).exclude(external_id=internship_data.get('external_id'))
-            
-            if duplicates.exists():
-                duplicate_count = duplicates.count()
-                duplicate_ids = list(duplicates.values_list('id', flat=True))
-                logger.warning(f"Найдено {duplicate_count} стажировок с одинаковым хешем. Удаляем дубликаты с ID: {duplicate_ids}")
-                duplicates.delete()
-                logger.info(f"Удалено {duplicate_count} дубликатов стажировок с хешем {content_hash[:10]}...")
-            
-            new_internship = Internship(**internship_data, source_website=website)
-            new_internship.content_hash = content_hash
-            try:
-                new_internship.save()
-                logger.info(f"Создана новая стажировка (ID: {new_internship.id}): {new_internship.title} ({new_internship.company})")
-                return new_internship, True
-            except Exception as e:
-                if "unique constraint" in str(e) and "content_hash" in str(e):
-                    try:
-                        existing_by_hash = Internship.objects.get(content_hash=content_hash, source_website=website)
-                        logger.warning(f"Конфликт при сохранении: найдена другая стажировка с таким же хешем (ID: {existing_by_hash.id})")
-                        
-                        for key, value in internship_data.items():
-                            if key != 'source_website' and hasattr(existing_by_hash, key) and value is not None:
-                                setattr(existing_by_hash, key, value)
-                        
-                        existing_by_hash.save()
-                        logger.info(f"Обновлена существующая стажировка вместо создания новой (ID: {existing_by_hash.id})")
-                        return existing_by_hash, False
-                    except Exception as inner_e:
-                        logger.error(f"Не удалось обработать конфликт хешей: {str(inner_e)}")
-                        raise
+        result = InternshipService.bulk_create_or_update([internship_data], website)
+        internship, item_status = result['results'][0]
+        return internship, item_status == 'created'
+
+    @staticmethod
+    def bulk_create_or_update(items, website):
+        """Создает или обновляет пачку стажировок несколькими запросами
+
+        Стажировки сопоставляются с базой по уникальной паре (source_website, external_id),
+        а для источников без идентификатора - по (source_website, content_hash).
+        Новые и измененные записи сохраняются через INSERT ... ON CONFLICT DO UPDATE,
+        у неизменившихся только обновляется updated_at. У всех записей пачки
+        обновляется last_seen_at - по нему задача архивации находит вакансии,
+        которые краулеры давно не встречали, а архивные записи, снова найденные
+        в выдаче, возвращаются из архива. Стажировки другого external_id
+        с тем же содержимым удаляются как дубликаты.
+
+        Args:
+            items (list): Данные стажировок (dict), маркеры not_modified или объекты Internship
+            website (Website): Объект сайта-источника
+
+        Returns:
+            dict: {'created', 'updated', 'unchanged', 'errors', 'results'}, где results -
+                  список пар (Internship или None, статус) в порядке входных данных
+        """
+        stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0, 'results': [(None, 'error')] * len(items)}
+        now = timezone.now()
+        prepared = {}
+        keys_by_index = {}
+        key_by_hash = {}
+        touched = {}
+
+        seen_instances = []
+        for index, item in enumerate(items):
+            if isinstance(item, Internship):
+                seen_instances.append(item.id)
+                stats['results'][index] = (item, 'unchanged')
+                stats['unchanged'] += 1
+                continue
+            if not item:
+                stats['errors'] += 1
+                continue
+            if item.get('not_modified'):
+                touched[index] = item['internship']
+                continue
+
+            # Все поля заполняются, даже если источник их не прислал: значение,
+            # которое пропало у источника (например, зарплата), должно очиститься
+            data = {field: item.get(field) for field in UPSERT_FIELDS}
+            for field, default in NOT_NULL_DEFAULTS.items():
+                if data[field] is None:
+                    data[field] = default
+            data['external_id'] = str(data['external_id']) if data.get('external_id') else None
+            if not data.get('title'):
+                logger.error(f"Невозможно создать стажировку, отсутствует обязательное поле: title. Данные: {str(item)[:200]}")
+                stats['errors'] += 1
+                continue
+            data['content_hash'] = Internship.compute_content_hash(
+                data.get('title', ''), data.get('company', ''), data.get('position', ''), data.get('description', '')
+            )
+
+            key = ('external_id', data['external_id']) if data['external_id'] else ('content_hash', data['content_hash'])
+            same_content_key = key_by_hash.get(data['content_hash'])
+            if same_content_key is not None and same_content_key != key:
+                logger.warning(f"В пачке найдены стажировки с одинаковым содержимым ({same_content_key[1]} и {key[1]}), сохраняется последняя")
+                prepared.pop(same_content_key, None)
+                for other_index, other_key in keys_by_index.items():
+                    if other_key == same_content_key:
+                        keys_by_index[other_index] = key
+            key_by_hash[data['content_hash']] = key
+            prepared[key] = data
+            keys_by_index[index] = key
+
+        if seen_instances:
+            Internship.objects.filter(id__in=seen_instances).update(last_seen_at=now)
+        if touched:
+            Internship.objects.filter(id__in=[existing.id for existing in touched.values()]).update(updated_at=now, last_seen_at=now)
+            for index, existing in touched.items():
+                stats['results'][index] = (existing, 'unchanged')
+            stats['unchanged'] += len(touched)
+
+        if not prepared:
+            InternshipService.revive_archived(seen_instances + [existing.id for existing in touched.values()])
+            return stats
+
+        external_ids = [key[1] for key in prepared if key[0] == 'external_id']
+        hashes = [data['content_hash'] for data in prepared.values()]
+        existing_rows = Internship.objects.filter(source_website=website).filter(
+            Q(external_id__in=external_ids) | Q(content_hash__in=hashes)
+        ).values('id', 'external_id', 'content_hash', *COMPARED_FIELDS)
+        by_external_id = {}
+        by_hash = {}
+        for row in existing_rows:
+            if row['external_id']:
+                by_external_id[row['external_id']] = row
+            by_hash[row['content_hash']] = row
+
+        to_upsert = []
+        unchanged_ids = []
+        adopted = []
+        collisions = set()
+        target_ids = set()
+        status_by_key = {}
+        for key, data in prepared.items():
+            target = by_external_id.get(data['external_id']) if data['external_id'] else None
+            same_content = by_hash.get(data['content_hash'])
+            if target is None and same_content is not None:
+                if data['external_id'] and same_content['external_id']:
+                    collisions.add(same_content['id'])
                 else:
-                    logger.error(f"Ошибка при сохранении новой стажировки: {str(e)}")
-                    raise 
\ No newline at end of file
+                    target = same_content
+                    if data['external_id']:
+                        adopted.append((same_content['id'], data['external_id']))
+            elif target is not None and same_content is not None and same_content['id'] != target['id']:
+                collisions.add(same_content['id'])
+
+            if target is None:
+                status_by_key[key] = 'created'
+                to_upsert.append(data)
+                continue
+            target_ids.add(target['id'])
+            if InternshipService._is_unchanged(target, data):
+                status_by_key[key] = 'unchanged'
+                unchanged_ids.append(target['id'])
+            else:
+                status_by_key[key] = 'updated'
+                to_upsert.append(data)
+
+        with transaction.atomic():
+            collisions -= target_ids
+            if collisions:
+                logger.warning(f"Найдены стажировки с одинаковым хешем. Удаляем дубликаты с ID: {sorted(collisions)}")
+                StatsService.adjust_for_deleted(
+                    Internship.objects.filter(id__in=collisions).values_list('source_website_id', 'is_archived')
+                )
+                Internship.objects.filter(id__in=collisions).delete()
+            for internship_id, external_id in adopted:
+                logger.info(f"Обновление external_id для стажировки (ID: {internship_id}): {external_id}")
+                Internship.objects.filter(id=internship_id).update(external_id=external_id)
+            if unchanged_ids:
+                Internship.objects.filter(id__in=unchanged_ids).update(updated_at=now, last_seen_at=now)
+            InternshipService._upsert(to_upsert, website, now)
+            StatsService.adjust(website.id, active=sum(1 for item_status in status_by_key.values() if item_status == 'created'))
+
+        saved = Internship.objects.filter(source_website=website).filter(
+            Q(external_id__in=external_ids) | Q(content_hash__in=hashes)
+        ).only('id', 'external_id', 'content_hash', 'title', 'company')
+        saved_by_external_id = {}
+        saved_by_hash = {}
+        for internship in saved:
+            if internship.external_id:
+                saved_by_external_id[internship.external_id] = internship
+            saved_by_hash[internship.content_hash] = internship
+
+        for index, key in keys_by_index.items():
+            data = prepared[key]
+            internship = saved_by_external_id.get(data['external_id']) if data['external_id'] else None
+            stats['results'][index] = (internship or saved_by_hash.get(data['content_hash']), status_by_key[key])
+        for item_status in status_by_key.values():
+            stats[item_status] += 1
+        InternshipService.revive_archived(
+            seen_instances + [existing.id for existing in touched.values()]
+            + [internship.id for internship, _ in stats['results'] if internship is not None]
+        )
+
+        city_values = {}
+        keyword_values = {}
+        for index, key in keys_by_index.items():
+            internship = stats['results'][index][0]
+            if internship is None or status_by_key[key] == 'unchanged':
+                continue
+            if 'city' in prepared[key]:
+                city_values[internship.id] = prepared[key]['city']
+            if 'keywords' in prepared[key]:
+                keyword_values[internship.id] = prepared[key]['keywords']
+        CityService.sync_internship_cities(city_values)
+        SkillService.sync_internship_skills(keyword_values)
+
+        logger.info(f"Сохранена пачка стажировок {website.name}: создано {stats['created']}, обновлено {stats['updated']}, "
+                    f"без изменений {stats['unchanged']}, ошибок {stats['errors']}")
+        return stats
+
+    @staticmethod
+    def revive_archived(internship_ids):
+        """Возвращает из архива стажировки, которые снова встретились в выдаче источника
+
+        Возвращаются только стажировки, перенесенные в архив автоматически
+        (auto_archived): архивированные пользователем остаются в архиве.
+        Стажировки с прошедшей датой окончания отбора тоже остаются в архиве:
+        задача архивации все равно перенесла бы их туда снова. Счетчики
+        источников изменяются в той же транзакции.
+
+        Args:
+            internship_ids (iterable): Идентификаторы стажировок, найденных краулером
+
+        Returns:
+            int: Количество возвращенных из архива стажировок
+        """
+        internship_ids = set(internship_ids)
+        if not internship_ids:
+            return 0
+        open_selection = Q(selection_end_date__isnull=True) | Q(selection_end_date__gte=timezone.localdate())
+        with transaction.atomic():
+            rows = list(
+                Internship.objects.select_for_update()
+                .filter(open_selection, id__in=internship_ids, is_archived=True, auto_archived=True)
+                .values_list('id', 'source_website_id')
+            )
+            if not rows:
+                return 0
+            Internship.objects.filter(id__in=[row[0] for row in rows]).update(
+                is_archived=False, auto_archived=False, archived_at=None, missing_since=None
+            )
+            deltas = {}
+            for _, website_id in rows:
+                deltas[website_id] = deltas.get(website_id, 0) + 1
+            for website_id, count in deltas.items():
+                StatsService.adjust(website_id, active=count, archived=-count)
+        logger.info(f"Из архива возвращено {len(rows)} стажировок, снова найденных в выдаче источников")
+        return len(rows)
+
+    @staticmethod
+    def _is_unchanged(row, data):
+        if row['content_hash'] != data['content_hash']:
+            return False
+        return all(row[field] == data[field] for field in COMPARED_FIELDS)
+
+    @staticmethod
+    def _upsert(items, website, now):
+        groups = {}
+        for data in items:
+            groups.setdefault(bool(data['external_id']), []).append(data)
+
+        for has_external_id, group in groups.items():
+            unique_fields = ['source_website', 'external_id'] if has_external_id else ['source_website', 'content_hash']
+            update_fields = sorted((UPSERT_FIELDS | {'content_hash'}) - set(unique_fields)) + ['updated_at', 'last_seen_at']
+            Internship.objects.bulk_create(
+                [Internship(source_website=website, updated_at=now, last_seen_at=now, **data) for data in group],
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=update_fields,
+                batch_size=500,
+            )
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import LLMCacheEntry
+from .response_cache import DiskCache
+
+logger = logging.getLogger('parser')
+
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def make_cache_key(model, prompt_version, text):
+    """Ключ кеша: sha256 от модели, версии шаблона промпта и очищенного текста страницы."""
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FileLLMStore:
+    """Хранилище ответов LLM на диске поверх DiskCache (TTL и LRU по суммарному размеру)."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.cache = DiskCache(
+            directory or getattr(settings, 'LLM_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'llm')),
+            max_bytes or getattr(settings, 'LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+        )
+
+    def get(self, key):
+        cached = self.cache.get(key)
+        if not cached:
+            return None
+        body, meta = cached
+        return json.loads(body.decode('utf-8')), meta.get('latency', 0.0)
+
+    def set(self, key, data, model, prompt_version, latency, ttl):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        meta = {'model': model, 'prompt_version': prompt_version, 'latency': latency}
+        try:
+            self.cache.set(key, body, meta, ttl)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"LLMCache: не удалось сохранить ответ в файловый кеш: {e}")
+
+    def get_stats(self):
+        stats = self.cache.get_stats()
+        return {'evictions': stats['evictions']}
+
+
+class DatabaseLLMStore:
+    """
+    Хранилище ответов LLM в таблице LLMCacheEntry: общее для всех процессов
+    приложения, с TTL и вытеснением давно не использованных записей сверх max_entries.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or getattr(settings, 'LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.evictions = 0
+
+    def get(self, key):
+        now = timezone.now()
+        try:
+            entry = LLMCacheEntry.objects.filter(key=key).values('response', 'latency', 'expires_at').first()
+            if not entry:
+                return None
+            if entry['expires_at'] <= now:
+                LLMCacheEntry.objects.filter(key=key).delete()
+                return None
+            LLMCacheEntry.objects.filter(key=key).update(accessed_at=now)
+        except DatabaseError as e:
+            logger.warning(f"LLMCache: ошибка чтения кеша из БД: {e}")
+            return None
+        return entry['response'], entry['latency']
+
+    def set(self, key, data, model, prompt_version, latency, ttl):
+        now = timezone.now()
+        try:
+            LLMCacheEntry.objects.update_or_create(key=key, defaults={
+                'model': model,
+                'prompt_version': prompt_version,
+                'response': data,
+                'size': len(json.dumps(data, ensure_ascii=False).encode('utf-8')),
+                'latency': latency,
+                'expires_at': now + timedelta(seconds=ttl),
+                'accessed_at': now,
+            })
+            self._evict(now)
+        except DatabaseError as e:
+            logger.warning(f"LLMCache: не удалось сохранить ответ в БД: {e}")
+
+    def _evict(self, now):
+        evicted, _ = LLMCacheEntry.objects.filter(expires_at__lte=now).delete()
+        stale_keys = list(
+            LLMCacheEntry.objects.order_by('-accessed_at').values_list('key', flat=True)[self.max_entries:]
+        )
+        if stale_keys:
+            evicted += LLMCacheEntry.objects.filter(key__in=stale_keys).delete()[0]
+        if evicted:
+            self.evictions += evicted
+            logger.info(f"LLMCache: из БД вытеснено {evicted} записей")
+
+    def get_stats(self):
+        return {'evictions': self.evictions}
+
+
+STORES = {
+    'file': FileLLMStore,
+    'db': DatabaseLLMStore,
+}
+
+
+class LLMCache:
+    """
+    Кеш результатов извлечения данных через LLM.
+
+    Ответ модели сохраняется по хешу (модель, версия шаблона промпта, очищенный
+    текст страницы), поэтому повторный разбор той же страницы (например,
+    предпросмотр и затем сохранение по той же ссылке) не требует запроса к LLM.
+    Изменение промпта или модели меняет ключ, и старые ответы не используются.
+    Хранилище выбирается настройкой settings.LLM_CACHE_BACKEND ('file' или 'db').
+    Считаются попадания, промахи и сэкономленное время запросов к LLM.
+    """
+
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend or getattr(settings, 'LLM_CACHE_BACKEND', 'file')
+        if self.backend not in STORES:
+            raise ValueError(f"Неизвестное хранилище кеша LLM: {self.backend}")
+        self.store = STORES[self.backend]()
+        self.ttl = ttl or getattr(settings, 'LLM_CACHE_TTL', DEFAULT_TTL)
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'saved_seconds': 0.0, 'lookup_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def get(self, model, prompt_version, text):
+        """Возвращает сохраненные данные или None."""
+        started = time.monotonic()
+        cached = self.store.get(make_cache_key(model, prompt_version, text))
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.stats['lookup_seconds'] += elapsed
+            if cached is None:
+                self.stats['misses'] += 1
+                return None
+            data, latency = cached
+            self.stats['hits'] += 1
+            self.stats['saved_seconds'] += max(latency - elapsed, 0.0)
+        logger.info(f"LLMCache: ответ взят из кеша за {elapsed * 1000:.1f} мс (запрос к LLM занял {latency:.1f} с)")
+        return data
+
+    def set(self, model, prompt_version, text, data, latency):
+        """Сохраняет данные, извлеченные LLM, и время, которое занял запрос."""
+        self.store.set(make_cache_key(model, prompt_version, text), data, model, prompt_version, latency, self.ttl)
+        with self._lock:
+            self.stats['stores'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['avg_lookup_ms'] = round(stats.pop('lookup_seconds') / lookups * 1000, 2) if lookups else 0.0
+        stats['saved_seconds'] = round(stats['saved_seconds'], 2)
+        stats['backend'] = self.backend
+        stats.update(self.store.get_stats())
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Возвращает общий экземпляр LLMCache или None, если кеш отключен настройкой LLM_CACHE_ENABLED."""
+    global _cache
+    if not getattr(settings, 'LLM_CACHE_ENABLED', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
@@ -0,0 +1,192 @@
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('parser')
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BACKGROUND: 'background',
+}
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_INTERACTIVE_RESERVED = 1
+
+
+class _Job:
+    def __init__(self, key, fn, args, priority):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.future = concurrent.futures.Future()
+        self.enqueued_at = time.monotonic()
+        self.started = False
+
+
+class LLMDispatcher:
+    """
+    Очередь запросов к LLM внутри процесса.
+
+    Запросы выполняются пулом из concurrency рабочих потоков, поэтому
+    одновременно к LLM уходит не больше concurrency запросов, сколько бы
+    потоков приложения их ни отправляло. Интерактивные запросы (предпросмотр
+    в интерфейсе) выбираются из очереди раньше фоновых, а interactive_reserved
+    потоков фоновые запросы не занимают никогда, так что предпросмотр ждет
+    не дольше одного запроса даже при полной очереди фоновой работы.
+    Одинаковые запросы (по ключу кеша LLM), которые уже ждут в очереди или
+    выполняются, не дублируются: вызывающий получает тот же Future, а
+    интерактивный повтор фонового запроса поднимает его приоритет.
+    """
+
+    def __init__(self, concurrency=None, interactive_reserved=None):
+        self.concurrency = max(1, concurrency or getattr(settings, 'LLM_MAX_CONCURRENCY', DEFAULT_CONCURRENCY))
+        reserved = interactive_reserved if interactive_reserved is not None else getattr(
+            settings, 'LLM_INTERACTIVE_RESERVED', DEFAULT_INTERACTIVE_RESERVED)
+        self.background_limit = max(1, self.concurrency - reserved)
+        self._heap = []
+        self._sequence = itertools.count()
+        self._in_flight = {}
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._cond = threading.Condition()
+        self._workers = []
+        self.stats = {
+            name: {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def submit(self, key, fn, *args, priority=PRIORITY_BACKGROUND):
+        """
+        Ставит вызов fn(*args) в очередь.
+
+        Args:
+            key (str): Ключ запроса для устранения дублей (None - без устранения)
+            fn (callable): Функция, выполняющая запрос к LLM
+            priority (int): PRIORITY_INTERACTIVE или PRIORITY_BACKGROUND
+
+        Returns:
+            concurrent.futures.Future: Результат fn
+        """
+        name = PRIORITY_NAMES[priority]
+        with self._cond:
+            self._start_workers()
+            job = self._in_flight.get(key) if key is not None else None
+            if job is not None:
+                self.stats[name]['deduplicated'] += 1
+                if priority < job.priority and not job.started:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._sequence), job))
+                    self._cond.notify_all()
+                return job.future
+
+            job = _Job(key, fn, args, priority)
+            if key is not None:
+                self._in_flight[key] = job
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self.stats[name]['submitted'] += 1
+            self._cond.notify_all()
+            return job.future
+
+    def run(self, key, fn, *args, priority=PRIORITY_BACKGROUND, timeout=None):
+        """Выполняет fn(*args) через очередь и ждет результата."""
+        return self.submit(key, fn, *args, priority=priority).result(timeout=timeout)
+
+    def _start_workers(self):
+        if self._workers:
+            return
+        for index in range(self.concurrency):
+            worker = threading.Thread(target=self._work, name=f'llm-worker-{index}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2].started:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    job = self._heap[0][2]
+                    if job.priority == PRIORITY_INTERACTIVE or self._running[PRIORITY_BACKGROUND] < self.background_limit:
+                        heapq.heappop(self._heap)
+                        job.started = True
+                        self._running[job.priority] += 1
+                        stats = self.stats[PRIORITY_NAMES[job.priority]]
+                        wait = time.monotonic() - job.enqueued_at
+                        stats['wait_seconds'] += wait
+                        stats['max_wait_seconds'] = max(stats['max_wait_seconds'], wait)
+                        return job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            try:
+                result = job.fn(*job.args)
+            except Exception as e:
+                logger.error(f"LLMDispatcher: ошибка при выполнении запроса к LLM: {e}", exc_info=True)
+                outcome = 'failed'
+                job.future.set_exception(e)
+            else:
+                outcome = 'completed'
+                job.future.set_result(result)
+            with self._cond:
+                self._running[job.priority] -= 1
+                self.stats[PRIORITY_NAMES[job.priority]][outcome] += 1
+                if job.key is not None and self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+                self._cond.notify_all()
+            close_old_connections()
+
+    def get_stats(self):
+        """
+        Возвращает метрики очереди.
+
+        Returns:
+            dict: {'concurrency', 'background_limit', 'queue_depth': {приоритет: число},
+                   'running': {приоритет: число}, приоритет: {'submitted', 'deduplicated',
+                   'completed', 'failed', 'avg_wait_ms', 'max_wait_ms'}}
+        """
+        with self._cond:
+            queue_depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for job in {id(entry[2]): entry[2] for entry in self._heap if not entry[2].started}.values():
+                queue_depth[PRIORITY_NAMES[job.priority]] += 1
+            result = {
+                'concurrency': self.concurrency,
+                'background_limit': self.background_limit,
+                'queue_depth': queue_depth,
+                'running': {PRIORITY_NAMES[priority]: count for priority, count in self._running.items()},
+            }
+            for name, stats in self.stats.items():
+                started = stats['completed'] + stats['failed'] + result['running'][name]
+                result[name] = {
+                    'submitted': stats['submitted'],
+                    'deduplicated': stats['deduplicated'],
+                    'completed': stats['completed'],
+                    'failed': stats['failed'],
+                    'avg_wait_ms': round(stats['wait_seconds'] / started * 1000, 1) if started else 0.0,
+                    'max_wait_ms': round(stats['max_wait_seconds'] * 1000, 1),
+                }
+        return result
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_llm_dispatcher():
+    """Возвращает общий для процесса экземпляр LLMDispatcher."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = LLMDispatcher()
+    return _dispatcher
@@ -4,11 +4,23 @@ import os
 import logging
 import re
 import ast
+import time
+import concurrent.futures
+import copy
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from django.conf import settings
+
+from .llm_cache import get_llm_cache, make_cache_key
+from .llm_dispatcher import PRIORITY_BACKGROUND, get_llm_dispatcher
+
 logger = logging.getLogger(__name__)
 
+# Версия шаблона промпта входит в ключ кеша ответов LLM: увеличивайте ее при любом
+# изменении prompt_template или SYSTEM_PROMPT, чтобы не использовать старые ответы
+PROMPT_VERSION = "1"
+
 prompt_template = f"""
 Извлеки информацию о вакансии/стажировке из следующего текста HTML-страницы.
 Представь результат в формате JSON со следующими полями:
@@ -38,7 +50,24 @@ YOUR_SITE_NAME = "Internship Parser"
 
 MAX_CHARS_LIMIT = 400000
 
-def parse_with_openrouter(cleaned_text):
+# Параметры разбора длинных страниц по фрагментам (см. split_text_into_chunks)
+DEFAULT_CHUNK_OVERLAP = 4000
+DEFAULT_MAX_CHUNKS = 8
+
+OPENROUTER_MODEL = "google/gemini-2.0-flash-exp:free"
+
+SYSTEM_PROMPT = "Ты являешься высококвалифицированным экспертом по извлечению структурированных данных из веб-страниц. Твоя задача — максимально точно и полно извлечь информацию о стажировках и вакансиях из предоставленного HTML-текста. Результат должен быть представлен в формате JSON. Для поля 'description' особенно важно извлечь как можно больше деталей, не упуская важные аспекты обязанностей, требований и условий. ОЧЕНЬ ВАЖНО: возвращай ТОЛЬКО валидный JSON-объект без каких-либо префиксов, суффиксов или символов markdown. Не используй тройные обратные кавычки, звездочки, маркеры списка или другие markdown-символы. Начинай ответ с символа { и заканчивай символом }. Убедись, что все ключи и значения в JSON корректны и заключены в двойные кавычки там, где это необходимо. Не добавляй никаких комментариев к JSON. Поля, для которых не найдена информация, должны иметь значение null."
+
+def parse_with_openrouter(cleaned_text, priority=PRIORITY_BACKGROUND):
+    """
+    Извлекает данные стажировки из текста страницы через OpenRouter.
+
+    Ответ берется из кеша LLM, если страница уже разбиралась, иначе запрос
+    ставится в общую очередь LLMDispatcher с приоритетом priority
+    (PRIORITY_INTERACTIVE для предпросмотра в интерфейсе). Текст длиннее
+    MAX_CHARS_LIMIT не обрезается, а делится на перекрывающиеся фрагменты,
+    которые разбираются параллельно и объединяются merge_chunk_results.
+    """
     if not OPENROUTER_API_KEY:
         logger.error("API ключ OpenRouter не настроен (OPENROUTER_API_KEY).")
         return None
@@ -46,13 +75,121 @@ def parse_with_openrouter(cleaned_text):
     original_length = len(cleaned_text)
     logger.info(f"Размер исходного текста: {original_length} символов")
 
-    if original_length > MAX_CHARS_LIMIT:
-        logger.warning(f"Текст для LLM слишком длинный ({original_length} символов), обрезаем до {MAX_CHARS_LIMIT} (Gemini 2.0 Flash имеет большой контекст).")
-        cleaned_text = cleaned_text[:MAX_CHARS_LIMIT]
-        logger.info(f"Размер текста после обрезки: {len(cleaned_text)} символов")
-    else:
+    if original_length <= MAX_CHARS_LIMIT:
         logger.info(f"Размер текста в пределах лимита модели ({original_length} < {MAX_CHARS_LIMIT})")
+        chunks = [cleaned_text]
+    elif getattr(settings, 'LLM_CHUNKED_EXTRACTION', True):
+        chunks = split_text_into_chunks(cleaned_text, MAX_CHARS_LIMIT, getattr(settings, 'LLM_CHUNK_OVERLAP', DEFAULT_CHUNK_OVERLAP))
+        max_chunks = getattr(settings, 'LLM_MAX_CHUNKS', DEFAULT_MAX_CHUNKS)
+        if len(chunks) > max_chunks:
+            logger.warning(f"Текст для LLM разбит на {len(chunks)} фрагментов, обрабатываются первые {max_chunks}")
+            chunks = chunks[:max_chunks]
+        logger.info(f"Текст для LLM слишком длинный ({original_length} символов), разбит на {len(chunks)} "
+                    f"перекрывающихся фрагментов: {[len(chunk) for chunk in chunks]}")
+    else:
+        logger.warning(f"Текст для LLM слишком длинный ({original_length} символов), обрезаем до {MAX_CHARS_LIMIT} (Gemini 2.0 Flash имеет большой контекст).")
+        chunks = [cleaned_text[:MAX_CHARS_LIMIT]]
+
+    cache = get_llm_cache()
+    futures = [_submit_extraction(chunk, cache, priority) for chunk in chunks]
+    timeout = getattr(settings, 'LLM_DISPATCH_TIMEOUT', None)
+    results = []
+    for index, future in enumerate(futures):
+        try:
+            results.append(future.result(timeout=timeout))
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Не дождались ответа OpenRouter из очереди запросов к LLM (фрагмент {index + 1}/{len(futures)})")
+            results.append(None)
+        except Exception as e:
+            logger.error(f"Ошибка при разборе фрагмента {index + 1}/{len(futures)} через OpenRouter: {e}")
+            results.append(None)
+
+    if len(results) == 1:
+        # Результат одинаковых запросов общий для всех ожидавших его потоков
+        return copy.deepcopy(results[0])
+    return merge_chunk_results(copy.deepcopy(results))
+
+def split_text_into_chunks(text, chunk_size, overlap):
+    """
+    Делит текст на фрагменты не длиннее chunk_size с перекрытием около overlap символов.
+    Границы фрагментов по возможности приходятся на переводы строк, чтобы абзац
+    на стыке целиком попадал хотя бы в один фрагмент.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+    overlap = max(0, min(overlap, chunk_size // 4))
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind('\n', start + chunk_size // 2, end)
+            if boundary != -1:
+                end = boundary + 1
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = end - overlap
+        boundary = text.find('\n', next_start, end)
+        start = boundary + 1 if boundary != -1 and boundary + 1 < end else next_start
+    return chunks
+
+def merge_chunk_results(results):
+    """
+    Объединяет ответы LLM по фрагментам текста в порядке фрагментов.
+
+    Для простых полей берется первое непустое значение (начало страницы обычно
+    содержит заголовок и компанию), описания склеиваются, а строки, уже
+    встречавшиеся в предыдущих фрагментах (перекрытие), пропускаются.
+    """
+    parsed = [result for result in results if isinstance(result, dict)]
+    if len(parsed) < len(results):
+        logger.warning(f"Не удалось разобрать {len(results) - len(parsed)} из {len(results)} фрагментов текста")
+    if not parsed:
+        return None
 
+    merged = {}
+    for result in parsed:
+        for key, value in result.items():
+            if key != 'description' and value and not merged.get(key):
+                merged[key] = value
+
+    description_lines = []
+    seen_lines = set()
+    for result in parsed:
+        for line in str(result.get('description') or '').splitlines():
+            normalized = re.sub(r'\s+', ' ', line).strip().lower()
+            if not normalized:
+                continue
+            if normalized in seen_lines:
+                continue
+            seen_lines.add(normalized)
+            description_lines.append(line.strip())
+    merged['description'] = '\n'.join(description_lines) or None
+
+    logger.info(f"Объединены ответы LLM по {len(parsed)} фрагментам, длина описания {len(merged['description'] or '')} символов")
+    return merged
+
+def _submit_extraction(cleaned_text, cache, priority):
+    """Возвращает Future с данными для текста: из кеша LLM или из очереди LLMDispatcher."""
+    if cache:
+        cached_data = cache.get(OPENROUTER_MODEL, PROMPT_VERSION, cleaned_text)
+        if cached_data is not None:
+            future = concurrent.futures.Future()
+            future.set_result(cached_data)
+            return future
+
+    dispatch_key = make_cache_key(OPENROUTER_MODEL, PROMPT_VERSION, cleaned_text)
+    return get_llm_dispatcher().submit(dispatch_key, _extract_and_cache, cleaned_text, cache, priority=priority)
+
+def _extract_and_cache(cleaned_text, cache):
+    started = time.monotonic()
+    parsed_data = _request_openrouter(cleaned_text)
+    if cache and parsed_data is not None:
+        cache.set(OPENROUTER_MODEL, PROMPT_VERSION, cleaned_text, parsed_data, time.monotonic() - started)
+    return parsed_data
+
+def _request_openrouter(cleaned_text):
     prompt_content = prompt_template.format(cleaned_text=cleaned_text)
 
     headers = {
@@ -63,11 +200,11 @@ def parse_with_openrouter(cleaned_text):
     }
 
     data_dict = {
-        "model": "google/gemini-2.0-flash-exp:free",
+        "model": OPENROUTER_MODEL,
         "messages": [
             {
                 "role": "system",
-                "content": "Ты являешься высококвалифицированным экспертом по извлечению структурированных данных из веб-страниц. Твоя задача — максимально точно и полно извлечь информацию о стажировках и вакансиях из предоставленного HTML-текста. Результат должен быть представлен в формате JSON. Для поля 'description' особенно важно извлечь как можно больше деталей, не упуская важные аспекты обязанностей, требований и условий. ОЧЕНЬ ВАЖНО: возвращай ТОЛЬКО валидный JSON-объект без каких-либо префиксов, суффиксов или символов markdown. Не используй тройные обратные кавычки, звездочки, маркеры списка или другие markdown-символы. Начинай ответ с символа { и заканчивай символом }. Убедись, что все ключи и значения в JSON корректны и заключены в двойные кавычки там, где это необходимо. Не добавляй никаких комментариев к JSON. Поля, для которых не найдена информация, должны иметь значение null."
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from parser.stats_service import StatsService
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики активных и архивных стажировок по источникам по фактическим данным."
+
+    def handle(self, *args, **options):
+        counts = StatsService.rebuild_counters()
+        for website_id, website_counts in sorted(counts.items()):
+            self.stdout.write(f"источник {website_id}: активных {website_counts['active']}, "
+                              f"архивных {website_counts['archived']}")
+        self.stdout.write(self.style.SUCCESS(f'Счетчики пересчитаны для {len(counts)} источников'))
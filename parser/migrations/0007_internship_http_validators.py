@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-16 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0006_add_special_websites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internship',
+            name='http_etag',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='ETag страницы вакансии'),
+        ),
+        migrations.AddField(
+            model_name='internship',
+            name='http_last_modified',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Last-Modified страницы вакансии'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-16 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0007_internship_http_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('hh', 'HeadHunter'), ('habr', 'Habr Career'), ('superjob', 'SuperJob')], max_length=20, verbose_name='Источник')),
+                ('external_id', models.CharField(max_length=50, verbose_name='Идентификатор региона в источнике')),
+                ('name', models.CharField(max_length=255, verbose_name='Название')),
+                ('normalized_name', models.CharField(max_length=255, verbose_name='Нормализованное название')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Регион источника',
+                'verbose_name_plural': 'Регионы источников',
+                'indexes': [models.Index(fields=['source', 'normalized_name'], name='geoarea_source_name_idx')],
+                'unique_together': {('source', 'external_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-16 11:30
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_external_id_duplicates(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    duplicates = (
+        Internship.objects.exclude(external_id__isnull=True)
+        .values('source_website_id', 'external_id')
+        .annotate(rows=Count('id'), keep_id=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        Internship.objects.filter(
+            source_website_id=duplicate['source_website_id'],
+            external_id=duplicate['external_id'],
+        ).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0008_geoarea'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_external_id_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='internship',
+            constraint=models.UniqueConstraint(fields=('source_website', 'external_id'), name='internship_source_external_id_uniq'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.2 on 2026-10-16 12:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION parser_internship_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    primary_text text := coalesce(NEW.title, '');
+    secondary_text text := coalesce(NEW.position, '') || ' ' || coalesce(NEW.keywords, '');
+    company_text text := coalesce(NEW.company, '');
+    description_text text := coalesce(NEW.description, '');
+BEGIN
+    primary_text := translate(primary_text, 'ёЁ', 'еЕ');
+    secondary_text := translate(secondary_text, 'ёЁ', 'еЕ');
+    company_text := translate(company_text, 'ёЁ', 'еЕ');
+    description_text := translate(description_text, 'ёЁ', 'еЕ');
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', primary_text), 'A') ||
+        setweight(to_tsvector('english', primary_text), 'A') ||
+        setweight(to_tsvector('russian', secondary_text), 'B') ||
+        setweight(to_tsvector('english', secondary_text), 'B') ||
+        setweight(to_tsvector('simple', company_text), 'C') ||
+        setweight(to_tsvector('russian', description_text), 'D') ||
+        setweight(to_tsvector('english', description_text), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS parser_internship_search_vector_trigger ON parser_internship;
+CREATE TRIGGER parser_internship_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, position, keywords, company, description
+    ON parser_internship
+    FOR EACH ROW EXECUTE FUNCTION parser_internship_search_vector_update();
+"""
+
+
+def create_search_vector_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SEARCH_VECTOR_FUNCTION)
+    schema_editor.execute(SEARCH_VECTOR_TRIGGER)
+    schema_editor.execute("UPDATE parser_internship SET title = title")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS internship_search_vector_gin ON parser_internship USING gin (search_vector)"
+    )
+
+
+def drop_search_vector_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS internship_search_vector_gin")
+    schema_editor.execute("DROP TRIGGER IF EXISTS parser_internship_search_vector_trigger ON parser_internship")
+    schema_editor.execute("DROP FUNCTION IF EXISTS parser_internship_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0009_internship_source_external_id_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internship',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_vector_trigger, drop_search_vector_trigger),
+    ]
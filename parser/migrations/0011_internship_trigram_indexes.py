@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-16 12:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Условия icontains в PostgreSQL строятся как UPPER("поле"::text) LIKE UPPER(...),
+# поэтому индексы построены по тому же выражению
+TRIGRAM_INDEXES = {
+    'internship_title_trgm': 'title',
+    'internship_company_trgm': 'company',
+    'internship_city_trgm': 'city',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON parser_internship '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0010_internship_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
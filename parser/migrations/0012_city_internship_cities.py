@@ -0,0 +1,122 @@
+# Generated by Django 5.1.2 on 2026-10-16 13:00
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Копия parser.constants.CITY_ALIASES на момент миграции: миграция не должна
+# зависеть от кода приложения, который может измениться позже
+CITY_ALIASES = {
+    'спб': 'Санкт-Петербург',
+    'питер': 'Санкт-Петербург',
+    'санкт петербург': 'Санкт-Петербург',
+    'с петербург': 'Санкт-Петербург',
+    'мск': 'Москва',
+    'екб': 'Екатеринбург',
+    'екат': 'Екатеринбург',
+    'нск': 'Новосибирск',
+    'новосиб': 'Новосибирск',
+    'нн': 'Нижний Новгород',
+    'нижний': 'Нижний Новгород',
+    'кзн': 'Казань',
+    'ростов': 'Ростов-на-Дону',
+    'краснодар': 'Краснодар',
+}
+
+
+def normalize_plain(name):
+    normalized = name.strip().lower().replace('ё', 'е')
+    return re.sub(r'[\s\-‐–—]+', ' ', normalized).strip(' .,')
+
+
+NORMALIZED_ALIASES = {normalize_plain(alias): normalize_plain(city) for alias, city in CITY_ALIASES.items()}
+
+
+def normalize_city_name(name):
+    if not name:
+        return ''
+    normalized = name.strip().lower().replace('ё', 'е')
+    normalized = re.sub(r'^(г\.|г |город )\s*', '', normalized)
+    normalized = re.sub(r'[\s\-‐–—]+', ' ', normalized).strip(' .,')
+    alias = NORMALIZED_ALIASES.get(normalized)
+    return alias if alias is not None else normalized
+
+
+CANONICAL_NAMES = {normalize_city_name(city): city for city in CITY_ALIASES.values()}
+
+
+def split_city_names(value):
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(',') if part.strip()]
+
+
+def display_city_name(name):
+    return CANONICAL_NAMES.get(normalize_city_name(name), name.strip())[:100]
+
+
+def backfill_internship_cities(apps, schema_editor):
+    City = apps.get_model('parser', 'City')
+    Internship = apps.get_model('parser', 'Internship')
+    Through = Internship.cities.through
+
+    city_ids = {}
+    links = []
+    rows = Internship.objects.exclude(city__isnull=True).exclude(city='').values_list('id', 'city')
+    for internship_id, value in rows.iterator(chunk_size=2000):
+        for name in split_city_names(value):
+            normalized = normalize_city_name(name)
+            if not normalized or len(normalized) > 100:
+                continue
+            if normalized not in city_ids:
+                city, _ = City.objects.get_or_create(normalized_name=normalized, defaults={'name': display_city_name(name)})
+                city_ids[normalized] = city.id
+            links.append(Through(internship_id=internship_id, city_id=city_ids[normalized]))
+        if len(links) >= 2000:
+            Through.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    if links:
+        Through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0011_internship_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('normalized_name', models.CharField(max_length=100, unique=True, verbose_name='Нормализованное название')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+            ],
+            options={
+                'verbose_name': 'Город',
+                'verbose_name_plural': 'Города',
+                'indexes': [models.Index(fields=['name'], name='city_name_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CityAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_name', models.CharField(max_length=100, unique=True, verbose_name='Нормализованное написание')),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='parser.city', verbose_name='Город')),
+            ],
+            options={
+                'verbose_name': 'Вариант написания города',
+                'verbose_name_plural': 'Варианты написания городов',
+            },
+        ),
+        migrations.AddField(
+            model_name='internship',
+            name='cities',
+            field=models.ManyToManyField(blank=True, related_name='internships', to='parser.city', verbose_name='Города'),
+        ),
+        migrations.RunPython(backfill_internship_cities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.2 on 2026-10-16 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from parser.constants import TECH_KEYWORDS
+from parser.skill_service import normalize_skill_name, split_skill_names
+
+
+def backfill_internship_skills(apps, schema_editor):
+    Skill = apps.get_model('parser', 'Skill')
+    Internship = apps.get_model('parser', 'Internship')
+    InternshipSkill = apps.get_model('parser', 'InternshipSkill')
+    tech_keywords = set(TECH_KEYWORDS)
+
+    skill_ids = {}
+    links = []
+    rows = Internship.objects.exclude(keywords__isnull=True).exclude(keywords='').values_list('id', 'keywords')
+    for internship_id, value in rows.iterator(chunk_size=2000):
+        internship_skill_ids = set()
+        for name in split_skill_names(value):
+            normalized = normalize_skill_name(name)
+            if not normalized or len(normalized) > 100:
+                continue
+            if normalized not in skill_ids:
+                is_tech = normalized in tech_keywords
+                skill, _ = Skill.objects.get_or_create(
+                    normalized_name=normalized,
+                    defaults={'name': normalized if is_tech else name.strip()[:100], 'is_tech': is_tech},
+                )
+                skill_ids[normalized] = skill.id
+            internship_skill_ids.add(skill_ids[normalized])
+        links.extend(InternshipSkill(internship_id=internship_id, skill_id=skill_id) for skill_id in internship_skill_ids)
+        if len(links) >= 2000:
+            InternshipSkill.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    if links:
+        InternshipSkill.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0012_city_internship_cities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('normalized_name', models.CharField(max_length=100, unique=True, verbose_name='Каноническое название')),
+                ('is_tech', models.BooleanField(default=False, verbose_name='Из списка технологий')),
+            ],
+            options={
+                'verbose_name': 'Навык',
+                'verbose_name_plural': 'Навыки',
+            },
+        ),
+        migrations.CreateModel(
+            name='InternshipSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internship', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='parser.internship', verbose_name='Стажировка')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='parser.skill', verbose_name='Навык')),
+            ],
+            options={
+                'verbose_name': 'Навык стажировки',
+                'verbose_name_plural': 'Навыки стажировок',
+                'indexes': [models.Index(fields=['skill', 'internship'], name='internshipskill_skill_idx')],
+                'unique_together': {('internship', 'skill')},
+            },
+        ),
+        migrations.AddField(
+            model_name='internship',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='internships', through='parser.InternshipSkill', to='parser.skill', verbose_name='Навыки'),
+        ),
+        migrations.RunPython(backfill_internship_skills, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-16 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0013_skill_internshipskill'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='internship',
+            index=models.Index(fields=['created_at', 'id'], name='internship_created_id_idx'),
+        ),
+    ]
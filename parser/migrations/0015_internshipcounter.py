@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-16 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    InternshipCounter = apps.get_model('parser', 'InternshipCounter')
+
+    counters = {}
+    rows = Internship.objects.order_by().values('source_website_id', 'is_archived').annotate(count=Count('id'))
+    for row in rows:
+        counter = counters.setdefault(row['source_website_id'], InternshipCounter(source_website_id=row['source_website_id']))
+        if row['is_archived']:
+            counter.archived_count += row['count']
+        else:
+            counter.active_count += row['count']
+    InternshipCounter.objects.bulk_create(counters.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0014_internship_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InternshipCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_count', models.IntegerField(default=0, verbose_name='Активных стажировок')),
+                ('archived_count', models.IntegerField(default=0, verbose_name='Архивных стажировок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('source_website', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='internship_counter', to='parser.website', verbose_name='Сайт-источник')),
+            ],
+            options={
+                'verbose_name': 'Счетчик стажировок',
+                'verbose_name_plural': 'Счетчики стажировок',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
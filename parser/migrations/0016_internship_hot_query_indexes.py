@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-16 15:00
+
+from django.db import migrations, models
+
+# Индексы под основные запросы: списки активных и архивных стажировок
+# (is_archived + сортировка по -created_at, -id) и поиск стажировки
+# по (source_website, url) в update_or_create. В PostgreSQL строятся
+# через CREATE INDEX CONCURRENTLY, чтобы не блокировать запись в таблицу.
+INDEXES = [
+    models.Index(fields=['-created_at', '-id'], name='internship_active_created_idx', condition=models.Q(is_archived=False)),
+    models.Index(fields=['-created_at', '-id'], name='internship_arch_created_idx', condition=models.Q(is_archived=True)),
+    models.Index(fields=['source_website', 'url'], name='internship_source_url_idx'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            # Недостроенный индекс после прерванного CONCURRENTLY остается в состоянии INVALID
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}')
+            schema_editor.add_index(Internship, index, concurrently=True)
+        else:
+            schema_editor.add_index(Internship, index)
+
+
+def drop_indexes(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            schema_editor.remove_index(Internship, index, concurrently=True)
+        else:
+            schema_editor.remove_index(Internship, index)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('parser', '0015_internshipcounter'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes, atomic=False),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='internship', index=index) for index in INDEXES
+            ],
+        ),
+    ]
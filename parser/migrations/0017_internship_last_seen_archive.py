@@ -0,0 +1,106 @@
+# Generated by Django 5.1.2 on 2026-10-16 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Частичные индексы для задачи архивации: отбор активных стажировок
+# по дате окончания отбора и дате последнего обнаружения, отбор архивных
+# по дате архивации для переноса в холодное хранилище
+INDEXES = [
+    models.Index(fields=['selection_end_date'], name='internship_active_end_date_idx', condition=models.Q(is_archived=False)),
+    models.Index(fields=['last_seen_at'], name='internship_active_seen_idx', condition=models.Q(is_archived=False)),
+    models.Index(fields=['archived_at'], name='internship_archived_at_idx', condition=models.Q(is_archived=True)),
+]
+
+
+def backfill_dates(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    # Дата последнего обнаружения имеет смысл только для источников, которые обходят
+    # краулеры: стажировки, добавленные вручную, по ней не архивируются
+    Internship.objects.filter(last_seen_at__isnull=True, source_website__is_special=True).update(
+        last_seen_at=models.F('updated_at')
+    )
+    Internship.objects.filter(is_archived=True, archived_at__isnull=True).update(archived_at=models.F('updated_at'))
+
+
+def create_indexes(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}')
+            schema_editor.add_index(Internship, index, concurrently=True)
+        else:
+            schema_editor.add_index(Internship, index)
+
+
+def drop_indexes(apps, schema_editor):
+    Internship = apps.get_model('parser', 'Internship')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            schema_editor.remove_index(Internship, index, concurrently=True)
+        else:
+            schema_editor.remove_index(Internship, index)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('parser', '0016_internship_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internship',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего обнаружения краулером'),
+        ),
+        migrations.AddField(
+            model_name='internship',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата архивации'),
+        ),
+        migrations.CreateModel(
+            name='InternshipArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name='Идентификатор стажировки')),
+                ('external_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='Идентификатор стажировки в источнике')),
+                ('title', models.TextField(verbose_name='Название стажировки')),
+                ('company', models.TextField(verbose_name='Название компании')),
+                ('position', models.TextField(verbose_name='Название должности')),
+                ('salary', models.CharField(blank=True, max_length=100, null=True, verbose_name='Заработная плата')),
+                ('selection_start_date', models.DateField(blank=True, null=True, verbose_name='Дата начала отбора')),
+                ('duration', models.CharField(blank=True, max_length=100, null=True, verbose_name='Длительность стажировки')),
+                ('selection_end_date', models.DateField(blank=True, null=True, verbose_name='Дата окончания отбора')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('employment_type', models.CharField(blank=True, max_length=20, null=True, verbose_name='Тип занятости')),
+                ('city', models.CharField(blank=True, max_length=100, null=True, verbose_name='Город')),
+                ('keywords', models.TextField(blank=True, null=True, verbose_name='Ключевые слова')),
+                ('url', models.URLField(verbose_name='Ссылка на стажировку')),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True, verbose_name='Хеш содержимого')),
+                ('created_at', models.DateTimeField(verbose_name='Дата добавления')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего обнаружения краулером')),
+                ('archived_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата архивации')),
+                ('moved_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата переноса в холодное хранилище')),
+                ('source_website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='parser.website', verbose_name='Сайт-источник')),
+            ],
+            options={
+                'verbose_name': 'Стажировка в холодном архиве',
+                'verbose_name_plural': 'Стажировки в холодном архиве',
+            },
+        ),
+        migrations.RunPython(backfill_dates, migrations.RunPython.noop, atomic=False),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes, atomic=False),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='internship', index=index) for index in INDEXES
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-16 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0017_internship_last_seen_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internship',
+            name='missing_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Пропала из выдачи с'),
+        ),
+        migrations.AddField(
+            model_name='internship',
+            name='search_queries',
+            field=models.ManyToManyField(blank=True, related_name='internships', to='parser.searchquery', verbose_name='Сохраненные запросы'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-16 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0018_internship_search_queries_missing_since'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ключ (sha256 модели, версии промпта и текста)')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('prompt_version', models.CharField(max_length=20, verbose_name='Версия промпта')),
+                ('response', models.JSONField(verbose_name='Извлеченные данные')),
+                ('size', models.IntegerField(default=0, verbose_name='Размер ответа (байт)')),
+                ('latency', models.FloatField(default=0, verbose_name='Время запроса к LLM (с)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+                ('accessed_at', models.DateTimeField(db_index=True, verbose_name='Дата последнего обращения')),
+            ],
+            options={
+                'verbose_name': 'Кеш ответа LLM',
+                'verbose_name_plural': 'Кеш ответов LLM',
+            },
+        ),
+    ]
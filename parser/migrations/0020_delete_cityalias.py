@@ -0,0 +1,16 @@
+# Generated by Django 5.1.2 on 2026-10-16 17:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0019_llmcacheentry'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CityAlias',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-16 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser', '0020_delete_cityalias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internship',
+            name='auto_archived',
+            field=models.BooleanField(default=False, verbose_name='Перенесена в архив автоматически'),
+        ),
+    ]
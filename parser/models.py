@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import hashlib
 
@@ -16,6 +17,31 @@ class Website(models.Model):
         verbose_name = "Сайт"
         verbose_name_plural = "Сайты"
 
+class City(models.Model):
+    name = models.CharField(max_length=100, verbose_name="Название")
+    normalized_name = models.CharField(max_length=100, verbose_name="Нормализованное название", unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Город"
+        verbose_name_plural = "Города"
+        indexes = [models.Index(fields=['name'], name='city_name_idx')]
+
+class Skill(models.Model):
+    name = models.CharField(max_length=100, verbose_name="Название")
+    normalized_name = models.CharField(max_length=100, verbose_name="Каноническое название", unique=True)
+    is_tech = models.BooleanField(default=False, verbose_name="Из списка технологий")
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Навык"
+        verbose_name_plural = "Навыки"
+
 class Internship(models.Model):
     TYPE_CHOICES = (
         ('remote', 'Удаленно'),
@@ -40,29 +66,154 @@ class Internship(models.Model):
     description = models.TextField(verbose_name="Описание")
     employment_type = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Тип занятости", blank=True, null=True)
     city = models.CharField(max_length=100, verbose_name="Город", blank=True, null=True)
+    cities = models.ManyToManyField(City, related_name='internships', verbose_name="Города", blank=True)
     keywords = models.TextField(verbose_name="Ключевые слова", blank=True, null=True)
+    skills = models.ManyToManyField(Skill, through='InternshipSkill', related_name='internships', verbose_name="Навыки", blank=True)
+    search_queries = models.ManyToManyField('SearchQuery', related_name='internships', verbose_name="Сохраненные запросы", blank=True)
 
     source_website = models.ForeignKey(Website, on_delete=models.CASCADE, verbose_name="Сайт-источник")
     url = models.URLField(verbose_name="Ссылка на стажировку")
 
     is_archived = models.BooleanField(default=False, verbose_name="В архиве")
+    # True, если стажировку перенесла в архив задача архивации или сверка с выдачей,
+    # а не пользователь: только такие стажировки возвращаются из архива краулерами
+    auto_archived = models.BooleanField(default=False, verbose_name="Перенесена в архив автоматически")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    last_seen_at = models.DateTimeField(verbose_name="Дата последнего обнаружения краулером", blank=True, null=True)
+    archived_at = models.DateTimeField(verbose_name="Дата архивации", blank=True, null=True)
+    missing_since = models.DateTimeField(verbose_name="Пропала из выдачи с", blank=True, null=True)
 
     content_hash = models.CharField(max_length=64, verbose_name="Хеш содержимого", blank=True, null=True, db_index=True)
 
+    http_etag = models.CharField(max_length=255, verbose_name="ETag страницы вакансии", blank=True, null=True)
+    http_last_modified = models.CharField(max_length=64, verbose_name="Last-Modified страницы вакансии", blank=True, null=True)
+
+    # Заполняется триггером PostgreSQL (миграция 0010), в SQLite не используется
+    search_vector = SearchVectorField(verbose_name="Поисковый вектор", blank=True, null=True, editable=False)
+
     def __str__(self):
         return f"{self.title} ({self.company})"
 
+    @staticmethod
+    def compute_content_hash(title, company, position, description):
+        content = f"{title}|{company}|{position}|{description}"
+        return hashlib.sha256(content.encode()).hexdigest()
+
     def save(self, *args, **kwargs):
-        content = f"{self.title}|{self.company}|{self.position}|{self.description}"
-        self.content_hash = hashlib.sha256(content.encode()).hexdigest()
+        self.content_hash = self.compute_content_hash(self.title, self.company, self.position, self.description)
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Стажировка"
         verbose_name_plural = "Стажировки"
         unique_together = [['source_website', 'content_hash']]
+        constraints = [
+            models.UniqueConstraint(fields=['source_website', 'external_id'], name='internship_source_external_id_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='internship_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='internship_active_created_idx', condition=models.Q(is_archived=False)),
+            models.Index(fields=['-created_at', '-id'], name='internship_arch_created_idx', condition=models.Q(is_archived=True)),
+            models.Index(fields=['source_website', 'url'], name='internship_source_url_idx'),
+            models.Index(fields=['selection_end_date'], name='internship_active_end_date_idx', condition=models.Q(is_archived=False)),
+            models.Index(fields=['last_seen_at'], name='internship_active_seen_idx', condition=models.Q(is_archived=False)),
+            models.Index(fields=['archived_at'], name='internship_archived_at_idx', condition=models.Q(is_archived=True)),
+        ]
+
+class InternshipSkill(models.Model):
+    internship = models.ForeignKey(Internship, on_delete=models.CASCADE, verbose_name="Стажировка")
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, verbose_name="Навык")
+
+    class Meta:
+        verbose_name = "Навык стажировки"
+        verbose_name_plural = "Навыки стажировок"
+        unique_together = [['internship', 'skill']]
+        indexes = [models.Index(fields=['skill', 'internship'], name='internshipskill_skill_idx')]
+
+class InternshipArchive(models.Model):
+    """Холодное хранилище стажировок, давно перенесенных в архив"""
+    original_id = models.BigIntegerField(verbose_name="Идентификатор стажировки", unique=True)
+    external_id = models.CharField(max_length=255, verbose_name="Идентификатор стажировки в источнике", blank=True, null=True)
+    title = models.TextField(verbose_name="Название стажировки")
+    company = models.TextField(verbose_name="Название компании")
+    position = models.TextField(verbose_name="Название должности")
+    salary = models.CharField(max_length=100, verbose_name="Заработная плата", blank=True, null=True)
+    selection_start_date = models.DateField(verbose_name="Дата начала отбора", blank=True, null=True)
+    duration = models.CharField(max_length=100, verbose_name="Длительность стажировки", blank=True, null=True)
+    selection_end_date = models.DateField(verbose_name="Дата окончания отбора", blank=True, null=True)
+    description = models.TextField(verbose_name="Описание")
+    employment_type = models.CharField(max_length=20, verbose_name="Тип занятости", blank=True, null=True)
+    city = models.CharField(max_length=100, verbose_name="Город", blank=True, null=True)
+    keywords = models.TextField(verbose_name="Ключевые слова", blank=True, null=True)
+    source_website = models.ForeignKey(Website, on_delete=models.CASCADE, verbose_name="Сайт-источник")
+    url = models.URLField(verbose_name="Ссылка на стажировку")
+    content_hash = models.CharField(max_length=64, verbose_name="Хеш содержимого", blank=True, null=True)
+    created_at = models.DateTimeField(verbose_name="Дата добавления")
+    updated_at = models.DateTimeField(verbose_name="Дата обновления")
+    last_seen_at = models.DateTimeField(verbose_name="Дата последнего обнаружения краулером", blank=True, null=True)
+    archived_at = models.DateTimeField(verbose_name="Дата архивации", blank=True, null=True)
+    moved_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата переноса в холодное хранилище")
+
+    def __str__(self):
+        return f"{self.title} ({self.company})"
+
+    class Meta:
+        verbose_name = "Стажировка в холодном архиве"
+        verbose_name_plural = "Стажировки в холодном архиве"
+
+class InternshipCounter(models.Model):
+    source_website = models.OneToOneField(Website, on_delete=models.CASCADE, related_name='internship_counter', verbose_name="Сайт-источник")
+    active_count = models.IntegerField(default=0, verbose_name="Активных стажировок")
+    archived_count = models.IntegerField(default=0, verbose_name="Архивных стажировок")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    def __str__(self):
+        return f"{self.source_website}: {self.active_count} активных, {self.archived_count} в архиве"
+
+    class Meta:
+        verbose_name = "Счетчик стажировок"
+        verbose_name_plural = "Счетчики стажировок"
+
+class GeoArea(models.Model):
+    SOURCE_CHOICES = (
+        ('hh', 'HeadHunter'),
+        ('habr', 'Habr Career'),
+        ('superjob', 'SuperJob'),
+    )
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name="Источник")
+    external_id = models.CharField(max_length=50, verbose_name="Идентификатор региона в источнике")
+    name = models.CharField(max_length=255, verbose_name="Название")
+    normalized_name = models.CharField(max_length=255, verbose_name="Нормализованное название")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    def __str__(self):
+        return f"{self.name} ({self.get_source_display()}: {self.external_id})"
+
+    class Meta:
+        verbose_name = "Регион источника"
+        verbose_name_plural = "Регионы источников"
+        unique_together = [['source', 'external_id']]
+        indexes = [models.Index(fields=['source', 'normalized_name'], name='geoarea_source_name_idx')]
+
+class LLMCacheEntry(models.Model):
+    key = models.CharField(max_length=64, primary_key=True, verbose_name="Ключ (sha256 модели, версии промпта и текста)")
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    prompt_version = models.CharField(max_length=20, verbose_name="Версия промпта")
+    response = models.JSONField(verbose_name="Извлеченные данные")
+    size = models.IntegerField(default=0, verbose_name="Размер ответа (байт)")
+    latency = models.FloatField(default=0, verbose_name="Время запроса к LLM (с)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
+    expires_at = models.DateTimeField(verbose_name="Действует до")
+    accessed_at = models.DateTimeField(verbose_name="Дата последнего обращения", db_index=True)
+
+    def __str__(self):
+        return f"{self.model} ({self.prompt_version}): {self.key[:12]}"
+
+    class Meta:
+        verbose_name = "Кеш ответа LLM"
+        verbose_name_plural = "Кеш ответов LLM"
 
 class SearchQuery(models.Model):
     city = models.CharField(max_length=100, verbose_name="Город", blank=True, null=True)
@@ -0,0 +1,164 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+KEYSET_FIELDS = ('created_at', 'id')
+RANKED_KEYSET_FIELDS = ('search_rank', 'created_at', 'id')
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа последней записи страницы в непрозрачный токен."""
+    payload = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Распаковывает токен курсора.
+
+    Raises:
+        ValueError: Токен поврежден или не подходит к сортировке списка
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Некорректный курсор: {e}")
+    if not isinstance(payload, list) or len(payload) != size:
+        raise ValueError("Курсор не соответствует сортировке списка")
+
+    values = []
+    for value in payload:
+        if isinstance(value, dict):
+            value = parse_datetime(value.get('dt') or '')
+            if value is None:
+                raise ValueError("Некорректная дата в курсоре")
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError("Некорректное значение в курсоре")
+        values.append(value)
+    return values
+
+
+class KeysetPage:
+    """Страница списка, полученная по курсору (аналог django.core.paginator.Page)."""
+
+    def __init__(self, object_list, next_cursor, is_first):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_fields(queryset):
+    # Результаты полнотекстового поиска упорядочены по релевантности (parser.search)
+    return RANKED_KEYSET_FIELDS if 'search_rank' in queryset.query.annotations else KEYSET_FIELDS
+
+
+def keyset_queryset(queryset, cursor):
+    """
+    Упорядочивает набор по ключу пагинации и оставляет записи после курсора.
+
+    Raises:
+        ValueError: Некорректный курсор
+    """
+    fields = keyset_fields(queryset)
+    queryset = queryset.order_by(*[f'-{field}' for field in fields])
+    if cursor:
+        values = decode_cursor(cursor, len(fields))
+        condition = Q()
+        for position, field in enumerate(fields):
+            step = Q(**{f'{field}__lt': values[position]})
+            for previous in range(position):
+                step &= Q(**{fields[previous]: values[previous]})
+            condition |= step
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def paginate_keyset(queryset, cursor, page_size):
+    """
+    Возвращает страницу списка стажировок после курсора.
+
+    Список упорядочивается по убыванию (created_at, id) - по индексу
+    internship_created_id_idx, для результатов поиска - сначала по search_rank.
+    Вместо OFFSET берутся записи строго после ключа последней записи прошлой
+    страницы, вместо COUNT(*) запрашивается одна лишняя запись, поэтому любая
+    страница стоит столько же, сколько первая.
+
+    Args:
+        queryset (QuerySet): Отфильтрованный набор стажировок
+        cursor (str): Токен из next_cursor предыдущей страницы или None для первой
+        page_size (int): Размер страницы
+
+    Raises:
+        ValueError: Некорректный курсор
+    """
+    fields = keyset_fields(queryset)
+    rows = list(keyset_queryset(queryset, cursor)[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([getattr(rows[-1], field) for field in fields])
+    return KeysetPage(rows, next_cursor, is_first=not cursor)
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация DRF поверх paginate_keyset."""
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = paginate_keyset(queryset, request.query_params.get(self.cursor_query_param), self.get_page_size(request))
+        except ValueError as e:
+            raise NotFound(str(e))
+        return self.page.object_list
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.page.has_next():
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.page.next_cursor)
+
+    def get_paginated_response(self, data, **extra):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.page.next_cursor,
+            'results': data,
+            **extra,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Internship
+
+logger = logging.getLogger('parser')
+
+DEFAULT_QUEUE_SIZE = 50
+DEFAULT_BATCH_SIZE = 25
+_DONE = object()
+
+
+def empty_crawl_stats(crawl_error=None):
+    """Статистика запуска конвейера, в которой еще ничего не обработано."""
+    return {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0, 'errors': 0,
+            'archived': 0, 'crawl_error': crawl_error}
+
+
+class CrawlPipeline:
+    """
+    Потоковый конвейер "краулер -> БД".
+
+    Генератор краулера (выдача -> детали -> преобразование) выполняется в отдельном
+    потоке и складывает данные стажировок в ограниченную очередь: если запись в БД
+    не успевает, краулер ждет на очереди и не накапливает данные в памяти.
+    Вызывающий поток отбрасывает повторы в рамках запуска и сохраняет данные
+    пачками (save_batch_fn), каждую пачку в своей транзакции, поэтому при падении
+    на середине обхода уже обработанные вакансии остаются в базе. Если пачка не
+    сохранилась, ее элементы сохраняются по одному через save_fn.
+    """
+
+    def __init__(self, source, save_fn, save_batch_fn=None, batch_size=None, queue_size=None):
+        self.source = source
+        self.save_fn = save_fn
+        self.save_batch_fn = save_batch_fn
+        self.batch_size = batch_size or getattr(settings, 'CRAWLER_PIPELINE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.queue_size = queue_size or getattr(settings, 'CRAWLER_PIPELINE_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+
+    def run(self, items):
+        """
+        Прогоняет данные краулера через конвейер.
+
+        Args:
+            items (iterable): Генератор данных стажировок (например, parser.iter_internships(...))
+
+        Returns:
+            dict: Статистика {'total', 'created', 'updated', 'unchanged', 'duplicates', 'errors', 'archived', 'crawl_error'}
+        """
+        buffer = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        stats = empty_crawl_stats()
+        started = time.monotonic()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for item in items:
+                    if not put(item):
+                        break
+            except Exception as e:
+                stats['crawl_error'] = str(e)
+                logger.error(f"CrawlPipeline({self.source}): обход прерван ошибкой: {e}", exc_info=True)
+            finally:
+                connections.close_all()
+                put(_DONE)
+
+        producer = threading.Thread(target=produce, name=f'crawl-{self.source}', daemon=True)
+        producer.start()
+
+        seen = set()
+        batch = []
+        try:
+            while True:
+                item = buffer.get()
+                if item is _DONE:
+                    break
+                stats['total'] += 1
+                key = self._dedup_key(item)
+                if key is not None and key in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(key)
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch, stats)
+                    batch = []
+            if batch:
+                self._write_batch(batch, stats)
+        finally:
+            stop.set()
+            producer.join()
+
+        logger.info(f"CrawlPipeline({self.source}): получено {stats['total']}, создано {stats['created']}, "
+                    f"обновлено {stats['updated']}, без изменений {stats['unchanged']}, повторов {stats['duplicates']}, ошибок {stats['errors']} "
+                    f"за {time.monotonic() - started:.1f} с")
+        return stats
+
+    def _write_batch(self, batch, stats):
+        if self.save_batch_fn:
+            try:
+                with transaction.atomic():
+                    result = self.save_batch_fn(batch)
+            except Exception as e:
+                logger.error(f"CrawlPipeline({self.source}): пачка из {len(batch)} стажировок не сохранена ({e}), "
+                             f"сохраняем по одной", exc_info=True)
+            else:
+                for key in ('created', 'updated', 'unchanged', 'errors'):
+                    stats[key] += result[key]
+                return
+
+        with transaction.atomic():
+            for item in batch:
+                try:
+                    with transaction.atomic():
+                        internship, created = self.save_fn(item)
+                except Exception as e:
+                    stats['errors'] += 1
+                    logger.error(f"CrawlPipeline({self.source}): ошибка при сохранении (данные: {str(item)[:200]}...): {e}", exc_info=True)
+                    continue
+                if not internship:
+                    stats['errors'] += 1
+                elif created:
+                    stats['created'] += 1
+                else:
+                    stats['updated'] += 1
+
+    @staticmethod
+    def _dedup_key(item):
+        if isinstance(item, Internship):
+            return ('pk', item.pk)
+        if item.get('not_modified'):
+            return ('pk', item['internship'].id)
+        if item.get('external_id'):
+            return ('external_id', str(item['external_id']))
+        if item.get('url'):
+            return ('url', item['url'])
+        return None
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('parser')
+
+THROTTLE_STATUSES = (403, 429)
+
+DEFAULT_LIMITS = {
+    'rate': 2.0,
+    'min_rate': 0.2,
+    'max_rate': 10.0,
+    'burst': 2,
+    'increase_step': 0.25,
+    'decrease_factor': 0.5,
+    'clean_window': 20,
+    'max_backoff': 60.0,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket одного хоста с AIMD-регулировкой скорости.
+
+    Скорость (запросов в секунду) растет на increase_step после каждых
+    clean_window успешных ответов и умножается на decrease_factor при
+    ответах 403/429/5xx или сетевых ошибках. После ошибки хост блокируется
+    на время Retry-After либо на экспоненциально растущую паузу, но не
+    дольше max_backoff секунд.
+    """
+
+    def __init__(self, host, rate, min_rate, max_rate, burst, increase_step,
+                 decrease_factor, clean_window, max_backoff):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.clean_window = clean_window
+        self.max_backoff = max_backoff
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.clean_responses = 0
+        self.consecutive_throttles = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Забирает токен (возможно, в долг) и возвращает время ожидания в секундах."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def on_success(self):
+        with self._lock:
+            self.consecutive_throttles = 0
+            self.clean_responses += 1
+            if self.clean_responses >= self.clean_window and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                self.clean_responses = 0
+                logger.debug(f"RateLimiter({self.host}): скорость увеличена до {self.rate:.2f} запр/с")
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.tokens = min(self.tokens, 0.0)
+            self.clean_responses = 0
+            self.consecutive_throttles += 1
+            backoff = min(
+                self.max_backoff,
+                retry_after if retry_after is not None else (2 ** self.consecutive_throttles) / self.rate,
+            )
+            self.blocked_until = max(self.blocked_until, now + backoff)
+            logger.warning(f"RateLimiter({self.host}): скорость снижена до {self.rate:.2f} запр/с, пауза {backoff:.2f} с")
+
+
+class AdaptiveRateLimiter:
+    """
+    Потокобезопасный ограничитель частоты запросов, по одному TokenBucket
+    на каждый хост. Параметры хостов задаются в
+    settings.CRAWLER_RATE_LIMITS.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits if limits is not None else getattr(settings, 'CRAWLER_RATE_LIMITS', {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                params = dict(DEFAULT_LIMITS)
+                params.update(self.limits.get(host, {}))
+                self._buckets[host] = TokenBucket(host, **params)
+            return self._buckets[host]
+
+    def acquire(self, host):
+        """Блокирует поток до получения разрешения на запрос к хосту."""
+        wait = self.bucket(host).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, host, status_code, retry_after=None):
+        """Сообщает ограничителю результат запроса к хосту."""
+        bucket = self.bucket(host)
+        if status_code in THROTTLE_STATUSES or status_code >= 500:
+            bucket.on_throttle(_parse_retry_after(retry_after))
+        else:
+            bucket.on_success()
+
+    def record_failure(self, host):
+        """Сетевые ошибки и таймауты считаются признаком перегрузки хоста."""
+        self.bucket(host).on_throttle()
+
+    def get_rates(self):
+        with self._lock:
+            return {host: round(bucket.rate, 3) for host, bucket in self._buckets.items()}
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,104 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .internship_service import InternshipService
+from .models import Internship
+from .stats_service import StatsService
+
+logger = logging.getLogger('parser')
+
+DEFAULT_GRACE_PERIOD = 12 * 60 * 60
+
+
+class CrawlCoverage:
+    """
+    Что краулер увидел в поисковой выдаче за один обход: внешние идентификаторы
+    всех вакансий выдачи (в том числе пропущенных как недавно обновленные)
+    и признак того, что обход дошел до последней страницы выдачи, а не
+    остановился на лимите страниц или ошибке.
+    """
+
+    def __init__(self):
+        self.started_at = timezone.now()
+        self.external_ids = set()
+        self.complete = False
+
+    def add_page(self, external_ids):
+        self.external_ids.update(str(external_id) for external_id in external_ids if external_id)
+
+    def mark_complete(self, found=None, reachable=None):
+        """
+        Отмечает обход как полный.
+
+        Args:
+            found (int): Сколько вакансий нашел источник по запросу
+            reachable (int): Сколько вакансий источник отдает постранично (страниц * размер
+                страницы); источники ограничивают глубину выдачи, и если found больше,
+                часть вакансий обход не видел, поэтому он не считается полным
+        """
+        if found is not None and reachable is not None and found > reachable:
+            logger.info(f"Обход выдачи не полный: найдено {found} вакансий, постранично доступно {reachable}")
+            return
+        self.complete = True
+
+
+class ReconciliationService:
+    @staticmethod
+    def reconcile(website, search_query_id, coverage, grace_period=None):
+        """Архивирует стажировки сохраненного запроса, пропавшие из выдачи источника
+
+        Выполняется после полного обхода выдачи по сохраненному запросу: все
+        увиденные вакансии связываются с запросом, а активные стажировки
+        источника, связанные с запросом, но отсутствующие в выдаче, помечаются
+        missing_since, а перенесенные в архив автоматически стажировки, снова
+        появившиеся в выдаче, возвращаются из архива. Стажировки, которые отсутствуют дольше grace_period
+        (settings.CRAWL_RECONCILE_GRACE_PERIOD, секунды) и с начала обхода не
+        встречались другим краулерам, архивируются одним UPDATE.
+
+        Args:
+            website (Website): Сайт-источник
+            search_query_id (int): Идентификатор сохраненного запроса (SearchQuery)
+            coverage (CrawlCoverage): Результат обхода выдачи
+
+        Returns:
+            int: Количество перенесенных в архив стажировок
+        """
+        if not website or not search_query_id:
+            return 0
+        if not coverage.complete:
+            logger.info(f"Сверка {website.name} по запросу {search_query_id} пропущена: обход выдачи не был полным")
+            return 0
+
+        grace_period = grace_period if grace_period is not None else getattr(settings, 'CRAWL_RECONCILE_GRACE_PERIOD', DEFAULT_GRACE_PERIOD)
+        now = timezone.now()
+        through = Internship.search_queries.through
+
+        with transaction.atomic():
+            seen_ids = list(
+                Internship.objects.filter(source_website=website, external_id__in=coverage.external_ids).values_list('id', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(internship_id=internship_id, searchquery_id=search_query_id) for internship_id in seen_ids],
+                ignore_conflicts=True,
+                batch_size=1000,
+            )
+            Internship.objects.filter(id__in=seen_ids, missing_since__isnull=False).update(missing_since=None)
+            InternshipService.revive_archived(seen_ids)
+
+            missing = Internship.objects.filter(
+                source_website=website, search_queries=search_query_id, is_archived=False
+            ).exclude(id__in=seen_ids)
+            newly_missing = missing.filter(missing_since__isnull=True).update(missing_since=now)
+            archived = missing.filter(
+                missing_since__lte=now - timedelta(seconds=grace_period),
+                last_seen_at__lt=coverage.started_at,
+            ).update(is_archived=True, auto_archived=True, archived_at=now)
+            StatsService.adjust(website.id, active=-archived, archived=archived)
+
+        logger.info(f"Сверка {website.name} по запросу {search_query_id}: в выдаче {len(coverage.external_ids)} вакансий, "
+                    f"пропали впервые {newly_missing}, перенесено в архив {archived}")
+        return archived
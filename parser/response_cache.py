@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from django.conf import settings
+
+logger = logging.getLogger('parser')
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date')
+TOTAL_RESYNC_INTERVAL = 300
+
+
+class DiskCache:
+    """
+    Персистентный кеш на диске с TTL и вытеснением по LRU.
+
+    Содержимое хранится по адресу своего sha256 (одинаковые тела хранятся
+    один раз), а индекс ключей, сроков жизни и времени последнего обращения
+    лежит в SQLite рядом с файлами. Суммарный размер ограничен max_bytes.
+    Суммарный размер считается по индексу один раз и дальше поддерживается
+    при записи и удалении; раз в TOTAL_RESYNC_INTERVAL секунд и перед
+    вытеснением он пересчитывается, чтобы учесть записи других процессов.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.blobs_dir = os.path.join(self.directory, 'blobs')
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'bytes_served': 0}
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self._total_synced_at = 0.0
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL,"
+                " meta TEXT, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def get(self, key):
+        """
+        Возвращает (содержимое, метаданные) по ключу или None, если записи нет или она устарела.
+        Ошибка чтения индекса считается промахом.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute("SELECT blob, meta, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row and row[2] > now:
+                        try:
+                            with open(self._blob_path(row[0]), 'rb') as f:
+                                body = f.read()
+                        except OSError:
+                            body = None
+                        if body is not None:
+                            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                            self.stats['hits'] += 1
+                            self.stats['bytes_served'] += len(body)
+                            return body, json.loads(row[1] or '{}')
+                    if row:
+                        self._delete_entries(conn, [key])
+            except sqlite3.Error as e:
+                logger.warning(f"DiskCache({self.directory}): ошибка чтения индекса кеша: {e}")
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key, body, meta=None, ttl=3600):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            previous = conn.execute("SELECT blob FROM entries WHERE key = ?", (key,)).fetchone()
+            if previous and previous[0] != digest:
+                self._delete_entries(conn, [key])
+            self._sync_total(conn, now)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            if not conn.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (digest,)).fetchone():
+                self._total_bytes += len(body)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, blob, size, meta, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, len(body), json.dumps(meta or {}, ensure_ascii=False), now + ttl, now)
+            )
+            self.stats['stores'] += 1
+            self._evict(conn)
+
+    def _sync_total(self, conn, now, force=False):
+        if force or self._total_bytes is None or now - self._total_synced_at > TOTAL_RESYNC_INTERVAL:
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)"
+            ).fetchone()[0]
+            self._total_synced_at = now
+
+    def _evict(self, conn):
+        if self._total_bytes <= self.max_bytes:
+            return
+        now = time.time()
+        self._sync_total(conn, now, force=True)
+        if self._total_bytes <= self.max_bytes:
+            return
+        expired = [row[0] for row in conn.execute("SELECT key FROM entries WHERE expires_at <= ?", (now,))]
+        self._delete_entries(conn, expired)
+        evicted = len(expired)
+        for (key,) in conn.execute("SELECT key FROM entries ORDER BY accessed_at").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._delete_entries(conn, [key])
+            evicted += 1
+        self.stats['evictions'] += evicted
+        logger.info(f"DiskCache({self.directory}): вытеснено {evicted} записей, размер {self._total_bytes} байт")
+
+    def _delete_entries(self, conn, keys):
+        for key in keys:
+            row = conn.execute("SELECT blob, size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if row and not conn.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (row[0],)).fetchone():
+                if self._total_bytes is not None:
+                    self._total_bytes -= row[1]
+                try:
+                    os.remove(self._blob_path(row[0]))
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        requests_total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / requests_total, 3) if requests_total else 0.0
+        return stats
+
+
+class ResponseCache:
+    """
+    Кеш GET-ответов краулеров поверх DiskCache.
+
+    Кешируются только успешные ответы для адресов, которым в
+    settings.HTTP_CACHE_TTLS сопоставлен срок жизни.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, ttl_rules=None):
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (
+            ttl_rules if ttl_rules is not None else getattr(settings, 'HTTP_CACHE_TTLS', [])
+        )]
+        self.store = DiskCache(
+            directory or getattr(settings, 'HTTP_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'http')),
+            max_bytes or getattr(settings, 'HTTP_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+        )
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return 0
+
+    @staticmethod
+    def make_key(method, url, params=None):
+        prepared_url = requests.Request(method.upper(), url, params=params).prepare().url
+        return hashlib.sha256(f"{method.upper()} {prepared_url}".encode('utf-8')).hexdigest(), prepared_url
+
+    def get(self, method, url, params=None):
+        if method.lower() != 'get':
+            return None
+        key, prepared_url = self.make_key(method, url, params)
+        if not self.ttl_for(prepared_url):
+            return None
+        cached = self.store.get(key)
+        if not cached:
+            return None
+        body, meta = cached
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.url = meta.get('url', prepared_url)
+        response.encoding = meta.get('encoding')
+        response.from_cache = True
+        return response
+
+    def put(self, method, url, params, response):
+        if method.lower() != 'get' or response.status_code != 200:
+            return
+        key, prepared_url = self.make_key(method, url, params)
+        ttl = self.ttl_for(prepared_url)
+        if not ttl:
+            return
+        meta = {
+            'url': response.url,
+            'encoding': response.encoding,
+            'headers': {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+        }
+        try:
+            self.store.set(key, response.content, meta, ttl)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Не удалось сохранить ответ {prepared_url} в кеш: {e}")
+
+    def get_stats(self):
+        return self.store.get_stats()
@@ -4,7 +4,9 @@ import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from django_apscheduler.jobstores import DjangoJobStore
 from django.conf import settings
-from .tasks import parse_all_internships
+from .tasks import parse_all_internships, cleanup_old_internships
+from .geo_resolver import refresh_geo_index
+from .stats_service import rebuild_internship_counters
 from .models import SearchQuery
 
 logger = logging.getLogger('parser')
@@ -21,6 +23,30 @@ def start_scheduler():
         replace_existing=True
     )
 
+    scheduler.add_job(
+        refresh_geo_index,
+        'interval',
+        seconds=getattr(settings, 'GEO_INDEX_REFRESH_INTERVAL', 7 * 24 * 60 * 60),
+        id='refresh_geo_index',
+        replace_existing=True
+    )
+
+    scheduler.add_job(
+        cleanup_old_internships,
+        'interval',
+        seconds=getattr(settings, 'ARCHIVE_RUN_INTERVAL', 24 * 60 * 60),
+        id='cleanup_old_internships',
+        replace_existing=True
+    )
+
+    scheduler.add_job(
+        rebuild_internship_counters,
+        'interval',
+        hours=24,
+        id='rebuild_internship_counters',
+        replace_existing=True
+    )
+
     scheduler.start()
     logger.info("Планировщик задач запущен")
 
@@ -39,7 +65,8 @@ def update_saved_search_queries():
         parse_all_internships(
             city=query.city,
             keywords=query.keywords,
-            max_pages=query.max_pages
+            max_pages=query.max_pages,
+            search_query_id=query.id
         )
 
     logger.info("Обновление стажировок по сохраненным запросам завершено")
\ No newline at end of file
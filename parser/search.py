@@ -0,0 +1,149 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery as TextSearchQuery, SearchRank
+from django.db import connections, transaction
+from django.db.models import Exists, F, FloatField, OuterRef, Q
+from django.db.models.functions import Cast, Upper
+
+from .city_service import CityService
+from .models import Internship
+
+logger = logging.getLogger('parser')
+
+SEARCH_CONFIGS = ('russian', 'english')
+DEFAULT_TRIGRAM_THRESHOLD = 0.3
+
+
+def normalize_search_text(text):
+    """Приводит поисковую строку к виду, в котором индексируется search_vector (ё -> е)."""
+    return (text or '').strip().replace('ё', 'е').replace('Ё', 'Е')
+
+
+def uses_full_text_search(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def get_trigram_threshold(value=None):
+    """Порог похожести для нечеткого поиска: из запроса, иначе settings.SEARCH_TRIGRAM_THRESHOLD."""
+    default = getattr(settings, 'SEARCH_TRIGRAM_THRESHOLD', DEFAULT_TRIGRAM_THRESHOLD)
+    try:
+        threshold = float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+    return min(max(threshold, 0.0), 1.0)
+
+
+@contextmanager
+def trigram_threshold(threshold=None, using='default'):
+    """
+    Открывает транзакцию и задает в ней порог похожести для оператора %>
+    (SET LOCAL pg_trgm.word_similarity_threshold). Нечеткие фильтры нужно
+    выполнять внутри этого блока: вне его действует порог pg_trgm по умолчанию.
+    Настройка действует только до конца транзакции и не переходит на
+    следующие запросы постоянного соединения.
+    """
+    with transaction.atomic(using=using):
+        if connections[using].vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                               [str(get_trigram_threshold(threshold))])
+        yield
+
+
+def _annotate_upper(queryset, fields):
+    return queryset.alias(**{f'{field}_upper': Upper(field) for field in fields})
+
+
+def _trigram_condition(field, text):
+    # Оператор %> (trigram_word_similar) может использовать GIN-индекс gin_trgm_ops;
+    # индексы из миграции 0011 построены по UPPER(поле), как и условие icontains
+    return Q(**{f'{field}_upper__trigram_word_similar': text.upper()})
+
+
+def filter_text_field(queryset, field, value, fuzzy=False):
+    """
+    Фильтр по подстроке или по похожести для коротких полей (title, company, city).
+
+    Обычный режим - icontains: в PostgreSQL он выполняется по триграммному
+    GIN-индексу на UPPER(поле). Нечеткий режим (только PostgreSQL) находит
+    близкие написания ("Санкт Петербург" / "Санкт-Петербург", опечатки):
+    в поле должен найтись фрагмент, похожий на value не меньше, чем задает
+    trigram_threshold, внутри которого выполняется запрос.
+
+    Args:
+        queryset (QuerySet): Исходный набор стажировок
+        field (str): Имя поля модели Internship
+        value (str): Значение фильтра
+        fuzzy (bool): Искать по похожести, а не по подстроке
+    """
+    value = (value or '').strip()
+    if not value:
+        return queryset
+    if not fuzzy or not uses_full_text_search(queryset):
+        return queryset.filter(**{f'{field}__icontains': value})
+
+    return _annotate_upper(queryset, (field,)).filter(_trigram_condition(field, value))
+
+
+def filter_by_city(queryset, value, fuzzy=False):
+    """
+    Фильтр по городу через справочник City: соединение по индексу связи
+    стажировка-город вместо icontains по строке. Если город не найден
+    в справочнике (часть названия) или включен нечеткий режим,
+    используется filter_text_field по полю city.
+    """
+    if not fuzzy:
+        city_ids = CityService.match_city_ids(value)
+        if city_ids:
+            links = Internship.cities.through.objects.filter(internship_id=OuterRef('pk'), city_id__in=city_ids)
+            return queryset.filter(Exists(links))
+    return filter_text_field(queryset, 'city', value, fuzzy=fuzzy)
+
+
+def search_internships_queryset(queryset, text, fallback_fields, fuzzy_fields=()):
+    """
+    Фильтрует стажировки по поисковой строке и сортирует по релевантности.
+
+    В PostgreSQL поиск идет по Internship.search_vector (GIN-индекс, русская и
+    английская конфигурации, веса: title > position/keywords > company > description),
+    результаты упорядочены по ts_rank. На остальных СУБД (SQLite при разработке)
+    используется OR из icontains по fallback_fields.
+
+    Args:
+        queryset (QuerySet): Исходный набор стажировок
+        text (str): Поисковая строка (поддерживается синтаксис websearch: "фраза", -исключение, or)
+        fallback_fields (tuple): Поля для icontains без полнотекстового поиска
+        fuzzy_fields (tuple): Поля, по которым в PostgreSQL дополнительно ищутся похожие
+            написания (для опечаток, которые не исправляет стемминг); порог похожести
+            задает trigram_threshold
+
+    Returns:
+        QuerySet: Отфильтрованный набор
+    """
+    text = normalize_search_text(text)
+    if not text:
+        return queryset
+
+    if not uses_full_text_search(queryset):
+        condition = Q()
+        for field in fallback_fields:
+            condition |= Q(**{f'{field}__icontains': text})
+        return queryset.filter(condition)
+
+    query = None
+    for config in SEARCH_CONFIGS:
+        config_query = TextSearchQuery(text, config=config, search_type='websearch')
+        query = config_query if query is None else query | config_query
+    condition = Q(search_vector=query)
+    if fuzzy_fields:
+        queryset = _annotate_upper(queryset, fuzzy_fields)
+        for field in fuzzy_fields:
+            condition |= _trigram_condition(field, text)
+    # ts_rank возвращает real, который драйвер отдает округленным до короткой десятичной
+    # записи, и курсор (parser.pagination) с таким значением не совпадает с рангом в БД.
+    # После приведения к double precision значение передается без потерь
+    return queryset.filter(condition).annotate(
+        search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    ).order_by('-search_rank', '-created_at')
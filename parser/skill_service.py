@@ -0,0 +1,147 @@
+import logging
+import re
+
+from django.db.models import Count, Exists, OuterRef
+
+from .constants import SKILL_ALIASES, SKILL_STOP_WORDS, TECH_KEYWORDS
+from .models import InternshipSkill, Skill
+
+logger = logging.getLogger('parser')
+
+SKILL_NAME_MAX_LENGTH = 100
+DEFAULT_FACET_LIMIT = 30
+
+_TECH_KEYWORDS = set(TECH_KEYWORDS)
+
+
+def normalize_skill_name(name):
+    """
+    Приводит навык к каноническому виду: нижний регистр, один пробел между
+    словами, известные альтернативные написания -> название из TECH_KEYWORDS.
+    """
+    if not name:
+        return ''
+    normalized = re.sub(r'\s+', ' ', str(name).strip().lower().replace('ё', 'е')).strip(' .,;')
+    if normalized in SKILL_STOP_WORDS:
+        return ''
+    return SKILL_ALIASES.get(normalized, normalized)
+
+
+def split_skill_names(value):
+    """Разбивает поле keywords (навыки через запятую) на отдельные навыки."""
+    if not value:
+        return []
+    return [part.strip() for part in re.split(r'[,;]', str(value)) if part.strip()]
+
+
+class SkillService:
+    @staticmethod
+    def resolve_skills(names, create=True):
+        """Находит (и при необходимости создает) навыки по названиям в любой форме
+
+        Args:
+            names (iterable): Названия навыков ("Python", "PostgreSQL", "k8s")
+            create (bool): Создавать отсутствующие навыки
+
+        Returns:
+            dict: {каноническое название: Skill}
+        """
+        wanted = {}
+        for name in names:
+            normalized = normalize_skill_name(name)
+            if normalized and len(normalized) <= SKILL_NAME_MAX_LENGTH:
+                wanted.setdefault(normalized, normalized if normalized in _TECH_KEYWORDS else name.strip())
+        if not wanted:
+            return {}
+
+        found = {skill.normalized_name: skill for skill in Skill.objects.filter(normalized_name__in=wanted.keys())}
+        missing = [normalized for normalized in wanted if normalized not in found]
+        if missing and create:
+            Skill.objects.bulk_create(
+                [Skill(name=wanted[normalized][:SKILL_NAME_MAX_LENGTH], normalized_name=normalized,
+                       is_tech=normalized in _TECH_KEYWORDS) for normalized in missing],
+                ignore_conflicts=True,
+            )
+            found.update({skill.normalized_name: skill for skill in Skill.objects.filter(normalized_name__in=missing)})
+            logger.debug(f"Добавлены навыки: {', '.join(missing)}")
+        return found
+
+    @staticmethod
+    def sync_internship_skills(keyword_values):
+        """Приводит связи стажировок с навыками в соответствие с их полем keywords
+
+        Args:
+            keyword_values (dict): {id стажировки: значение поля keywords}
+        """
+        if not keyword_values:
+            return
+        names_by_internship = {internship_id: split_skill_names(value) for internship_id, value in keyword_values.items()}
+        skills = SkillService.resolve_skills(name for names in names_by_internship.values() for name in names)
+
+        desired = set()
+        for internship_id, names in names_by_internship.items():
+            for name in names:
+                skill = skills.get(normalize_skill_name(name))
+                if skill is not None:
+                    desired.add((internship_id, skill.id))
+
+        existing = InternshipSkill.objects.filter(internship_id__in=names_by_internship.keys()).values_list('id', 'internship_id', 'skill_id')
+        stale_ids = []
+        for link_id, internship_id, skill_id in existing:
+            if (internship_id, skill_id) in desired:
+                desired.discard((internship_id, skill_id))
+            else:
+                stale_ids.append(link_id)
+        if stale_ids:
+            InternshipSkill.objects.filter(id__in=stale_ids).delete()
+        if desired:
+            InternshipSkill.objects.bulk_create(
+                [InternshipSkill(internship_id=internship_id, skill_id=skill_id) for internship_id, skill_id in desired],
+                ignore_conflicts=True,
+            )
+
+    @staticmethod
+    def filter_by_skills(queryset, value, mode='any'):
+        """Фильтрует стажировки по навыкам через индекс (skill, internship)
+
+        Args:
+            queryset (QuerySet): Исходный набор стажировок
+            value (str): Навыки через запятую
+            mode (str): 'any' - есть хотя бы один из навыков, 'all' - есть все навыки
+
+        Returns:
+            QuerySet: Отфильтрованный набор (пустой, если навыки неизвестны)
+        """
+        names = split_skill_names(value)
+        if not names:
+            return queryset
+        skills = SkillService.resolve_skills(names, create=False)
+        requested = {normalize_skill_name(name) for name in names} - {''}
+        if not skills or (mode == 'all' and len(skills) < len(requested)):
+            return queryset.none()
+
+        if mode == 'all':
+            for skill in skills.values():
+                queryset = queryset.filter(Exists(
+                    InternshipSkill.objects.filter(internship_id=OuterRef('pk'), skill_id=skill.id)
+                ))
+            return queryset
+        return queryset.filter(Exists(
+            InternshipSkill.objects.filter(internship_id=OuterRef('pk'), skill_id__in=[skill.id for skill in skills.values()])
+        ))
+
+    @staticmethod
+    def get_facets(queryset, limit=DEFAULT_FACET_LIMIT):
+        """Количество стажировок по навыкам для набора стажировок одним сгруппированным запросом
+
+        Returns:
+            list: [{'skill': название, 'count': количество}] по убыванию количества
+        """
+        rows = (
+            InternshipSkill.objects
+            .filter(internship__in=queryset.values('pk'))
+            .values('skill__name')
+            .annotate(count=Count('internship_id'))
+            .order_by('-count', 'skill__name')[:limit]
+        )
+        return [{'skill': row['skill__name'], 'count': row['count']} for row in rows]
@@ -38,11 +38,11 @@ document.addEventListener('DOMContentLoaded', function() {
 
   const cardsContainer = document.getElementById('cardsContainer');
   const infiniteScrollTrigger = document.getElementById('infiniteScrollTrigger');
-  const currentPageInput = document.getElementById('currentPage');
+  const nextCursorInput = document.getElementById('nextCursor');
   const hasNextPageInput = document.getElementById('hasNextPage');
   const loadMoreUrlInput = document.getElementById('loadMoreUrl');
 
-  if (!cardsContainer || !infiniteScrollTrigger || !currentPageInput || !hasNextPageInput || !loadMoreUrlInput) {
+  if (!cardsContainer || !infiniteScrollTrigger || !nextCursorInput || !hasNextPageInput || !loadMoreUrlInput) {
     console.warn("Infinite scroll: Essential elements not found. Infinite scroll disabled.");
     return;
   }
@@ -50,16 +50,15 @@ document.addEventListener('DOMContentLoaded', function() {
   let isLoading = false;
 
   const loadMoreInternships = () => {
-    if (isLoading || hasNextPageInput.value !== 'true') {
+    if (isLoading || hasNextPageInput.value !== 'true' || !nextCursorInput.value) {
       return;
     }
     isLoading = true;
-    let nextPage = parseInt(currentPageInput.value) + 1;
 
     const filterForm = document.querySelector('.filter-card form');
     const formData = new FormData(filterForm);
     const params = new URLSearchParams(formData);
-    params.set('page', nextPage.toString());
+    params.set('cursor', nextCursorInput.value);
     const currentUrl = new URL(loadMoreUrlInput.value, window.location.origin);
     currentUrl.search = params.toString();
 
@@ -79,7 +78,7 @@ document.addEventListener('DOMContentLoaded', function() {
     .then(data => {
       if (data.html && data.html.trim().length > 0) {
         infiniteScrollTrigger.insertAdjacentHTML('beforebegin', data.html);
-        currentPageInput.value = nextPage.toString();
+        nextCursorInput.value = data.next_cursor || '';
         hasNextPageInput.value = data.has_next ? 'true' : 'false';
         setTimeout(() => {
           if (cardsContainer.scrollHeight <= cardsContainer.clientHeight && hasNextPageInput.value === 'true') {
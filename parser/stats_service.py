@@ -0,0 +1,121 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Internship, InternshipCounter, Website
+
+logger = logging.getLogger('parser')
+
+
+class StatsService:
+    @staticmethod
+    def compute_counts():
+        """Считает активные и архивные стажировки по источникам одним сгруппированным запросом
+
+        Returns:
+            dict: {id сайта: {'active': int, 'archived': int}}
+        """
+        counts = {}
+        rows = Internship.objects.order_by().values('source_website_id', 'is_archived').annotate(count=Count('id'))
+        for row in rows:
+            website_counts = counts.setdefault(row['source_website_id'], {'active': 0, 'archived': 0})
+            website_counts['archived' if row['is_archived'] else 'active'] += row['count']
+        return counts
+
+    @staticmethod
+    def rebuild_counters():
+        """Пересчитывает таблицу счетчиков по фактическим данным (исправляет расхождения)
+
+        Строки счетчиков блокируются до подсчета, поэтому транзакции, которые
+        изменяют стажировки и счетчики, либо завершаются до подсчета и входят
+        в него, либо ждут пересчета и применяют свои изменения поверх.
+        """
+        with transaction.atomic():
+            list(InternshipCounter.objects.select_for_update().order_by('source_website_id'))
+            counts = StatsService.compute_counts()
+            InternshipCounter.objects.exclude(source_website_id__in=counts.keys()).delete()
+            InternshipCounter.objects.bulk_create(
+                [InternshipCounter(source_website_id=website_id, active_count=website_counts['active'],
+                                   archived_count=website_counts['archived'])
+                 for website_id, website_counts in counts.items()],
+                update_conflicts=True,
+                unique_fields=['source_website'],
+                update_fields=['active_count', 'archived_count', 'updated_at'],
+            )
+        logger.info(f"Счетчики стажировок пересчитаны для {len(counts)} источников")
+        return counts
+
+    @staticmethod
+    def adjust(website_id, active=0, archived=0):
+        """Изменяет счетчики источника на заданные величины в текущей транзакции
+
+        Args:
+            website_id (int): Идентификатор сайта-источника
+            active (int): Изменение количества активных стажировок
+            archived (int): Изменение количества архивных стажировок
+        """
+        if not website_id or (not active and not archived):
+            return
+        updated = InternshipCounter.objects.filter(source_website_id=website_id).update(
+            active_count=F('active_count') + active,
+            archived_count=F('archived_count') + archived,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            InternshipCounter.objects.bulk_create(
+                [InternshipCounter(source_website_id=website_id, active_count=0, archived_count=0)],
+                ignore_conflicts=True,
+            )
+            InternshipCounter.objects.filter(source_website_id=website_id).update(
+                active_count=F('active_count') + active,
+                archived_count=F('archived_count') + archived,
+                updated_at=timezone.now(),
+            )
+
+    @staticmethod
+    def adjust_for_deleted(rows):
+        """Уменьшает счетчики перед удалением стажировок
+
+        Args:
+            rows (iterable): Пары (id сайта, is_archived) удаляемых стажировок
+        """
+        deltas = {}
+        for website_id, is_archived in rows:
+            website_deltas = deltas.setdefault(website_id, {'active': 0, 'archived': 0})
+            website_deltas['archived' if is_archived else 'active'] -= 1
+        for website_id, website_deltas in deltas.items():
+            StatsService.adjust(website_id, **website_deltas)
+
+    @staticmethod
+    def get_stats():
+        """Статистика по стажировкам из таблицы счетчиков (один запрос по всем источникам)
+
+        Returns:
+            dict: {'total', 'active', 'archived', 'by_website': {название: количество}}
+        """
+        websites = list(Website.objects.select_related('internship_counter').order_by('name'))
+        if websites and not any(hasattr(website, 'internship_counter') for website in websites):
+            StatsService.rebuild_counters()
+            websites = list(Website.objects.select_related('internship_counter').order_by('name'))
+
+        by_website = {}
+        active = archived = 0
+        for website in websites:
+            counter = getattr(website, 'internship_counter', None)
+            website_active = counter.active_count if counter else 0
+            website_archived = counter.archived_count if counter else 0
+            active += website_active
+            archived += website_archived
+            by_website[website.name] = website_active + website_archived
+        return {
+            'total': active + archived,
+            'active': active,
+            'archived': archived,
+            'by_website': by_website,
+        }
+
+def rebuild_internship_counters():
+    """Задача планировщика: сверяет счетчики стажировок с данными."""
+    return StatsService.rebuild_counters()
@@ -0,0 +1,61 @@
+import json
+import logging
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger('parser')
+
+DEFAULT_CHUNK_SIZE = 500
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request):
+    """Клиент запросил выгрузку всего списка построчным JSON (?stream=ndjson)."""
+    return request.query_params.get('stream') == 'ndjson'
+
+
+def stream_ndjson_response(queryset, serializer_class, chunk_size=None, context=None):
+    """
+    Отдает весь набор записей в формате NDJSON (одна запись JSON на строку).
+
+    Записи читаются через QuerySet.iterator(): в PostgreSQL это серверный курсор,
+    из которого строки забираются пачками по chunk_size (settings.API_STREAM_CHUNK_SIZE),
+    и каждая пачка сериализуется и отправляется клиенту сразу. Память процесса
+    не зависит от размера таблицы, первые байты уходят после чтения первой пачки.
+
+    Args:
+        queryset (QuerySet): Упорядоченный набор записей
+        serializer_class (type): Сериализатор DRF для одной записи
+        chunk_size (int): Размер пачки
+        context: Контекстный менеджер, внутри которого читаются записи (например,
+            search.trigram_threshold для нечетких условий)
+    """
+    chunk_size = chunk_size or getattr(settings, 'API_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    encoder = JSONEncoder(ensure_ascii=False)
+
+    def lines():
+        sent = 0
+        buffer = []
+        try:
+            with context or nullcontext():
+                for obj in queryset.iterator(chunk_size=chunk_size):
+                    buffer.append(encoder.encode(serializer_class(obj).data))
+                    if len(buffer) >= chunk_size:
+                        sent += len(buffer)
+                        yield '\n'.join(buffer) + '\n'
+                        buffer = []
+            if buffer:
+                sent += len(buffer)
+                yield '\n'.join(buffer) + '\n'
+        except Exception as e:
+            logger.error(f"Ошибка при потоковой выгрузке после {sent} записей: {e}", exc_info=True)
+            yield json.dumps({'error': 'Выгрузка прервана из-за внутренней ошибки'}, ensure_ascii=False) + '\n'
+            return
+        logger.info(f"Потоковая выгрузка {queryset.model.__name__}: отправлено {sent} записей")
+
+    response = StreamingHttpResponse(lines(), content_type=f'{NDJSON_CONTENT_TYPE}; charset=utf-8')
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -4,13 +4,16 @@ logger.debug(f"ЗАПУСК МОДУЛЯ {__name__} С УРОВНEM DEBUG")
 
 import requests
 import os
-import time
-import random
 from datetime import datetime, timedelta
 from .base_parser import BaseParser
 from .models import Internship, Website
 from django.db.utils import IntegrityError
 from .internship_service import InternshipService
+from .http_client import get_http_client
+from .fetch_engine import PagePrefetcher
+from .pipeline import CrawlPipeline, empty_crawl_stats
+from .reconciliation import CrawlCoverage, ReconciliationService
+from .geo_resolver import get_geo_resolver
 
 class SuperJobParser(BaseParser):
     BASE_URL = 'https://api.superjob.ru/2.0'
@@ -22,6 +25,7 @@ class SuperJobParser(BaseParser):
             'X-Api-App-Id': self.API_KEY,
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        self.http = get_http_client()
         if not self.API_KEY:
             logger.error("API ключ для SuperJob не найден. Парсинг невозможен.")
             raise ValueError("API ключ для SuperJob не сконфигурирован")
@@ -33,9 +37,9 @@ class SuperJobParser(BaseParser):
         while retry_count <= max_retries:
             try:
                 if method.lower() == 'get':
-                    response = requests.get(url, params=params, headers=self.headers)
+                    response = self.http.get(url, params=params, headers=self.headers)
                 elif method.lower() == 'post':
-                    response = requests.post(url, json=data, headers=self.headers, params=params)
+                    response = self.http.post(url, json=data, headers=self.headers, params=params)
                 else:
                     logger.error(f"Неподдерживаемый метод запроса: {method}")
                     return None
@@ -50,8 +54,6 @@ class SuperJobParser(BaseParser):
                      return None
                 elif response.status_code >= 500:
                     logger.warning(f"Серверная ошибка ({response.status_code}) для {url}. Попытка {retry_count + 1}/{max_retries + 1}")
-                    if retry_count < max_retries:
-                        time.sleep(2 ** retry_count)
                 else:
                     logger.error(f"Ошибка API SuperJob {response.status_code} для {url}: {response.text}")
                     return None
@@ -119,12 +121,17 @@ class SuperJobParser(BaseParser):
         return {'items': [], 'found': 0, 'pages': 0, 'per_page': per_page, 'page': page, 'more': False}
 
     def get_all_internships(self, keywords_query=None, town=None, max_results=200, max_pages=None, website_obj=None, **kwargs):
-        all_vacancies = []
+        return list(self.iter_internships(keywords_query=keywords_query, town=town, max_results=max_results,
+                                          max_pages=max_pages, website_obj=website_obj, **kwargs))
+
+    def iter_internships(self, keywords_query=None, town=None, max_results=200, max_pages=None, website_obj=None, coverage=None, **kwargs):
+        """
+        Постранично выдает данные стажировок SuperJob, не больше max_results.
+        В coverage (CrawlCoverage) записываются все вакансии выдачи и признак полного обхода.
+        """
         page = 0
         per_page = 100
 
-        base_delay = 1
-
         api_passthrough_kwargs = {
             k: v for k, v in kwargs.items()
             if k not in ['website_obj', 'max_pages', 'max_results', 'keywords']
@@ -136,67 +143,78 @@ class SuperJobParser(BaseParser):
         if not current_keywords_query and 'keywords' in kwargs:
             current_keywords_query = kwargs.get('keywords')
 
-        vacancies_to_process = []
-
-        while True:
-            if max_pages is not None and page >= max_pages:
-                logger.info(f"Достигнуто максимальное количество запрошенных страниц ({max_pages}) для SuperJob.")
-                break
+        selected_count = 0
 
-            logger.info(f"Загрузка стажировок с SuperJob: страница {page + 1}")
-            result = self.search_internships(keywords_query=current_keywords_query,
-                                           page=page,
+        def fetch_page(page_number):
+            logger.info(f"Загрузка стажировок с SuperJob: страница {page_number + 1}")
+            return self.search_internships(keywords_query=current_keywords_query,
+                                           page=page_number,
                                            per_page=per_page,
                                            **api_passthrough_kwargs)
 
-            if result and result.get('items'):
-                for vacancy in result['items']:
-                    basic_info = {
-                        'external_id': str(vacancy.get('id')),
-                        'title': vacancy.get('profession', 'Не указано'),
-                        'company': vacancy.get('firm_name', 'Не указано'),
-                        'url': vacancy.get('link', '')
-                    }
-
-                    existing = None
-                    if website_obj and basic_info.get('external_id'):
-                        existing = InternshipService.get_existing_by_external_id(basic_info['external_id'], website_obj)
-
-                    if not existing or (website_obj and InternshipService.should_update_internship(existing)):
-                        internship_data = self.convert_to_internship_data(vacancy)
-                        if internship_data:
-                            vacancies_to_process.append(internship_data)
-                    else:
-                        logger.info(f"Пропуск обновления для вакансии {basic_info.get('title')} (ID: {basic_info.get('external_id')}) - обновлена недавно")
-
-                logger.info(f"Обработано {len(result['items'])} стажировок с страницы {page + 1} (SuperJob), для сохранения отобрано {len(vacancies_to_process)}")
-                logger.info(f"Всего найдено по запросу (SuperJob): {result.get('found')}")
-
-                if len(vacancies_to_process) >= max_results:
-                    logger.info(f"Достигнуто максимальное количество результатов ({max_results}) для SuperJob.")
+        def last_page(page_number, result):
+            if not result or not result.get('items') or not result.get('more', False):
+                return page_number
+            pages_total = -(-result.get('found', 0) // per_page)
+            last = max(page_number, pages_total - 1)
+            return min(last, max_pages - 1) if max_pages is not None else last
+
+        with PagePrefetcher('api.superjob.ru', fetch_page, last_page) as prefetcher:
+            while True:
+                if max_pages is not None and page >= max_pages:
+                    logger.info(f"Достигнуто максимальное количество запрошенных страниц ({max_pages}) для SuperJob.")
                     break
 
-                if not result.get('more', False):
-                    logger.info("Больше нет страниц для загрузки с SuperJob.")
+                result = prefetcher.get(page)
+
+                if result and result.get('items'):
+                    if coverage is not None:
+                        coverage.add_page(vacancy.get('id') for vacancy in result['items'])
+                    existing_map = InternshipService.get_existing_map([vacancy.get('id') for vacancy in result['items']], website_obj)
+                    for vacancy in result['items']:
+                        basic_info = {
+                            'external_id': str(vacancy.get('id')),
+                            'title': vacancy.get('profession', 'Не указано'),
+                            'company': vacancy.get('firm_name', 'Не указано'),
+                            'url': vacancy.get('link', '')
+                        }
+
+                        existing = None
+                        if website_obj and basic_info.get('external_id'):
+                            existing = existing_map.get(basic_info['external_id'])
+
+                        if not existing or (website_obj and InternshipService.should_update_internship(existing)):
+                            internship_data = self.convert_to_internship_data(vacancy)
+                            if internship_data and selected_count < max_results:
+                                selected_count += 1
+                                yield internship_data
+                        else:
+                            logger.info(f"Пропуск обновления для вакансии {basic_info.get('title')} (ID: {basic_info.get('external_id')}) - обновлена недавно")
+
+                    logger.info(f"Обработано {len(result['items'])} стажировок с страницы {page + 1} (SuperJob), для сохранения отобрано {selected_count}")
+                    logger.info(f"Всего найдено по запросу (SuperJob): {result.get('found')}")
+
+                    if selected_count >= max_results:
+                        logger.info(f"Достигнуто максимальное количество результатов ({max_results}) для SuperJob.")
+                        break
+
+                    if not result.get('more', False):
+                        logger.info("Больше нет страниц для загрузки с SuperJob.")
+                        if coverage is not None:
+                            coverage.mark_complete(result.get('found', 0), (page + 1) * per_page)
+                        break
+                    page += 1
+                else:
+                    logger.warning(f"Не удалось получить данные со страницы {page + 1} (SuperJob) или страница пуста.")
+                    if page == 0 and not selected_count:
+                        logger.error("Не удалось получить ни одной стажировки с SuperJob по текущему запросу.")
                     break
-                page += 1
-            else:
-                logger.warning(f"Не удалось получить данные со страницы {page + 1} (SuperJob) или страница пуста.")
-                if page == 0 and not vacancies_to_process:
-                    logger.error("Не удалось получить ни одной стажировки с SuperJob по текущему запросу.")
-                break
 
-            if page * per_page >= result.get('found', 0) and result.get('found',0) > 0 :
-                 logger.info("Достигнут конец данных по общему количеству вакансий SuperJob.")
-                 break
+                if page * per_page >= result.get('found', 0) and result.get('found',0) > 0 :
+                     logger.info("Достигнут конец данных по общему количеству вакансий SuperJob.")
+                     break
 
-            jitter = random.uniform(0.8, 1.2)
-            delay = base_delay * jitter
-            logger.info(f"Ожидание {delay:.2f} секунд перед следующим запросом к SuperJob...")
-            time.sleep(delay)
-
-        logger.info(f"Отобрано {len(vacancies_to_process)} стажировок SuperJob для сохранения/обновления")
-        return vacancies_to_process[:max_results]
+        logger.info(f"Отобрано {selected_count} стажировок SuperJob для сохранения/обновления")
 
     def convert_to_internship_data(self, vacancy):
         if not vacancy:
@@ -294,40 +312,33 @@ class SuperJobParser(BaseParser):
 
         original_url = internship_data['url']
 
-        valid_keys = {f.name for f in Internship._meta.get_fields()}
-
-        defaults_data = {k: v for k, v in internship_data.items() if k != 'url' and k != 'source_website' and k in valid_keys}
-        defaults_data['source_website'] = website
-
         try:
-            internship, created = Internship.objects.update_or_create(
-                url=original_url,
-                source_website=website,
-                defaults=defaults_data
-            )
-            action = "Создана" if created else "Обновлена"
-            logger.info(f"{action} стажировка (SuperJob): '{internship.title}' по URL {internship.url}")
-            return internship, created
+            return InternshipService.create_or_update(internship_data, website)
         except IntegrityError as e:
-            if 'parser_internship_source_website_id_content_hash' in str(e):
-                logger.warning(
-                    f"Ошибка дублирования content_hash при попытке update_or_create для URL {original_url} (SuperJob). "
-                    f"Возможно, стажировка с таким же контентом уже существует с другим URL или хеш рассчитан некорректно. "
-                    f"Детали ошибки: {str(e)}"
-                )
-                return None, False
-            else:
-                logger.error(f"Неперехваченная ошибка IntegrityError при update_or_create стажировки (SuperJob) для URL {original_url}: {e}", exc_info=True)
-                raise
+            logger.warning(
+                f"Ошибка целостности при сохранении стажировки для URL {original_url} (SuperJob). "
+                f"Возможно, стажировка с таким же контентом уже существует. Детали ошибки: {str(e)}"
+            )
+            return None, False
         except Exception as e:
-            logger.error(f"Общая ошибка при update_or_create стажировки (SuperJob) для URL {original_url}: {e}", exc_info=True)
+            logger.error(f"Общая ошибка при сохранении стажировки (SuperJob) для URL {original_url}: {e}", exc_info=True)
             return None, False
 
+    def create_internships(self, items, website_obj):
+        valid_items = []
+        for internship_data in items:
+            if isinstance(internship_data, dict) and not internship_data.get('url'):
+                logger.error(f"Отсутствует URL для вакансии SuperJob с external_id {internship_data.get('external_id')}. Сохранение невозможно.")
+                continue
+            valid_items.append(internship_data)
+        return super().create_internships(valid_items, website_obj)
+
 def fetch_superjob_internships(keywords_query=None, city=None, max_results=200, **kwargs):
     try:
         logger.info(f"Запуск поиска стажировок на SuperJob с ключевыми словами '{keywords_query}' и городом '{city}'")
 
         website_obj = kwargs.pop('website_obj', None)
+        search_query_id = kwargs.pop('search_query_id', None)
         if not website_obj:
             website_obj, _ = Website.objects.get_or_create(
                 name="SuperJob",
@@ -338,28 +349,34 @@ def fetch_superjob_internships(keywords_query=None, city=None, max_results=200,
 
         town_id = None
         if city:
-            pass
+            town_id = get_geo_resolver().resolve('superjob', city)
+            if town_id:
+                logger.info(f"Найден ID города SuperJob для '{city}': {town_id}")
+            else:
+                logger.warning(f"Не удалось найти ID города SuperJob для '{city}', город будет передан названием.")
 
-        internships_data = sj_parser.get_all_internships(
+        coverage = CrawlCoverage()
+        internships_data = sj_parser.iter_internships(
             keywords_query=keywords_query,
             town=town_id if town_id else city,
             max_results=max_results,
             website_obj=website_obj,
+            coverage=coverage,
             **kwargs
         )
+        pipeline = CrawlPipeline(
+            'SuperJob',
+            lambda internship_data: sj_parser.create_internship(internship_data, website_obj),
+            save_batch_fn=lambda batch: sj_parser.create_internships(batch, website_obj)
+        )
+        stats = pipeline.run(internships_data)
+        if not stats['crawl_error']:
+            stats['archived'] = ReconciliationService.reconcile(website_obj, search_query_id, coverage)
 
-        processed_internships = []
-        for internship_data in internships_data:
-            if isinstance(internship_data, dict):
-                internship, created = sj_parser.create_internship(internship_data, website_obj)
-                if internship:
-                    processed_internships.append(internship)
-            elif isinstance(internship_data, Internship):
-                processed_internships.append(internship_data)
-
-        logger.info(f"Завершено получение стажировок с SuperJob. Обработано {len(processed_internships)} стажировок.")
-        return processed_internships
+        logger.info(f"Завершено получение стажировок с SuperJob. Обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок.")
+        sj_parser.http.log_stats(hosts={'api.superjob.ru'})
+        return stats
 
     except Exception as e:
         logger.error(f"Ошибка при получении стажировок с SuperJob: {str(e)}", exc_info=True)
-        return []
+        return empty_crawl_stats(str(e))
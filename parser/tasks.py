@@ -1,9 +1,9 @@
 import logging
-from django.utils import timezone
-from .models import Internship
+from django.conf import settings
+from .archive_service import ArchiveService
 from .hh_api_parser import fetch_hh_internships
 from .habr_parser import fetch_habr_career_internships
-from .superjob_parser import fetch_superjob_internships, SuperJobParser
+from .superjob_parser import fetch_superjob_internships
 from .models import Website
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -22,11 +22,26 @@ def run_hh_api_parser():
     return False
 
 def cleanup_old_internships():
-    """Заглушка функции перемещения устаревших стажировок в архив"""
-    logger.info("Функция архивации устаревших стажировок отключена")
-    return 0
+    """Перемещение устаревших стажировок в архив
 
-def parse_hh_internships(keywords=None, area=None, city=None, max_pages=20):
+    Архивирует стажировки с прошедшей датой окончания отбора и не встречавшиеся
+    краулерам дольше settings.ARCHIVE_NOT_SEEN_DAYS дней. Если включено
+    settings.ARCHIVE_COLD_STORAGE_ENABLED, давно архивные записи переносятся
+    в таблицу InternshipArchive.
+
+    Returns:
+        int: Количество перенесенных в архив стажировок
+    """
+    try:
+        archived = ArchiveService.archive_stale()
+        if getattr(settings, 'ARCHIVE_COLD_STORAGE_ENABLED', False):
+            ArchiveService.move_to_cold_storage()
+        return archived
+    except Exception as e:
+        logger.error(f"Ошибка при архивации устаревших стажировок: {e}", exc_info=True)
+        return 0
+
+def parse_hh_internships(keywords=None, area=None, city=None, max_pages=20, search_query_id=None):
     """Функция для получения стажировок с HeadHunter
     
     Args:
@@ -34,6 +49,7 @@ def parse_hh_internships(keywords=None, area=None, city=None, max_pages=20):
         area (str, optional): ID региона
         city (str, optional): Название города (имеет приоритет над area)
         max_pages (int, optional): Максимальное количество страниц для загрузки. По умолчанию 20.
+        search_query_id (int, optional): Сохраненный запрос, по выдаче которого архивируются пропавшие стажировки
     """
     try:
         hh_website, created = Website.objects.get_or_create(
@@ -41,27 +57,16 @@ def parse_hh_internships(keywords=None, area=None, city=None, max_pages=20):
             defaults={"url": "https://hh.ru/"}
         )
         
-        from .hh_api_parser import HeadHunterAPI
-        
-        internships = fetch_hh_internships(
+        stats = fetch_hh_internships(
             keywords=keywords, 
             area=area, 
             city=city, 
             max_pages=max_pages,
-            website_obj=hh_website
+            website_obj=hh_website,
+            search_query_id=search_query_id
         )
         
-        count_created = 0
-        count_updated = 0
-        
-        for internship in internships:
-            if isinstance(internship, Internship):
-                if internship.id is None:
-                    count_created += 1
-                else:
-                    count_updated += 1
-        
-        result_msg = f"Успешно обработано {len(internships)} стажировок с HeadHunter. Создано: {count_created}, обновлено: {count_updated}"
+        result_msg = f"Успешно обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок с HeadHunter. Создано: {stats['created']}, обновлено: {stats['updated']}, без изменений: {stats['unchanged']}, ошибок: {stats['errors']}"
         logger.info(result_msg)
         return result_msg
     
@@ -70,7 +75,7 @@ def parse_hh_internships(keywords=None, area=None, city=None, max_pages=20):
         logger.error(error_msg)
         return error_msg
 
-def parse_habr_internships(location_id=None, city=None, keywords=None, max_pages=10):
+def parse_habr_internships(location_id=None, city=None, keywords=None, max_pages=10, search_query_id=None):
     """Функция для получения стажировок с Habr Career
     
     Args:
@@ -78,6 +83,7 @@ def parse_habr_internships(location_id=None, city=None, keywords=None, max_pages
         city (str, optional): Название города для поиска (имеет приоритет над location_id)
         keywords (str, optional): Ключевые слова для поиска вакансий
         max_pages (int, optional): Максимальное количество страниц для загрузки. По умолчанию 10.
+        search_query_id (int, optional): Сохраненный запрос, по выдаче которого архивируются пропавшие стажировки
     """
     try:
         habr_website, created = Website.objects.get_or_create(
@@ -86,17 +92,16 @@ def parse_habr_internships(location_id=None, city=None, keywords=None, max_pages
         )
         
     
-        processed_internships = fetch_habr_career_internships(
+        stats = fetch_habr_career_internships(
             keywords_query=keywords, 
             city_name=city, 
             max_pages=max_pages, 
             location_id=location_id,
-            website_obj=habr_website 
+            website_obj=habr_website,
+            search_query_id=search_query_id
         )
         
-        num_processed = len(processed_internships)
-        
-        result_msg = f"Успешно обработано {num_processed} стажировок с Habr Career. Детали создания/обновления см. в логах парсера."
+        result_msg = f"Успешно обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок с Habr Career. Создано: {stats['created']}, обновлено: {stats['updated']}, без изменений: {stats['unchanged']}, ошибок: {stats['errors']}"
         logger.info(result_msg)
         return result_msg
     
@@ -105,7 +110,7 @@ def parse_habr_internships(location_id=None, city=None, keywords=None, max_pages
         logger.error(error_msg, exc_info=True)
         return error_msg
 
-def parse_superjob_internships(town=None, city=None, keywords=None, max_pages=10):
+def parse_superjob_internships(town=None, city=None, keywords=None, max_pages=10, search_query_id=None):
     """Функция для получения стажировок с SuperJob
     
     Args:
@@ -113,6 +118,7 @@ def parse_superjob_internships(town=None, city=None, keywords=None, max_pages=10
         city (str, optional): Название города (имеет приоритет над town)
         keywords (str, optional): Ключевые слова для поиска
         max_pages (int, optional): Максимальное количество страниц для загрузки. По умолчанию 10.
+        search_query_id (int, optional): Сохраненный запрос, по выдаче которого архивируются пропавшие стажировки
     """
     try:
         superjob_website, created = Website.objects.get_or_create(
@@ -120,37 +126,10 @@ def parse_superjob_internships(town=None, city=None, keywords=None, max_pages=10
             defaults={"url": "https://www.superjob.ru/"}
         )
         
-        internships = fetch_superjob_internships(city=city, keywords=keywords, max_pages=max_pages, website_obj=superjob_website)
+        stats = fetch_superjob_internships(city=city, keywords=keywords, max_pages=max_pages, website_obj=superjob_website,
+                                           search_query_id=search_query_id)
         
-        count_created = 0
-        count_updated = 0
-        
-        client = SuperJobParser() 
-        for internship_data_dict in internships: 
-            if isinstance(internship_data_dict, Internship):
-                internship_obj = internship_data_dict
-                action = "Обновлена (уже объект)" 
-                is_created = False 
-                
-                existing_internship = Internship.objects.filter(external_id=internship_obj.external_id, source_website=superjob_website).first()
-                if existing_internship:
-                    pass
-                else:
-                    is_created = True 
-            
-            elif isinstance(internship_data_dict, dict):
-                internship_obj, is_created = client.create_internship(internship_data_dict, superjob_website)
-            else:
-                logger.warning(f"Неизвестный тип данных для стажировки SuperJob: {type(internship_data_dict)}")
-                continue
-
-            if internship_obj:
-                if is_created:
-                    count_created += 1
-                else:
-                    count_updated += 1
-            
-        result_msg = f"Успешно обработано {len(internships)} стажировок с SuperJob. Создано: {count_created}, обновлено: {count_updated}"
+        result_msg = f"Успешно обработано {stats['created'] + stats['updated'] + stats['unchanged']} стажировок с SuperJob. Создано: {stats['created']}, обновлено: {stats['updated']}, без изменений: {stats['unchanged']}, ошибок: {stats['errors']}"
         logger.info(result_msg)
         return result_msg
     
@@ -159,19 +138,20 @@ def parse_superjob_internships(town=None, city=None, keywords=None, max_pages=10
         logger.error(error_msg)
         return error_msg
 
-def parse_all_internships(city=None, keywords=None, max_pages=10):
+def parse_all_internships(city=None, keywords=None, max_pages=10, search_query_id=None):
     """Функция для параллельного получения стажировок со всех источников
     
     Args:
         city (str, optional): Название города для поиска
         keywords (str, optional): Ключевые слова для поиска
         max_pages (int, optional): Максимальное количество страниц для загрузки. По умолчанию 10.
+        search_query_id (int, optional): Сохраненный запрос, по выдаче которого архивируются пропавшие стажировки
     """
     logger.info(f"Запуск многопоточного парсинга стажировок")
     
-    hh_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages}
-    habr_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages}
-    superjob_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages}
+    hh_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages, 'search_query_id': search_query_id}
+    habr_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages, 'search_query_id': search_query_id}
+    superjob_params = {'city': city, 'keywords': keywords, 'max_pages': max_pages, 'search_query_id': search_query_id}
     
     import concurrent.futures
     results = {}
@@ -0,0 +1,170 @@
+import re
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from .city_service import CityService
+from .models import Internship, Skill, Website
+from .pagination import encode_cursor, keyset_queryset, paginate_keyset
+from .search import filter_by_city, filter_text_field, search_internships_queryset
+from .skill_service import SkillService
+
+# Индексы без явного имени (unique_together, db_index) Django называет по полям с хешем в конце
+CONTENT_HASH_INDEX = r'parser_internship_(?:source_website_id_content_hash|content_hash)_\w+'
+
+TITLES = ('Стажер Python-разработчик', 'Стажер аналитик данных', 'Junior Java developer', 'Стажер QA-инженер')
+COMPANIES = ('Яндекс', 'Сбер', 'Тинькофф', 'VK')
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань, Москва', 'Новосибирск')
+KEYWORDS = ('python, django, sql', 'sql, excel', 'java, spring', 'python, selenium')
+
+
+def create_internships(website, count):
+    """Создает count стажировок источника с повторяющимися названиями, компаниями и городами."""
+    internships = []
+    for number in range(count):
+        internships.append(Internship.objects.create(
+            external_id=str(number),
+            title=TITLES[number % len(TITLES)],
+            company=COMPANIES[number % len(COMPANIES)],
+            position=TITLES[number % len(TITLES)],
+            description=f'Описание стажировки {number}: задачи, требования и условия.',
+            city=CITIES[number % len(CITIES)],
+            keywords=KEYWORDS[number % len(KEYWORDS)],
+            url=f'https://example.com/vacancy/{number}',
+            source_website=website,
+            is_archived=number % 5 == 0,
+        ))
+    CityService.sync_internship_cities({internship.id: internship.city for internship in internships})
+    SkillService.sync_internship_skills({internship.id: internship.keywords for internship in internships})
+    return internships
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Планы запросов проверяются только в PostgreSQL')
+class QueryIndexTests(TestCase):
+    """
+    Проверяет через EXPLAIN, что основные запросы к стажировкам (списки, поиск,
+    сопоставление при сохранении) выполняются по предназначенным для них индексам.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.website = Website.objects.create(name='Тестовый источник', url='https://example.com/')
+        cls.internships = create_internships(cls.website, 40)
+
+    def setUp(self):
+        # На маленькой таблице планировщик выбирает последовательное чтение
+        # независимо от индексов; отключаем его до конца транзакции теста. Без
+        # последовательного чтения планировщик возьмет почти любой индекс,
+        # поэтому в плане проверяется имя именно того индекса, который
+        # построен под запрос
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def hot_queries(self):
+        website = self.website
+        sample = self.internships[-1]
+        cursor = encode_cursor([sample.created_at, sample.id])
+        limit = 11
+
+        active = Internship.objects.filter(is_archived=False).order_by('-created_at', '-id')
+        archived = Internship.objects.filter(is_archived=True).order_by('-created_at', '-id')
+        # (название, запрос, регулярное выражение для имени ожидаемого индекса)
+        return [
+            ('views.InternshipListView: первая страница', keyset_queryset(active, None)[:limit],
+             'internship_active_created_idx'),
+            ('views.InternshipListView: страница по курсору', keyset_queryset(active, cursor)[:limit],
+             'internship_active_created_idx'),
+            ('views.ArchivedInternshipListView: страница по курсору', keyset_queryset(archived, cursor)[:limit],
+             'internship_arch_created_idx'),
+            ('views.InternshipListView: фильтр по городу', filter_by_city(active, 'Москва')[:limit],
+             r'parser_internship_cities_\w+'),
+            ('api_views.internship_list_api: страница по курсору',
+             keyset_queryset(Internship.objects.select_related('source_website'), cursor)[:limit],
+             'internship_created_id_idx'),
+            ('api_views.search_internships: полнотекстовый поиск',
+             keyset_queryset(search_internships_queryset(active, 'python', ('title',)), None)[:limit],
+             'internship_search_vector_gin'),
+            ('api_views.search_internships: город по подстроке', filter_text_field(active, 'city', 'моск')[:limit],
+             'internship_city_trgm'),
+            ('api_views.search_internships: компания по похожести',
+             filter_text_field(active, 'company', 'яндекс', fuzzy=True)[:limit],
+             'internship_company_trgm'),
+            ('api_views.search_internships: полнотекстовый поиск с похожими названиями',
+             search_internships_queryset(active, 'python', ('title',), fuzzy_fields=('title',))[:limit],
+             'internship_title_trgm'),
+            ('api_views.search_internships: навыки',
+             SkillService.filter_by_skills(active, Skill.objects.order_by('id').first().name, mode='all')[:limit],
+             'internshipskill_skill_idx'),
+            ('InternshipService.get_existing_map',
+             Internship.objects.filter(source_website=website, external_id__in=['1', '2']).values_list('id'),
+             'internship_source_external_id_uniq'),
+            ('InternshipService.bulk_create_or_update: поиск по хешу',
+             Internship.objects.filter(source_website=website, content_hash__in=['0' * 64]).values_list('id'),
+             CONTENT_HASH_INDEX),
+            ('InternshipService.is_duplicate', Internship.objects.filter(content_hash='0' * 64, source_website=website)[:1],
+             CONTENT_HASH_INDEX),
+            ('update_or_create по (source_website, url)',
+             Internship.objects.filter(source_website=website, url='https://example.com/'),
+             'internship_source_url_idx'),
+        ]
+
+    def test_hot_queries_use_expected_indexes(self):
+        for name, queryset, expected_index in self.hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertRegex(plan, re.compile(rf'\b(?:{expected_index})\b'), f'{name}: индекс не используется\n{plan}')
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Проходит все страницы курсорной пагинации списков стажировок и результатов
+    поиска: каждая стажировка должна встретиться ровно один раз, а последняя
+    страница - вернуть пустой next_cursor.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        website = Website.objects.create(name='Тестовый источник', url='https://example.com/')
+        internships = create_internships(website, 23)
+        # Одинаковые даты добавления и одинаковый ранг у стажировок с одинаковым
+        # текстом проверяют, что курсор различает записи с равными ключами
+        created_at = internships[0].created_at
+        Internship.objects.filter(id__in=[internship.id for internship in internships[::2]]).update(created_at=created_at)
+
+    def walk(self, queryset, page_size):
+        expected = set(queryset.values_list('id', flat=True))
+        self.assertTrue(expected, 'В наборе нет стажировок')
+        max_pages = len(expected) // page_size + 2
+        seen = set()
+        cursor = None
+        for _ in range(max_pages):
+            page = paginate_keyset(queryset, cursor, page_size)
+            ids = [internship.id for internship in page.object_list]
+            self.assertFalse(seen.intersection(ids), f'Повторно возвращены id {sorted(seen.intersection(ids))}')
+            seen.update(ids)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        else:
+            self.fail(f'next_cursor не стал пустым за {max_pages} страниц')
+        self.assertEqual(seen, expected)
+
+    def test_lists(self):
+        querysets = {
+            'активные стажировки': Internship.objects.filter(is_archived=False),
+            'архивные стажировки': Internship.objects.filter(is_archived=True),
+            'все стажировки (API)': Internship.objects.select_related('source_website'),
+        }
+        for name, queryset in querysets.items():
+            for page_size in (1, 2, 5):
+                with self.subTest(name, page_size=page_size):
+                    self.walk(queryset, page_size)
+
+    def test_search_results(self):
+        active = Internship.objects.filter(is_archived=False)
+        for text in ('python', 'Стажер'):
+            queryset = search_internships_queryset(active, text, ('title', 'company', 'description'))
+            for page_size in (1, 2, 5):
+                with self.subTest(text, page_size=page_size):
+                    self.walk(queryset, page_size)
@@ -1,24 +1,86 @@
 import logging
 import requests
 from bs4 import BeautifulSoup
+from django.db import transaction
 from urllib.parse import urlparse, urljoin
 import json 
 import re
+import threading
+import time
+from django.conf import settings
 from html_text import extract_text 
 
 from .models import Internship, Website
+from .city_service import CityService
+from .skill_service import SkillService
+from .stats_service import StatsService
 from .llm_utils import parse_with_openrouter 
+from .llm_dispatcher import PRIORITY_BACKGROUND
+from .content_extractor import extract_main_content
 from .constants import TECH_KEYWORDS
 
 logger = logging.getLogger(__name__)
 
+EXTRACTION_TIERS = ('json_ld', 'microdata', 'opengraph')
+REQUIRED_FIELDS = ('title', 'company', 'description')
+DEFAULT_MIN_STRUCTURED_SCORE = 1.0
+DEFAULT_MIN_DESCRIPTION_LENGTH = 300
+
+_extraction_stats = {
+    'pages': 0,
+    'tiers': {tier: 0 for tier in EXTRACTION_TIERS + ('llm', 'failed')},
+    'llm_calls': 0,
+    'llm_seconds': 0.0,
+    'llm_calls_avoided': 0,
+    'text_chars_before': 0,
+    'text_chars_after': 0,
+}
+_extraction_stats_lock = threading.Lock()
+
+
+def _record_extraction(tier, llm_seconds=None):
+    with _extraction_stats_lock:
+        _extraction_stats['pages'] += 1
+        _extraction_stats['tiers'][tier] += 1
+        if llm_seconds is None:
+            if tier != 'failed':
+                _extraction_stats['llm_calls_avoided'] += 1
+        else:
+            _extraction_stats['llm_calls'] += 1
+            _extraction_stats['llm_seconds'] += llm_seconds
+
+
+def _record_text_size(before, after):
+    with _extraction_stats_lock:
+        _extraction_stats['text_chars_before'] += before
+        _extraction_stats['text_chars_after'] += after
+
+
+def get_extraction_stats():
+    """
+    Статистика уровней извлечения UniversalParser: сколько страниц разобрано
+    каждым уровнем, сколько было запросов к LLM и сколько их удалось избежать,
+    насколько выделение основного содержимого сократило текст страниц.
+    Сэкономленное время оценивается по среднему времени запроса к LLM.
+    """
+    with _extraction_stats_lock:
+        stats = {**_extraction_stats, 'tiers': dict(_extraction_stats['tiers'])}
+    avg_llm_seconds = stats['llm_seconds'] / stats['llm_calls'] if stats['llm_calls'] else 0.0
+    stats['llm_seconds'] = round(stats['llm_seconds'], 2)
+    stats['avg_llm_seconds'] = round(avg_llm_seconds, 2)
+    stats['estimated_seconds_saved'] = round(avg_llm_seconds * stats['llm_calls_avoided'], 2)
+    stats['text_reduction'] = round(1 - stats['text_chars_after'] / stats['text_chars_before'], 3) if stats['text_chars_before'] else 0.0
+    return stats
+
+
 class UniversalParser:
     """
     Универсальный парсер для извлечения информации о стажировках с произвольных URL.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, llm_priority=PRIORITY_BACKGROUND):
         self.url = url
+        self.llm_priority = llm_priority
         logger.info(f"Инициализирован UniversalParser для URL: {url}")
 
     def fetch_html(self, url):
@@ -50,7 +112,7 @@ class UniversalParser:
                 data = json.loads(script.string)
                 job_postings = []
                 if isinstance(data, list):
-                    job_postings.extend(item for item in data if item.get('@type') == 'JobPosting')
+                    job_postings.extend(item for item in data if isinstance(item, dict) and item.get('@type') == 'JobPosting')
                 elif isinstance(data, dict):
                     if data.get('@type') == 'JobPosting':
                         job_postings.append(data)
@@ -67,6 +129,8 @@ class UniversalParser:
                     company_name = company_data.get('name') if isinstance(company_data, dict) else None
                     
                     location_data = job_data.get('jobLocation')
+                    if isinstance(location_data, list):
+                        location_data = location_data[0] if location_data else None
                     city = None
                     if isinstance(location_data, dict):
                         address_data = location_data.get('address')
@@ -86,7 +150,7 @@ class UniversalParser:
                         elif isinstance(value, str):
                              salary_str = value
     
-                    description = description_html
+                    description = self._html_to_text(description_html)
 
                     return {
                         'title': title,
@@ -101,6 +165,96 @@ class UniversalParser:
                 logger.error(f"Неожиданная ошибка при обработке JSON-LD на {url}: {e}", exc_info=True)
         return None
 
+    def _extract_from_microdata(self, soup, url):
+        """Извлекает данные из микроразметки Schema.org/JobPosting (itemscope/itemprop)."""
+        job_item = soup.find(attrs={'itemtype': re.compile(r'schema\.org/JobPosting', re.I)})
+        if not job_item:
+            return None
+        logger.info(f"Найдена микроразметка JobPosting на {url}")
+
+        def prop_value(scope, name):
+            element = scope.find(attrs={'itemprop': name})
+            if not element:
+                return None, None
+            if element.get('content'):
+                return element['content'].strip(), element
+            return element.get_text(' ', strip=True) or None, element
+
+        title, _ = prop_value(job_item, 'title')
+        description, description_element = prop_value(job_item, 'description')
+        if description_element is not None and not description_element.get('content'):
+            description = self._html_to_text(str(description_element))
+
+        company = None
+        _, organization = prop_value(job_item, 'hiringOrganization')
+        if organization is not None:
+            company, _ = prop_value(organization, 'name')
+            company = company or organization.get_text(' ', strip=True) or None
+
+        city, _ = prop_value(job_item, 'addressLocality')
+        salary, _ = prop_value(job_item, 'baseSalary')
+
+        result = {'title': title, 'description': description, 'company': company, 'city': city, 'salary': salary}
+        result = {key: value for key, value in result.items() if value}
+        return result or None
+
+    def _html_to_text(self, html_fragment):
+        """Переводит HTML-описание из структурированных данных в текст с переносами строк."""
+        if not html_fragment or '<' not in html_fragment:
+            return html_fragment
+        try:
+            return extract_text(html_fragment)
+        except Exception:
+            return BeautifulSoup(html_fragment, 'html.parser').get_text('\n', strip=True)
+
+    def _extract_structured_data(self, html_content, url):
+        """
+        Извлекает данные из структурированной разметки страницы по уровням:
+        JSON-LD, микроразметка, OpenGraph/мета-теги. Каждое поле берется из
+        первого уровня, где оно есть.
+
+        Returns:
+            tuple: (данные, список уровней, давших хотя бы одно поле)
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        extractors = {
+            'json_ld': self._extract_from_json_ld,
+            'microdata': self._extract_from_microdata,
+            'opengraph': self._extract_from_meta_tags,
+        }
+        data = {}
+        tiers = []
+        for tier in EXTRACTION_TIERS:
+            tier_data = extractors[tier](soup, url)
+            if not tier_data:
+                continue
+            added = [key for key, value in tier_data.items() if value and not data.get(key)]
+            for key in added:
+                data[key] = tier_data[key]
+            if added:
+                tiers.append(tier)
+        return data, tiers
+
+    @staticmethod
+    def _completeness_score(data):
+        """
+        Оценка полноты данных (0..1) по title, company и description.
+        Короткое описание (например, из og:description) засчитывается наполовину:
+        обычно это анонс, а не полный текст вакансии.
+        """
+        min_description_length = getattr(settings, 'UNIVERSAL_PARSER_MIN_DESCRIPTION_LENGTH', DEFAULT_MIN_DESCRIPTION_LENGTH)
+        score = 0.0
+        if data.get('title'):
+            score += 0.3
+        if data.get('company'):
+            score += 0.3
+        description = data.get('description') or ''
+        if len(description) >= min_description_length:
+            score += 0.4
+        elif description:
+            score += 0.2
+        return round(score, 2)
+
     def _extract_from_meta_tags(self, soup, url):
         """Извлекает данные о стажировке из мета-тегов HTML-страницы."""
         logger.info(f"Пытаемся извлечь данные из мета-тегов для {url}")
@@ -155,22 +309,47 @@ class UniversalParser:
         
         if result.get('title') and (result.get('description') or result.get('company')):
             logger.info(f"Удалось извлечь базовые данные из мета-тегов для {url}")
-            return result
-        
-        logger.warning(f"Недостаточно данных из мета-тегов для {url}")
-        return None
+        elif result:
+            logger.info(f"Из мета-тегов для {url} извлечены только поля: {', '.join(result.keys())}")
+        else:
+            logger.warning(f"Недостаточно данных из мета-тегов для {url}")
+        return result or None
 
     def _clean_text(self, html_content):
-        """Очищает HTML и возвращает основной текстовый контент с помощью html_text."""
+        """
+        Очищает HTML и возвращает основной текстовый контент с помощью html_text.
+
+        Если settings.UNIVERSAL_PARSER_MAIN_CONTENT включен, из страницы выделяется
+        основной блок вакансии (parser.content_extractor), чтобы меню, подвалы и
+        списки похожих вакансий не попадали в промпт LLM и не вытесняли текст
+        вакансии при обрезке до MAX_CHARS_LIMIT.
+        """
         try:
             clean_text = extract_text(html_content)
             clean_text = re.sub(r'\s{2,}', '\n', clean_text).strip() 
             logger.info("Текст успешно очищен с помощью html_text.")
-            return clean_text
         except Exception as e:
             logger.error(f"Ошибка при очистке текста с помощью html_text: {e}", exc_info=True)
             return None
 
+        if not getattr(settings, 'UNIVERSAL_PARSER_MAIN_CONTENT', True):
+            return clean_text
+        try:
+            main_text = extract_main_content(html_content)
+        except Exception as e:
+            logger.error(f"Ошибка при выделении основного содержимого страницы: {e}", exc_info=True)
+            main_text = None
+        if not main_text:
+            logger.info(f"Основной блок страницы не найден, используется весь текст ({len(clean_text)} символов)")
+            _record_text_size(len(clean_text), len(clean_text))
+            return clean_text
+
+        main_text = re.sub(r'\s{2,}', '\n', main_text).strip()
+        _record_text_size(len(clean_text), len(main_text))
+        logger.info(f"Выделено основное содержимое страницы: {len(clean_text)} -> {len(main_text)} символов "
+                    f"({len(main_text) / len(clean_text):.0%} исходного текста)")
+        return main_text
+
     def _normalize_text(self, text):
         """
         Нормализует текст, исправляя проблемы с кодировкой и убирая некорректные символы.
@@ -196,40 +375,55 @@ class UniversalParser:
 
     def parse_internship_details(self, html_content, url):
         """
-        Парсит HTML для извлечения деталей стажировки, используя Ollama LLM.
+        Парсит HTML для извлечения деталей стажировки.
+
+        Сначала данные берутся из структурированной разметки (JSON-LD, микроразметка,
+        OpenGraph). LLM вызывается, только если оценка полноты этих данных ниже
+        settings.UNIVERSAL_PARSER_MIN_STRUCTURED_SCORE, и ее ответ заполняет лишь
+        недостающие поля. Уровень, давший результат, возвращается в extraction_tier.
         """
         if not html_content:
             logger.warning(f"Пустой HTML контент для URL: {url}")
             return None
 
-        logger.info(f"Начинаем парсинг {url} с использованием LLM.")
-        
         clean_text = self._clean_text(html_content)
         if not clean_text:
             logger.error(f"Не удалось очистить текст для URL: {url}")
             return None
-        
-        llm_extracted_data = parse_with_openrouter(clean_text)
 
-        if not llm_extracted_data or not isinstance(llm_extracted_data, dict):
-            logger.error(f"LLM не смогла извлечь данные или вернула неверный формат для {url}. Ответ: {llm_extracted_data}")
-            
-            meta_data = self._extract_from_meta_tags(BeautifulSoup(html_content, 'html.parser'), url)
-            if meta_data:
-                logger.info(f"Удалось извлечь метаданные из HTML для {url}")
-                llm_extracted_data = meta_data
+        llm_extracted_data, tiers = self._extract_structured_data(html_content, url)
+        score = self._completeness_score(llm_extracted_data)
+        min_score = getattr(settings, 'UNIVERSAL_PARSER_MIN_STRUCTURED_SCORE', DEFAULT_MIN_STRUCTURED_SCORE)
+        logger.info(f"Структурированные данные для {url}: уровни {tiers or '-'}, оценка полноты {score} (порог {min_score})")
+
+        llm_seconds = None
+        if tiers and score >= min_score:
+            extraction_tier = tiers[0]
+            logger.info(f"Данные для {url} взяты из структурированной разметки ({extraction_tier}), LLM не вызывается.")
+        else:
+            logger.info(f"Начинаем парсинг {url} с использованием LLM.")
+            started = time.monotonic()
+            llm_data = parse_with_openrouter(clean_text, priority=self.llm_priority)
+            llm_seconds = time.monotonic() - started
+
+            if llm_data and isinstance(llm_data, dict):
+                logger.info(f"LLM успешно вернула данные для {url}.")
+                extraction_tier = 'llm'
+                description = llm_extracted_data.get('description') or ''
+                if len(str(llm_data.get('description') or '')) > len(description):
+                    llm_extracted_data.pop('description', None)
+                for key, value in llm_data.items():
+                    if value and not llm_extracted_data.get(key):
+                        llm_extracted_data[key] = value
+            elif llm_extracted_data:
+                logger.error(f"LLM не смогла извлечь данные или вернула неверный формат для {url}. Ответ: {llm_data}")
+                extraction_tier = tiers[0]
             else:
-                json_ld_data = self._extract_from_json_ld(BeautifulSoup(html_content, 'html.parser'), url)
-                if json_ld_data:
-                    logger.info(f"Удалось извлечь данные из JSON-LD для {url}")
-                    llm_extracted_data = json_ld_data
-                else:
-                    return None
-        
-        logger.info(f"LLM успешно вернула данные для {url}.")
+                logger.error(f"LLM не смогла извлечь данные или вернула неверный формат для {url}. Ответ: {llm_data}")
+                _record_extraction('failed', llm_seconds)
+                return None
 
-        required_fields = ['title', 'company', 'description']
-        missing_fields = [field for field in required_fields if not llm_extracted_data.get(field)]
+        missing_fields = [field for field in REQUIRED_FIELDS if not llm_extracted_data.get(field)]
         
         if missing_fields:
             logger.warning(f"Отсутствуют обязательные поля ({', '.join(missing_fields)}) для {url}")
@@ -317,8 +511,11 @@ class UniversalParser:
             
         if not extracted_data.get('title') or extracted_data['title'] == 'Заголовок не извлечен' or not extracted_data.get('description') or extracted_data['description'] == 'Описание не извлечено':
              logger.error(f"LLM не смогла извлечь обязательные поля (title/description) для {url}")
+             _record_extraction('failed', llm_seconds)
              return None
 
+        _record_extraction(extraction_tier, llm_seconds)
+
         logger.info(f"Данные для {url} подготовлены к сохранению: Название='{extracted_data.get('title')}', Компания='{extracted_data.get('company')}'")
         
         final_data = {
@@ -330,6 +527,7 @@ class UniversalParser:
             'position': extracted_data.get('position'),
             'url': url,
             'technologies': extracted_data.get('keywords'),
+            'extraction_tier': extraction_tier,
         }
         return {k: v for k, v in final_data.items() if v is not None}
 
@@ -377,10 +575,15 @@ class UniversalParser:
         defaults_data = {k: v for k, v in internship_data.items() if k not in lookup_params and k in valid_keys}
 
         try:
-            internship, created = Internship.objects.update_or_create(
-                **lookup_params,
-                defaults=defaults_data
-            )
+            with transaction.atomic():
+                internship, created = Internship.objects.update_or_create(
+                    **lookup_params,
+                    defaults=defaults_data
+                )
+                if created:
+                    StatsService.adjust(website.id, active=1)
+            CityService.sync_internship_cities({internship.id: internship.city})
+            SkillService.sync_internship_skills({internship.id: internship.keywords})
 
             action = "Создана" if created else "Обновлена"
             logger.info(f"{action} стажировка: '{internship.title}' по URL {internship.url}")
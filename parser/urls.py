@@ -18,6 +18,11 @@ urlpatterns = [
     path('parse-universal/', ParseUniversalURLAPIView.as_view(), name='parse_universal_url'),
     path('api/preview-internship/', PreviewInternshipAPIView.as_view(), name='preview_internship'),
     path('api/internships/', api_views.internship_list_api, name='internship_list_api'),
+    path('api/internships/search/', api_views.search_internships, name='search_internships'),
+    path('api/stats/', api_views.get_stats_api, name='stats_api'),
+    path('api/llm/cache-stats/', api_views.get_llm_cache_stats_api, name='llm_cache_stats_api'),
+    path('api/llm/queue-stats/', api_views.get_llm_queue_stats_api, name='llm_queue_stats_api'),
+    path('api/llm/extraction-stats/', api_views.get_extraction_stats_api, name='extraction_stats_api'),
     path('api/internship/<int:pk>/', api_views.internship_detail_api, name='internship_detail_api'),
     
     path('', MainPageView.as_view(), name='main_page'),
@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.contrib import messages
 from .models import Website, Internship, SearchQuery
 from .forms import WebsiteForm, InternshipFilterForm
@@ -11,12 +11,17 @@ from django.conf import settings
 from django.utils import timezone
 from dotenv import load_dotenv
 from .hh_api_parser import HeadHunterAPI
+from .city_service import CityService
+from .skill_service import SkillService
+from .stats_service import StatsService
+from django.db import transaction
+from .search import filter_by_city, search_internships_queryset
 import os
 import json
 from django.views import View
 import logging
-from django.db.models import Q
 from django.core.paginator import Paginator
+from .pagination import paginate_keyset
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
 import threading
@@ -104,11 +109,16 @@ class WebsiteCreateView(View):
             if internship_technologies and isinstance(internship_technologies, list):
                  internship_defaults['keywords'] = ', '.join(filter(None, internship_technologies))
 
-            internship, internship_created = Internship.objects.update_or_create(
-                url=site_url, 
-                source_website=website,
-                defaults=internship_defaults
-            )
+            with transaction.atomic():
+                internship, internship_created = Internship.objects.update_or_create(
+                    url=site_url, 
+                    source_website=website,
+                    defaults=internship_defaults
+                )
+                if internship_created:
+                    StatsService.adjust(website.id, active=1)
+            CityService.sync_internship_cities({internship.id: internship.city})
+            SkillService.sync_internship_skills({internship.id: internship.keywords})
             action_internship = "создана" if internship_created else "обновлена"
 
             return JsonResponse({
@@ -184,7 +194,7 @@ class InternshipListView(ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        queryset = Internship.objects.filter(is_archived=False).order_by('-created_at')
+        queryset = Internship.objects.filter(is_archived=False).order_by('-created_at', '-id')
         
         filter_form = InternshipFilterForm(self.request.GET)
         if filter_form.is_valid():
@@ -196,10 +206,8 @@ class InternshipListView(ListView):
     def apply_filters(self, queryset, filter_data):
         keywords = filter_data.get('keywords')
         if keywords:
-            queryset = queryset.filter(
-                Q(keywords__icontains=keywords) |
-                Q(description__icontains=keywords) |
-                Q(company__icontains=keywords)
+            queryset = search_internships_queryset(
+                queryset, keywords, fallback_fields=('keywords', 'description', 'company')
             )
         
         start_date = filter_data.get('start_date')
@@ -212,28 +220,26 @@ class InternshipListView(ListView):
         
         city = filter_data.get('city')
         if city:
-            queryset = queryset.filter(city__icontains=city)
+            queryset = filter_by_city(queryset, city)
             
         return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """Курсорная пагинация по (created_at, id) вместо OFFSET и COUNT(*)"""
+        try:
+            page = paginate_keyset(queryset, self.request.GET.get('cursor'), page_size)
+        except ValueError as e:
+            raise Http404(str(e))
+        return None, page, page.object_list, page.has_next()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs) 
         if not context.get('page_obj'):
-            paginator = context.get('paginator')
-            if paginator is None:
-                logger.error("InternshipListView: Neither page_obj nor paginator found in context. Pagination is not working.")
-            else:
-                logger.error(f"InternshipListView: page_obj not found, but paginator is present (paginator.num_pages: {paginator.num_pages}, paginator.count: {paginator.count}). Queryset might be empty or page number out of range.")
+            logger.error("InternshipListView: page_obj not found in context. Pagination is not working.")
 
         context['filter_form'] = InternshipFilterForm(self.request.GET)
         
-        all_cities_entries = Internship.objects.values_list('city', flat=True)
-        unique_cities = set()
-        for city_entry in all_cities_entries:
-            if city_entry:
-                cities_list = [city.strip() for city in city_entry.split(',') if city.strip()]
-                unique_cities.update(cities_list)
-        context['cities'] = sorted(list(unique_cities))
+        context['cities'] = CityService.get_city_names()
         
         return context
 
@@ -243,20 +249,24 @@ class InternshipListView(ListView):
         if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
             if not page_obj_for_ajax:
                 logger.warning("InternshipListView (AJAX): page_obj is missing in context! Returning empty list for AJAX.")
-                return JsonResponse({'html': '', 'has_next': False})
+                return JsonResponse({'html': '', 'has_next': False, 'next_cursor': None})
             
             html = render_to_string(
                 'parser/partials/internship_item_list.html',
                 {'internships': page_obj_for_ajax.object_list, 'page_obj': page_obj_for_ajax}
             )
-            return JsonResponse({'html': html, 'has_next': page_obj_for_ajax.has_next()})
+            return JsonResponse({
+                'html': html,
+                'has_next': page_obj_for_ajax.has_next(),
+                'next_cursor': page_obj_for_ajax.next_cursor,
+            })
         
         return super().render_to_response(context, **response_kwargs)
 
 class ArchivedInternshipListView(InternshipListView):
     """Отображение архивных стажировок"""
     def get_queryset(self):
-        queryset = Internship.objects.filter(is_archived=True).order_by('-created_at')
+        queryset = Internship.objects.filter(is_archived=True).order_by('-created_at', '-id')
         filter_form = InternshipFilterForm(self.request.GET)
         if filter_form.is_valid():
             queryset = self.apply_filters(queryset, filter_form.cleaned_data)
@@ -266,9 +276,14 @@ def archive_internship(request, pk):
     """Перемещение стажировки в архив"""
     if request.method == 'POST':
         try:
-            internship = Internship.objects.get(pk=pk)
-            internship.is_archived = True
-            internship.save()
+            with transaction.atomic():
+                internship = Internship.objects.select_for_update().get(pk=pk)
+                if not internship.is_archived:
+                    internship.is_archived = True
+                    internship.auto_archived = False
+                    internship.archived_at = timezone.now()
+                    internship.save()
+                    StatsService.adjust(internship.source_website_id, active=-1, archived=1)
             return JsonResponse({'success': True})
         except Internship.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Internship not found'})
@@ -374,7 +389,8 @@ def save_special_parsers_settings(request):
             )
             if created:
                 created_count += 1
-                queries_to_parse_params.append({"city": city_desired, "keywords": kw_desired, "max_pages": query.max_pages})
+                queries_to_parse_params.append({"city": city_desired, "keywords": kw_desired, "max_pages": query.max_pages,
+                                                "search_query_id": query.id})
             else:
                 pass
 
@@ -388,7 +404,8 @@ def save_special_parsers_settings(request):
                 thread = threading.Thread(target=parse_all_internships, 
                                           kwargs={'city': params['city'], 
                                                   'keywords': params['keywords'], 
-                                                  'max_pages': params['max_pages']})
+                                                  'max_pages': params['max_pages'],
+                                                  'search_query_id': params['search_query_id']})
                 threads.append(thread)
                 thread.start()
                 triggered_parsing_count += 1
@@ -435,8 +452,10 @@ def save_special_parsers_settings(request):
 @require_http_methods(["DELETE"])
 def delete_internship(request, internship_id):
     try:
-        internship = Internship.objects.get(id=internship_id)
-        internship.delete()
+        with transaction.atomic():
+            internship = Internship.objects.select_for_update().get(id=internship_id)
+            StatsService.adjust_for_deleted([(internship.source_website_id, internship.is_archived)])
+            internship.delete()
         return JsonResponse({'status': 'success', 'message': 'Стажировка удалена'})
     except Internship.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Стажировка не найдена'}, status=404)